@@ -0,0 +1,353 @@
+# benchmarks/replay.py
+"""
+Replays scripted multi-turn conversations (benchmarks/conversations.yaml) through the
+ConversationEngine against tools/mock_llm_server.py, with thousands of concurrent patients:
+
+    python -m benchmarks.replay --patients 2000 --latency 0.3 --failure-rate 0.02 --malformed-rate 0.01
+    python -m benchmarks.replay --patients 2000 --compare benchmarks/results/<baseline>.json --max-regression 10
+
+Reports turns/sec, turn and per-stage latency percentiles and LLM calls per booked
+appointment, and writes them as JSON (tagged with the git commit) so runs of different
+commits can be compared. State, translations and bookings live in a throwaway directory.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import date, datetime, timedelta
+from typing import Tuple
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SCRIPTS = os.path.join(ROOT, "benchmarks", "conversations.yaml")
+DEFAULT_RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# Default clinic copies: one per this many patients (each clinic has a few hundred slots)
+PATIENTS_PER_CLINIC = 50
+
+# Compared by --compare: metric -> True if higher is better
+COMPARED_METRICS = {
+    "turns_per_second": True,
+    "turn_p50_ms": False,
+    "turn_p95_ms": False,
+    "turn_p99_ms": False,
+    "llm_calls_per_booking": False,
+    "booking_rate": True,
+}
+
+
+# --- Mock LLM Server ---
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock_server(args) -> Tuple[subprocess.Popen, str]:
+    """Runs tools/mock_llm_server.py in its own process, so it does not share our GIL."""
+    port = _free_port()
+    command = [
+        sys.executable, "-m", "tools.mock_llm_server", "--port", str(port),
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--failure-rate", str(args.failure_rate), "--malformed-rate", str(args.malformed_rate),
+        "--seed", str(args.seed),
+    ]
+    process = subprocess.Popen(command, cwd=ROOT)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{url}/stats", timeout=0.5).read()
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Mock LLM server did not start.")
+
+
+def fetch_mock_stats(url: str) -> dict:
+    try:
+        return json.loads(urllib.request.urlopen(f"{url}/stats", timeout=2).read())
+    except OSError:
+        return {}
+
+
+# --- Workload ---
+
+def load_scripts(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+def open_slots(availability, horizon_days: int, granularity: int) -> list:
+    """Every grid start time inside opening hours over the horizon, from tomorrow on."""
+    slots = []
+    for offset in range(1, horizon_days + 1):
+        day = date.today() + timedelta(days=offset)
+        for open_at, close_at in availability.schedule.get(day.weekday(), []):
+            for minute in range(open_at, close_at - 30 + 1, granularity):
+                slots.append((day.isoformat(), f"{minute // 60:02d}:{minute % 60:02d}"))
+    return slots
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _ms(value) -> float:
+    return round(value * 1000, 2) if value is not None else None
+
+
+# --- Benchmark ---
+
+def build_engine(profile_path: str, clinics: int, workdir: str, state_backend: str, single_call: bool):
+    """
+    Engine over `clinics` copies of the profile, with state, translations and bookings in `workdir`.
+    Runs in the benchmark process and, with --workers, once in every engine worker.
+    """
+    from config.settings import SESSION_TTL_SECONDS, TRANSLATION_CACHE_MAX_ENTRIES
+    from core import conversation_engine
+    from core.appointment_ledger import AppointmentLedger, set_appointment_ledger
+    from core.conversation_engine import ConversationEngine
+    from core.llm_client import LLMFallbackService, set_llm_client
+    from core.profile_registry import ProfileRegistry
+    from core.state_store import SQLiteStateStore, MemoryStateStore, set_state_store
+    from core.translation_cache import TranslationCache
+
+    if state_backend == "sqlite":
+        set_state_store(SQLiteStateStore(os.path.join(workdir, "conversations.db"), ttl_seconds=SESSION_TTL_SECONDS))
+    else:
+        set_state_store(MemoryStateStore(None, ttl_seconds=SESSION_TTL_SECONDS))
+    # Shared by all workers, so overlapping bookings from different processes are refused
+    set_appointment_ledger(AppointmentLedger(os.path.join(workdir, "appointments.db")))
+    conversation_engine.SINGLE_CALL_TURN_MODE = single_call
+
+    with open(profile_path, "r", encoding="utf-8") as f:
+        business_data = yaml.safe_load(f)
+    llm_client = LLMFallbackService()
+    llm_client.translation_cache = TranslationCache(os.path.join(workdir, "translation_cache.json"), TRANSLATION_CACHE_MAX_ENTRIES)
+    set_llm_client(llm_client)
+    # Patients are spread over copies of the clinic, so slot capacity does not cap the booking rate
+    registry = ProfileRegistry.from_business_data(business_data)
+    for clinic in range(1, clinics):
+        registry.register(f"clinic-{clinic}", business_data)
+    return ConversationEngine(llm_client=llm_client, registry=registry)
+
+
+async def run_benchmark(args, mock_url: str, workdir: str) -> dict:
+    # Providers must be configured before the first LLM client is built (workers inherit them)
+    os.environ.update(
+        CHUTES_BASE_URL=f"{mock_url}/chutes/v1/chat/completions", CHUTES_API_KEY="bench", CHUTES_MODEL="mock",
+        OPENROUTER_BASE_URL=f"{mock_url}/openrouter/v1", OPENROUTER_API_KEY="bench", OPENROUTER_MODEL="mock",
+    )
+    from config.settings import SLOT_SEARCH_HORIZON_DAYS, SLOT_GRANULARITY_MINUTES, TRANSLATION_LANGUAGES
+    from core.llm_client import close_llm_client
+    from core.metrics import METRICS, Histogram
+    from core.state_store import close_state_store
+    from core.appointment_ledger import close_appointment_ledger
+    from core.worker_pool import ShardedWorkerPool
+
+    clinics = args.clinics or max(1, -(-args.patients // PATIENTS_PER_CLINIC))
+    engine_args = (args.profile, clinics, workdir, args.state_backend, args.single_call)
+    local_engine = engine = build_engine(*engine_args)
+    tenants = local_engine.registry.tenants()
+
+    if args.warm:
+        # Persisted to workdir, so workers start with the translations too
+        await local_engine.llm_client.warm_translation_cache_async(TRANSLATION_LANGUAGES)
+
+    pool = None
+    if args.workers:
+        pool = ShardedWorkerPool(args.workers, build_engine, engine_args)
+        pool.start()
+        await pool.collect_metrics()  # returns once every worker is up
+        engine = pool
+
+    scripts = load_scripts(args.scripts)
+    weights = [script.get("weight", 1) for script in scripts]
+    slots = open_slots(local_engine.availability, SLOT_SEARCH_HORIZON_DAYS, SLOT_GRANULARITY_MINUTES)
+    rng = random.Random(args.seed)
+    plans = []
+    for index in range(args.patients):
+        script = rng.choices(scripts, weights)[0]
+        slot_date, slot_time = rng.choice(slots)
+        fields = {"name": f"Patient {index}", "slot_date": slot_date, "slot_time": slot_time}
+        start_delay = rng.uniform(0, args.ramp_seconds)
+        turns = [turn.format(**fields) for turn in script["turns"]]
+        plans.append((f"bench-{index}", tenants[index % len(tenants)], script["name"], turns, start_delay))
+
+    errors = {"count": 0, "examples": []}
+    per_script = {}
+
+    async def patient(user_id: str, tenant_id: str, script_name: str, turns: list, start_delay: float):
+        await asyncio.sleep(start_delay)
+        for turn in turns:
+            try:
+                await engine.handle_message(user_id, turn, tenant_id)
+            except Exception as e:
+                errors["count"] += 1
+                if len(errors["examples"]) < 5:
+                    errors["examples"].append(f"{type(e).__name__}: {e}")
+            per_script[script_name] = per_script.get(script_name, 0) + 1
+            if args.think_time:
+                await asyncio.sleep(rng.uniform(0, args.think_time))
+
+    METRICS.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*(patient(*plan) for plan in plans))
+    duration = time.perf_counter() - started
+
+    try:
+        # With --workers the turns ran in the worker processes: report their merged metrics
+        metrics = await pool.collect_metrics() if pool is not None else METRICS
+        turns = metrics.collect("turn_seconds")
+        turn_histogram = Histogram()
+        for _, histogram in turns:  # one per clinic
+            turn_histogram.merge(histogram)
+        turn_count = turn_histogram.count
+        bookings = metrics.counter_total("bookings_total")
+        llm_calls = sum(h.count for _, h in metrics.collect("llm_attempt_seconds"))
+        stages = {
+            labels["stage"]: {"count": h.count, "p50_ms": _ms(h.percentile(50)), "p95_ms": _ms(h.percentile(95)),
+                              "p99_ms": _ms(h.percentile(99)), "total_s": round(h.sum, 3)}
+            for labels, h in sorted(metrics.collect("turn_stage_seconds"), key=lambda pair: pair[0]["stage"])
+        }
+        cache_lookups = metrics.counter_total("llm_response_cache_total")
+        cache_served = metrics.counter("llm_response_cache_total", result="hit") + \
+            metrics.counter("llm_response_cache_total", result="coalesced")
+        booking_patients = sum(1 for plan in plans if plan[2] != "faq_only")
+        return {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "config": {key: value for key, value in vars(args).items() if key not in ("compare", "output", "max_regression")},
+            "results": {
+                "duration_s": round(duration, 3),
+                "turns": turn_count,
+                "turns_per_second": round(turn_count / duration, 2) if duration else None,
+                "turn_p50_ms": _ms(turn_histogram.percentile(50)),
+                "turn_p95_ms": _ms(turn_histogram.percentile(95)),
+                "turn_p99_ms": _ms(turn_histogram.percentile(99)),
+                "bookings": int(bookings),
+                "booking_rate": round(bookings / booking_patients, 4) if booking_patients else None,
+                "llm_calls": llm_calls,
+                "llm_calls_per_turn": round(llm_calls / turn_count, 3) if turn_count else None,
+                "llm_calls_per_booking": round(llm_calls / bookings, 2) if bookings else None,
+                "llm_failures": int(metrics.counter_total("llm_failure_total")),
+                "llm_fallbacks": int(metrics.counter_total("llm_fallback_total")),
+                "turns_shed": int(metrics.counter_total("turns_shed_total")),
+                "response_cache_hit_ratio": round(cache_served / cache_lookups, 4) if cache_lookups else None,
+                "errors": errors,
+                "turns_by_script": per_script,
+                "stages": stages,
+                "counters": metrics.snapshot()["counters"],
+                "mock_server": fetch_mock_stats(mock_url),
+            },
+        }
+    finally:
+        if pool is not None:
+            await pool.aclose()
+        await local_engine.llm_client.aclose()
+        close_llm_client()
+        close_state_store()
+        close_appointment_ledger()
+
+
+# --- Reporting ---
+
+def print_report(report: dict):
+    results = report["results"]
+    print(f"\n=== Replay benchmark @ {report['commit']} ({report['config']['patients']} patients) ===")
+    print(f"Turns: {results['turns']} in {results['duration_s']}s -> {results['turns_per_second']} turns/s")
+    print(f"Turn latency p50/p95/p99: {results['turn_p50_ms']} / {results['turn_p95_ms']} / {results['turn_p99_ms']} ms")
+    print(f"Bookings: {results['bookings']} (rate {results['booking_rate']}), LLM calls: {results['llm_calls']} "
+          f"({results['llm_calls_per_turn']}/turn, {results['llm_calls_per_booking']}/booking)")
+    print(f"LLM failures: {results['llm_failures']}, fallbacks: {results['llm_fallbacks']}, errors: {results['errors']['count']}")
+    print(f"LLM response cache hit ratio: {results['response_cache_hit_ratio']}, turns shed: {results['turns_shed']}")
+    print(f"{'stage':<40} {'count':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stage in results["stages"].items():
+        print(f"{name:<40} {stage['count']:>8} {stage['p50_ms']!s:>9} {stage['p95_ms']!s:>9} {stage['p99_ms']!s:>9}")
+
+
+def compare(report: dict, baseline: dict, max_regression: float = None) -> bool:
+    """Prints the change of the key metrics against a baseline; False if one regressed too far."""
+    ok = True
+    print(f"\n=== Compared with {baseline.get('commit')} ({baseline.get('timestamp')}) ===")
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        old, new = baseline["results"].get(metric), report["results"].get(metric)
+        if not old or new is None:
+            print(f"{metric:<24} {old!s:>10} -> {new!s:>10}")
+            continue
+        change = (new - old) / old * 100
+        regression = -change if higher_is_better else change
+        flag = ""
+        if max_regression is not None and regression > max_regression:
+            flag, ok = "  REGRESSION", False
+        print(f"{metric:<24} {old:>10} -> {new:>10} ({change:+.1f}%){flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversation replay benchmark against a mock LLM server.")
+    parser.add_argument("--patients", type=int, default=1000, help="Simulated patients, all running concurrently")
+    parser.add_argument("--ramp-seconds", type=float, default=0.0, help="Spread patient start times over this window")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Max random pause between a patient's turns")
+    parser.add_argument("--latency", type=float, default=0.3, help="Median mock LLM latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.4, help="Log-normal spread of the mock latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--clinics", type=int, default=0, help=f"Clinic copies (default: one per {PATIENTS_PER_CLINIC} patients)")
+    parser.add_argument("--state-backend", choices=["sqlite", "memory"], default="sqlite")
+    parser.add_argument("--single-call", action="store_true", help="Enable single-call turn mode")
+    parser.add_argument("--workers", type=int, default=0, help="Run turns in this many sharded engine processes")
+    parser.add_argument("--no-warm", dest="warm", action="store_false", help="Skip translation cache warm-up")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--scripts", default=DEFAULT_SCRIPTS)
+    parser.add_argument("--profile", default=os.path.join(ROOT, "config", "business_profile.yaml"))
+    parser.add_argument("--mock-url", default=None, help="Use an already running mock server")
+    parser.add_argument("--output", default=None, help="Result file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline result file to compare against")
+    parser.add_argument("--max-regression", type=float, default=None, help="Exit 1 if a key metric is this %% worse")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
+    process = None
+    mock_url = args.mock_url
+    if mock_url is None:
+        process, mock_url = start_mock_server(args)
+    try:
+        with tempfile.TemporaryDirectory(prefix="replay-") as workdir:
+            report = asyncio.run(run_benchmark(args, mock_url, workdir))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print_report(report)
+    output = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            if not compare(report, json.load(f), args.max_regression):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -26,8 +26,26 @@ MESSAGES = {
     "PAST_DATE": "I am sorry, I cannot book an appointment for a date that has already passed. Please select a future date.",
     "TOO_SOON": "I am sorry, you must book at least {minutes} minutes in advance. Please select a slightly later time.",
     "CLOSED_HOURS": "I am sorry, the clinic is closed on weekends (Saturday and Sunday) and outside of our working hours ({hours}). Please select a different day or time.",
+    "SLOT_TAKEN": "I am sorry, that time slot is already booked.",
+    "ALTERNATIVE_SLOTS": "The nearest available slots are: {alternatives}. Would any of these work for you?",
     "SERVICE_NOT_FOUND": "I apologize, I didn't recognize that service. Please choose from: {services_list}.",
     
+    # FAQ answers served straight from the knowledge base (no LLM call)
+    "SERVICE_DETAILS": "{service} costs {price} and takes about {duration}.",
+    "SERVICE_DETAILS_PRICE_ON_REQUEST": "{service} takes about {duration}. Its price depends on the treatment you need, so please call us at {contact} for a quote.",
+    "CLINIC_HOURS": "Our hours are {hours}.",
+    "CLINIC_LOCATION": "You can find us at {location}.",
+    "CLINIC_CONTACT": "You can reach the clinic at {contact}.",
+
+    # Voice notes (services/audio_processor.py)
+    "VOICE_NOTE_TOO_LONG": "I am sorry, I can only listen to voice notes of up to {seconds} seconds. Please send a shorter note or type your message.",
+    "VOICE_NOTE_FAILED": "I am sorry, I could not understand that voice note. Could you please type your message instead?",
+    "VOICE_NOTE_BUSY": "I am receiving a lot of voice notes right now. Please type your message, or send the voice note again in a minute.",
+
+    # Appointment messages sent by core/reminder_scheduler.py
+    "APPOINTMENT_CONFIRMATION": "📅 Confirmed: your {service} appointment at {clinic} on {date} at {time} under the name {name}. Reply to this message if you need to change it.",
+    "APPOINTMENT_REMINDER": "⏰ Reminder: your {service} appointment at {clinic} is on {date} at {time}. If you cannot make it, please call us at {contact}.",
+
     # Success
     "SUCCESS_BOOKING": "✅ Great news! Your {service} appointment has been tentatively scheduled for {date} at {time} under the name {name}. We'll send you a confirmation message shortly!",
 }
\ No newline at end of file
@@ -1,4 +1,260 @@
 # Configuration constants for the booking system
 
 # Minimum buffer time required for bookings (in minutes)
-BOOKING_BUFFER_MINUTES = 30
\ No newline at end of file
+BOOKING_BUFFER_MINUTES = 30
+
+# --- Translation Cache ---
+
+# Languages whose prompt translations are pre-warmed at startup (English templates need none)
+TRANSLATION_LANGUAGES = ["Hindi", "Hinglish"]
+
+# On-disk store for translated templates (survives restarts)
+TRANSLATION_CACHE_PATH = "data/translation_cache.json"
+
+# Maximum number of fully rendered prompts kept in memory (LRU eviction)
+TRANSLATION_CACHE_MAX_ENTRIES = 512
+
+
+# --- LLM Connection Pool ---
+
+# Upper bound on open connections shared by the Chutes and OpenRouter endpoints
+LLM_POOL_MAX_CONNECTIONS = 100
+
+# Upper bound on open connections to a single provider host
+LLM_POOL_MAX_CONNECTIONS_PER_HOST = 50
+
+# How long an idle keep-alive connection stays in the pool (in seconds)
+LLM_POOL_KEEPALIVE_SECONDS = 30
+
+
+# --- LLM Provider Deadlines, Hedging & Circuit Breaker ---
+
+# Hard deadline for a single provider call (in seconds)
+LLM_PRIMARY_TIMEOUT_SECONDS = 8.0
+LLM_FALLBACK_TIMEOUT_SECONDS = 12.0
+
+# Hedged mode: fire the fallback once the primary is slower than its usual latency percentile
+LLM_HEDGING_ENABLED = False
+LLM_HEDGE_PERCENTILE = 95
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = 2.0   # used until the primary has latency samples
+LLM_HEDGE_MIN_DELAY_SECONDS = 0.25
+
+# Consecutive failures that open a provider's circuit, and the cool-down before it is probed again
+LLM_BREAKER_FAILURE_THRESHOLD = 5
+LLM_BREAKER_COOLDOWN_SECONDS = 30.0
+
+
+# --- LLM Response Cache ---
+
+# Reuse answers to identical prompts, and share one provider call between concurrent identical requests
+LLM_RESPONSE_CACHE_ENABLED = True
+
+# Maximum number of cached responses kept in memory (LRU eviction)
+LLM_RESPONSE_CACHE_MAX_ENTRIES = 2048
+
+# How long a cached response stays valid (in seconds); prompts containing today's date also expire at midnight
+LLM_RESPONSE_CACHE_TTL_SECONDS = 15 * 60
+
+
+# --- LLM Admission Control ---
+
+# Adaptive (AIMD) limit on concurrent LLM requests: starting point and bounds
+LLM_CONCURRENCY_INITIAL_LIMIT = 50
+LLM_CONCURRENCY_MIN_LIMIT = 8
+LLM_CONCURRENCY_MAX_LIMIT = 100
+
+# Recent latency above this multiple of the long-run latency counts as congestion and shrinks the limit
+LLM_CONCURRENCY_LATENCY_TOLERANCE = 1.5
+LLM_CONCURRENCY_BACKOFF = 0.9
+
+# Hard cap on requests waiting for a slot; beyond it (or when the queue cannot drain before the
+# turn's deadline) new turns are answered with LLM_FAILURE right away
+LLM_ADMISSION_MAX_QUEUE = 2000
+
+# Time budget of one conversation turn (in seconds); LLM requests that cannot start in time are shed
+LLM_TURN_DEADLINE_SECONDS = 20.0
+
+
+# --- Conversation State Storage ---
+
+# Backend for ConversationState: "sqlite" (WAL), "memory" (write-behind to SQLite) or "json" (one file per user)
+STATE_BACKEND = "sqlite"
+
+# SQLite database used by the "sqlite" backend and as the write-behind target of "memory" (None = memory only)
+STATE_DB_PATH = "data/conversations.db"
+
+# Directory of the legacy one-file-per-user JSON layout
+STATE_DIR = "data/conversations"
+
+# Sessions idle for longer than this are treated as expired and start fresh (in seconds)
+SESSION_TTL_SECONDS = 24 * 60 * 60
+
+# Expired sessions are deleted from the store this often (in seconds; None/0 = only skipped on read)
+STATE_PURGE_INTERVAL_SECONDS = SESSION_TTL_SECONDS / 24
+
+# Write-behind batching for the "memory" backend
+STATE_WRITE_BEHIND_INTERVAL_SECONDS = 1.0
+STATE_WRITE_BEHIND_MAX_BATCH = 500
+
+
+# --- FAQ Retrieval (core/knowledge_base.py) ---
+
+# Number of knowledge-base snippets included in an FAQ prompt
+FAQ_TOP_K = 4
+
+# Answer straight from the index when the best entry covers this share of the question's words...
+FAQ_DIRECT_ANSWER_MIN_COVERAGE = 0.75
+
+# ...and scores at least this many times higher than the runner-up
+FAQ_DIRECT_ANSWER_MIN_MARGIN = 1.5
+
+
+# --- Rule-based Entity Pre-extraction (core/entity_extractor.py) ---
+
+# Local date/time/service matches at or above this confidence skip the LLM extraction call
+ENTITY_FAST_PATH_MIN_CONFIDENCE = 0.8
+
+
+# --- Local Language Identification (core/language_id.py) ---
+
+# A message identified at or above this confidence sets the conversation language without
+# the LLM; less certain ones (a bare "ok", a name) keep the language already known
+LANGUAGE_ID_MIN_CONFIDENCE = 0.75
+
+
+# --- Single-call Turn Mode ---
+
+# Extract the entities and translate the candidate next replies in ONE LLM request per turn
+SINGLE_CALL_TURN_MODE = False
+
+
+# --- Slot Availability (core/availability.py) ---
+
+# Appointment start times are offered on this grid (in minutes)
+SLOT_GRANULARITY_MINUTES = 15
+
+# Slot length for services whose duration cannot be parsed (in minutes)
+SLOT_DEFAULT_DURATION_MINUTES = 15
+
+# How many days ahead to look for free slots, and how many alternatives to offer on a rejection
+SLOT_SEARCH_HORIZON_DAYS = 14
+SLOT_SUGGESTION_COUNT = 3
+
+
+# --- Multi-clinic Profiles (core/profile_registry.py) ---
+
+# Tenant id -> business profile file; every *.yaml in CLINIC_PROFILE_DIR is added under its file name
+CLINIC_PROFILES = {"default": "config/business_profile.yaml"}
+CLINIC_PROFILE_DIR = "config/clinics"
+
+# Tenant used when a caller does not name a clinic (keeps single-clinic state keys unchanged)
+DEFAULT_TENANT = "default"
+
+# Profile files are re-checked for changes at most this often (in seconds)
+PROFILE_RELOAD_CHECK_SECONDS = 2.0
+
+
+# --- Message Coalescing (core/message_coalescer.py) ---
+
+# Messages of one user arriving within this quiet window are answered as ONE turn (0 disables)...
+COALESCE_WINDOW_SECONDS = 1.5
+
+# ...but a burst never waits longer than this after its first message
+COALESCE_MAX_WAIT_SECONDS = 4.0
+
+
+# --- Voice Notes (services/audio_processor.py, services/openai_service.py) ---
+
+# Voice notes processed at once, and notes allowed to wait; kept apart from text turns
+AUDIO_MAX_WORKERS = 2
+AUDIO_MAX_QUEUE = 20
+
+# Larger or longer notes are rejected with a polite reply (WhatsApp voice notes are ~1-2 KB/s)
+AUDIO_MAX_BYTES = 2 * 1024 * 1024
+AUDIO_MAX_DURATION_SECONDS = 120
+
+# Decoded PCM sample rate (Whisper works at 16 kHz)
+AUDIO_SAMPLE_RATE = 16000
+
+# Deadlines for fetching, decoding and transcribing one note (in seconds)
+AUDIO_DOWNLOAD_TIMEOUT_SECONDS = 15.0
+AUDIO_DECODE_TIMEOUT_SECONDS = 20.0
+TRANSCRIBE_TIMEOUT_SECONDS = 30.0
+
+# Speech-to-text backend: "whisper" (OpenAI-compatible API) or "stub" (local, for tests)
+TRANSCRIBER_BACKEND = "whisper"
+
+
+# --- WhatsApp Outbound Dispatcher (services/whatsapp_service.py) ---
+
+# Account-wide send rate (Cloud API business-number throughput) and burst size
+WHATSAPP_SEND_RATE_PER_SECOND = 80.0
+WHATSAPP_SEND_BURST = 80
+
+# Per-recipient pair limit (about one message every 6 seconds sustained, short bursts allowed)
+WHATSAPP_PER_RECIPIENT_RATE_PER_SECOND = 1 / 6
+WHATSAPP_PER_RECIPIENT_BURST = 45
+
+# Retries on 429/5xx/network errors: exponential backoff with full jitter, capped
+WHATSAPP_MAX_RETRIES = 4
+WHATSAPP_RETRY_BASE_DELAY_SECONDS = 0.5
+WHATSAPP_RETRY_MAX_DELAY_SECONDS = 8.0
+
+# Messages queued across all recipients before new ones are refused
+WHATSAPP_MAX_QUEUE = 10000
+
+# Pooled connections to the Cloud API and the deadline for one send attempt
+WHATSAPP_POOL_MAX_CONNECTIONS = 50
+WHATSAPP_SEND_TIMEOUT_SECONDS = 10.0
+
+
+# --- Appointment Ledger & Reminders (core/appointment_ledger.py, core/reminder_scheduler.py) ---
+
+# SQLite database of confirmed bookings and their pending messages (None = bookings are not recorded)
+APPOINTMENT_LEDGER_PATH = "data/appointments.db"
+
+# Send due confirmations and reminders through the WhatsApp dispatcher (needs Cloud API credentials)
+REMINDER_SCHEDULER_ENABLED = False
+
+# The reminder goes out this long before the appointment (in seconds); later bookings only get the confirmation
+REMINDER_LEAD_SECONDS = 24 * 60 * 60
+
+# Only reminders due within this window are held in memory; the rest wait in the ledger (in seconds)
+REMINDER_HORIZON_SECONDS = 6 * 60 * 60
+
+# How often the ledger is polled for bookings made by other processes (in seconds)
+REMINDER_POLL_SECONDS = 5.0
+
+# Reminders sent together: one ledger lookup, one rendering pass and one status update per batch
+REMINDER_BATCH_SIZE = 500
+
+# Attempts per message before it is marked failed, and the pause before each retry (in seconds)
+REMINDER_MAX_ATTEMPTS = 3
+REMINDER_RETRY_DELAY_SECONDS = 5 * 60
+
+
+# --- Logging & Metrics (core/metrics.py) ---
+
+# Log level of the queued log writer (DEBUG shows a per-turn stage breakdown)
+LOG_LEVEL = "INFO"
+
+# Port of the /metrics (Prometheus) and /metrics.json scrape endpoint; None disables it
+METRICS_HTTP_PORT = None
+
+# Log a JSON metrics snapshot this often (in seconds); 0 disables the periodic dump
+METRICS_DUMP_INTERVAL_SECONDS = 0
+
+
+# --- Sharded Worker Processes (core/worker_pool.py) ---
+
+# Engine worker processes; each conversation is pinned to one of them by consistent hashing
+WORKER_PROCESSES = 4
+
+# Points per worker on the hash ring (more = more even spread of users)
+WORKER_VIRTUAL_NODES = 64
+
+# How often dead workers are detected and restarted (in seconds)
+WORKER_HEALTH_CHECK_SECONDS = 1.0
+
+# Grace period for a worker to finish its in-flight turns on shutdown (in seconds)
+WORKER_SHUTDOWN_TIMEOUT_SECONDS = 10.0
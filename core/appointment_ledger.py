@@ -0,0 +1,239 @@
+# core/appointment_ledger.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import APPOINTMENT_LEDGER_PATH, REMINDER_LEAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Slot times are stored as local 'YYYY-MM-DD HH:MM' text, which sorts chronologically
+SLOT_FORMAT = "%Y-%m-%d %H:%M"
+
+# Message kinds and the template each one is rendered from
+REMINDER_TEMPLATES = {
+    "confirmation": "APPOINTMENT_CONFIRMATION",
+    "reminder": "APPOINTMENT_REMINDER",
+}
+
+
+class AppointmentLedger:
+    """
+    Confirmed bookings and the messages still owed for them (a confirmation right away and a
+    reminder REMINDER_LEAD_SECONDS before the slot), in one SQLite database in WAL mode.
+
+    The ledger is the source of truth across restarts and engine processes: each clinic's
+    availability is rebuilt from it, and record_booking() checks for an overlapping booking
+    and inserts inside one write transaction, so two processes can never confirm the same slot.
+    Pending messages are indexed by due time, so the reminder scheduler only ever reads the
+    slice it is about to send.
+    """
+
+    def __init__(self, db_path: str = APPOINTMENT_LEDGER_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS appointments ("
+            " id INTEGER PRIMARY KEY,"
+            " tenant_id TEXT NOT NULL,"
+            " user_id TEXT NOT NULL,"
+            " name TEXT,"
+            " service TEXT,"
+            " starts_at TEXT NOT NULL,"
+            " ends_at TEXT NOT NULL,"
+            " language TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'booked',"
+            " created_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_appointments_slot ON appointments (tenant_id, starts_at);"
+            "CREATE TABLE IF NOT EXISTS reminders ("
+            " id INTEGER PRIMARY KEY,"
+            " appointment_id INTEGER NOT NULL REFERENCES appointments (id),"
+            " kind TEXT NOT NULL,"
+            " due_at REAL NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending',"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " sent_at REAL);"
+            "CREATE INDEX IF NOT EXISTS idx_reminders_due ON reminders (status, due_at);"
+        )
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # --- Bookings ---
+
+    def record_booking(self, tenant_id: str, user_id: str, name: Optional[str], service: Optional[str],
+                       starts_at: datetime, duration_minutes: int, language: str,
+                       reminder_lead: float = REMINDER_LEAD_SECONDS) -> Optional[int]:
+        """
+        Stores a booking with its confirmation and reminder. Returns the appointment id, or
+        None (and stores nothing) if the slot overlaps a booking of the same clinic.
+        """
+        start = starts_at.strftime(SLOT_FORMAT)
+        end = (starts_at + timedelta(minutes=duration_minutes)).strftime(SLOT_FORMAT)
+        now = time.time()
+        with self._transaction() as conn:
+            # Opening windows never cross midnight, so only the same day's bookings can overlap
+            clash = conn.execute(
+                "SELECT 1 FROM appointments WHERE tenant_id = ? AND starts_at >= ? AND starts_at < ?"
+                " AND ends_at > ? AND status = 'booked' LIMIT 1",
+                (tenant_id, starts_at.date().isoformat(), end, start),
+            ).fetchone()
+            if clash:
+                return None
+            appointment_id = conn.execute(
+                "INSERT INTO appointments (tenant_id, user_id, name, service, starts_at, ends_at, language, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (tenant_id, user_id, name, service, start, end, language, now),
+            ).lastrowid
+            reminders = [("confirmation", now)]
+            remind_at = starts_at.timestamp() - reminder_lead
+            if remind_at > now:
+                reminders.append(("reminder", remind_at))
+            conn.executemany(
+                "INSERT INTO reminders (appointment_id, kind, due_at) VALUES (?, ?, ?)",
+                [(appointment_id, kind, due_at) for kind, due_at in reminders],
+            )
+        return appointment_id
+
+    def cancel(self, appointment_id: int) -> bool:
+        """Cancels a booking and the messages not sent for it yet. Returns False if it was not booked."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE appointments SET status = 'cancelled' WHERE id = ? AND status = 'booked'", (appointment_id,)
+            )
+            conn.execute(
+                "UPDATE reminders SET status = 'cancelled' WHERE appointment_id = ? AND status = 'pending'",
+                (appointment_id,),
+            )
+        return cursor.rowcount > 0
+
+    def bookings(self, tenant_id: str, since: date) -> List[Tuple[datetime, Optional[str]]]:
+        """(start, service) of every booking of a clinic from `since` on, to rebuild its availability."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT starts_at, service FROM appointments WHERE tenant_id = ? AND status = 'booked'"
+                " AND starts_at >= ? ORDER BY starts_at",
+                (tenant_id, since.isoformat()),
+            ).fetchall()
+        return [(datetime.strptime(starts_at, SLOT_FORMAT), service) for starts_at, service in rows]
+
+    def booked_between(self, tenant_id: str, since: date, until: date) -> List[Tuple[datetime, Optional[str]]]:
+        """(start, service) of a clinic's bookings starting on days [since, until), e.g. those another process made."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT starts_at, service FROM appointments WHERE tenant_id = ? AND status = 'booked'"
+                " AND starts_at >= ? AND starts_at < ? ORDER BY starts_at",
+                (tenant_id, since.isoformat(), until.isoformat()),
+            ).fetchall()
+        return [(datetime.strptime(starts_at, SLOT_FORMAT), service) for starts_at, service in rows]
+
+    # --- Reminders ---
+
+    def max_reminder_id(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM reminders").fetchone()[0]
+
+    def pending_due_between(self, due_from: Optional[float], due_before: float) -> List[Tuple[int, float]]:
+        """(id, due_at) of the pending messages due in [due_from, due_before); due_from None = no lower bound."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, due_at FROM reminders WHERE status = 'pending' AND due_at >= ? AND due_at < ?",
+                (due_from if due_from is not None else float("-inf"), due_before),
+            ).fetchall()
+
+    def pending_added_between(self, after_id: int, up_to_id: int, due_before: float) -> List[Tuple[int, float]]:
+        """(id, due_at) of the pending messages with ids in (after_id, up_to_id], due before `due_before`."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, due_at FROM reminders WHERE id > ? AND id <= ? AND status = 'pending' AND due_at < ?",
+                (after_id, up_to_id, due_before),
+            ).fetchall()
+
+    def reminder_details(self, reminder_ids: Iterable[int]) -> List[Dict[str, Any]]:
+        """Everything needed to render and address a batch of messages, in one query."""
+        reminder_ids = list(reminder_ids)
+        if not reminder_ids:
+            return []
+        placeholders = ",".join("?" * len(reminder_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.id, r.kind, r.status, r.attempts, a.id, a.tenant_id, a.user_id, a.name, a.service,"
+                " a.starts_at, a.language, a.status"
+                " FROM reminders r JOIN appointments a ON a.id = r.appointment_id"
+                f" WHERE r.id IN ({placeholders})",
+                reminder_ids,
+            ).fetchall()
+        keys = ("id", "kind", "status", "attempts", "appointment_id", "tenant_id", "user_id", "name", "service",
+                "starts_at", "language", "appointment_status")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def finish(self, sent: Iterable[int] = (), retry: Dict[int, float] = None,
+               failed: Iterable[int] = (), skipped: Iterable[int] = ()):
+        """Records the outcome of a batch in one transaction; `retry` maps ids to their next due time."""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany("UPDATE reminders SET status = 'sent', attempts = attempts + 1, sent_at = ? WHERE id = ?",
+                             [(now, reminder_id) for reminder_id in sent])
+            conn.executemany("UPDATE reminders SET attempts = attempts + 1, due_at = ? WHERE id = ?",
+                             [(due_at, reminder_id) for reminder_id, due_at in (retry or {}).items()])
+            conn.executemany("UPDATE reminders SET status = 'failed', attempts = attempts + 1 WHERE id = ?",
+                             [(reminder_id,) for reminder_id in failed])
+            conn.executemany("UPDATE reminders SET status = 'skipped' WHERE id = ?",
+                             [(reminder_id,) for reminder_id in skipped])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- Default Ledger (selected in config/settings.py) ---
+
+_DEFAULT_LEDGER: Optional[AppointmentLedger] = None
+_DEFAULT_LEDGER_LOCK = threading.Lock()
+
+
+def get_appointment_ledger() -> Optional[AppointmentLedger]:
+    """Returns the process-wide ledger, opening it on first use (None if APPOINTMENT_LEDGER_PATH is unset)."""
+    global _DEFAULT_LEDGER
+    with _DEFAULT_LEDGER_LOCK:
+        if _DEFAULT_LEDGER is None and APPOINTMENT_LEDGER_PATH:
+            _DEFAULT_LEDGER = AppointmentLedger(APPOINTMENT_LEDGER_PATH)
+        return _DEFAULT_LEDGER
+
+
+def set_appointment_ledger(ledger: Optional[AppointmentLedger]):
+    """Replaces the process-wide ledger (e.g. a throwaway database for benchmarks), closing the old one."""
+    global _DEFAULT_LEDGER
+    with _DEFAULT_LEDGER_LOCK:
+        if _DEFAULT_LEDGER is not None and _DEFAULT_LEDGER is not ledger:
+            _DEFAULT_LEDGER.close()
+        _DEFAULT_LEDGER = ledger
+
+
+def close_appointment_ledger():
+    """Closes the process-wide ledger (call on shutdown)."""
+    global _DEFAULT_LEDGER
+    with _DEFAULT_LEDGER_LOCK:
+        if _DEFAULT_LEDGER is not None:
+            _DEFAULT_LEDGER.close()
+            _DEFAULT_LEDGER = None
@@ -0,0 +1,184 @@
+# core/availability.py
+import logging
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import SLOT_GRANULARITY_MINUTES, SLOT_DEFAULT_DURATION_MINUTES, SLOT_SEARCH_HORIZON_DAYS
+
+logger = logging.getLogger(__name__)
+
+DAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+DAY_MINUTES = 24 * 60
+
+TIME_TOKEN = r"\d{1,2}(?::\d{2})?\s*(?:am|pm)?"
+RANGE_PATTERN = re.compile(rf"({TIME_TOKEN})\s*(?:-|–|to)\s*({TIME_TOKEN})")
+DAY_GROUP_PATTERN = re.compile(r"([a-z]{3})[a-z]*(?:\s*(?:-|–|to)\s*([a-z]{3})[a-z]*)?")
+
+
+def _to_minutes(token: str) -> int:
+    """'17:30' -> 1050, '5 pm' -> 1020, '10' -> 600."""
+    match = re.match(r"(\d{1,2})(?::(\d{2}))?\s*(am|pm)?", token.strip())
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem == "pm" and hour != 12:
+        hour += 12
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    return hour * 60 + minute
+
+
+def parse_opening_hours(hours_text: str) -> Dict[int, List[Tuple[int, int]]]:
+    """
+    Parses clinic_info.hours, e.g. 'Mon-Fri: 10:00 - 14:00 & 17:00 - 20:00 (Evening Slot is by
+    Appointment Only)', into {weekday: [(start_minute, end_minute), ...]}. Weekdays that are not
+    mentioned (or say 'closed') are closed. Several day groups can be separated by ';' or '|'.
+    A window past midnight ('Fri: 20:00 - 02:00') is split at midnight, its early hours going
+    to the next day, so every window - and every booking - stays within one day.
+    """
+    schedule: Dict[int, List[Tuple[int, int]]] = {}
+    text = re.sub(r"\(.*?\)", "", hours_text.lower())
+    for group in re.split(r"[;|]", text):
+        first_digit = re.search(r"\d", group)
+        if not first_digit or not RANGE_PATTERN.search(group):
+            continue
+        # Day names come before the first time ('Mon-Fri: 10:00 - 14:00'); none means every day
+        days_part, ranges_part = group[:first_digit.start()], group[first_digit.start():]
+        if not any(first in DAY_NAMES for first, _ in DAY_GROUP_PATTERN.findall(days_part)):
+            days_part = "mon-sun"
+        weekdays = set()
+        for first, last in DAY_GROUP_PATTERN.findall(days_part):
+            if first not in DAY_NAMES:
+                continue
+            start = DAY_NAMES.index(first)
+            end = DAY_NAMES.index(last) if last in DAY_NAMES else start
+            weekdays.update(range(start, end + 1) if start <= end else list(range(start, 7)) + list(range(0, end + 1)))
+        windows = [(_to_minutes(a), _to_minutes(b)) for a, b in RANGE_PATTERN.findall(ranges_part)]
+        for weekday in weekdays:
+            for open_at, close_at in windows:
+                if open_at < close_at:
+                    schedule.setdefault(weekday, []).append((open_at, close_at))
+                    continue
+                schedule.setdefault(weekday, []).append((open_at, DAY_MINUTES))
+                if close_at > 0:
+                    schedule.setdefault((weekday + 1) % 7, []).append((0, close_at))
+    for weekday in schedule:
+        schedule[weekday].sort()
+    return schedule
+
+
+def parse_duration_minutes(duration_text: Optional[str]) -> int:
+    """'15 mins' -> 15, '1 hour' -> 60, '1.5 hrs' -> 90; unknown -> SLOT_DEFAULT_DURATION_MINUTES."""
+    if not duration_text:
+        return SLOT_DEFAULT_DURATION_MINUTES
+    match = re.search(r"(\d+(?:\.\d+)?)\s*(h|hr|hrs|hour|hours|m|min|mins|minute|minutes)?\b", str(duration_text).lower())
+    if not match:
+        return SLOT_DEFAULT_DURATION_MINUTES
+    value = float(match.group(1))
+    unit = match.group(2) or "min"
+    return int(round(value * 60)) if unit.startswith("h") else int(round(value))
+
+
+class AvailabilityEngine:
+    """
+    Opening hours and service durations parsed once from the business profile, plus one
+    sorted interval index of confirmed bookings per day. Intervals never overlap, so a slot
+    check is a single bisect into that day's start times (O(log n)), and the search for the
+    next free slots jumps straight past each booking it bumps into.
+    """
+
+    def __init__(self, business_data: dict):
+        # date -> parallel sorted lists of booking start / end minutes
+        self._starts: Dict[date, List[int]] = {}
+        self._ends: Dict[date, List[int]] = {}
+        self.load_profile(business_data)
+
+    def load_profile(self, business_data: dict):
+        """(Re)parses opening hours and durations, e.g. after a profile hot reload. Bookings are kept."""
+        schedule = parse_opening_hours(business_data.get('clinic_info', {}).get('hours', ''))
+        if not schedule:
+            # Unparseable hours: keep the historical rule (weekdays only, any time of day)
+            logger.warning("Could not parse clinic hours; assuming Mon-Fri, 00:00-24:00.")
+            schedule = {weekday: [(0, DAY_MINUTES)] for weekday in range(5)}
+        self.schedule = schedule
+        self.durations: Dict[str, int] = {
+            service['name']: parse_duration_minutes(service.get('duration'))
+            for service in business_data.get('services', []) or []
+        }
+
+    # --- Lookups ---
+
+    def duration_for(self, service: Optional[str]) -> int:
+        return self.durations.get(service, SLOT_DEFAULT_DURATION_MINUTES)
+
+    def within_opening_hours(self, day: date, start: int, end: int) -> bool:
+        """True if [start, end) minutes fit inside one opening window of that day."""
+        return any(open_at <= start and end <= close_at for open_at, close_at in self.schedule.get(day.weekday(), []))
+
+    def _overlapping_end(self, day: date, start: int, end: int) -> Optional[int]:
+        """Returns the end of a booking overlapping [start, end), or None if the slot is free."""
+        starts = self._starts.get(day)
+        if not starts:
+            return None
+        ends = self._ends[day]
+        index = bisect_right(starts, start)
+        # The booking starting at or before `start` overlaps if it ends after `start`
+        if index > 0 and ends[index - 1] > start:
+            return ends[index - 1]
+        # The next booking overlaps if it starts before `end`
+        if index < len(starts) and starts[index] < end:
+            return ends[index]
+        return None
+
+    def is_slot_free(self, slot: datetime, service: Optional[str] = None) -> bool:
+        start = slot.hour * 60 + slot.minute
+        end = start + self.duration_for(service)
+        return self.within_opening_hours(slot.date(), start, end) and self._overlapping_end(slot.date(), start, end) is None
+
+    # --- Bookings ---
+
+    def book(self, slot: datetime, service: Optional[str] = None) -> bool:
+        """Reserves the slot if it is free. Returns False (and changes nothing) otherwise."""
+        if not self.is_slot_free(slot, service):
+            return False
+        start = slot.hour * 60 + slot.minute
+        day = slot.date()
+        index = bisect_left(self._starts.setdefault(day, []), start)
+        self._starts[day].insert(index, start)
+        self._ends.setdefault(day, []).insert(index, start + self.duration_for(service))
+        return True
+
+    def release(self, slot: datetime):
+        """Frees a previously booked slot (e.g. after a cancellation)."""
+        day, start = slot.date(), slot.hour * 60 + slot.minute
+        starts = self._starts.get(day, [])
+        index = bisect_left(starts, start)
+        if index < len(starts) and starts[index] == start:
+            del starts[index]
+            del self._ends[day][index]
+
+    # --- Suggestions ---
+
+    def next_free_slots(self, after: datetime, service: Optional[str] = None, count: int = 3) -> List[datetime]:
+        """Returns up to `count` free slot start times at or after `after`, on the slot grid."""
+        duration = self.duration_for(service)
+        found: List[datetime] = []
+        for offset in range(SLOT_SEARCH_HORIZON_DAYS + 1):
+            day = after.date() + timedelta(days=offset)
+            earliest = (after.hour * 60 + after.minute) if offset == 0 else 0
+            for open_at, close_at in self.schedule.get(day.weekday(), []):
+                candidate = _round_up(max(open_at, earliest), SLOT_GRANULARITY_MINUTES)
+                while candidate + duration <= close_at:
+                    blocking_end = self._overlapping_end(day, candidate, candidate + duration)
+                    if blocking_end is None:
+                        found.append(datetime.combine(day, time(candidate // 60, candidate % 60)))
+                        if len(found) == count:
+                            return found
+                        candidate += SLOT_GRANULARITY_MINUTES
+                    else:
+                        candidate = _round_up(blocking_end, SLOT_GRANULARITY_MINUTES)
+        return found
+
+
+def _round_up(minute: int, granularity: int) -> int:
+    return -(-minute // granularity) * granularity
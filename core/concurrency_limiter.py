@@ -0,0 +1,176 @@
+# core/concurrency_limiter.py
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from .metrics import METRICS
+
+# Monotonic time by which the current turn must have its answer (None = no deadline)
+_turn_deadline: contextvars.ContextVar = contextvars.ContextVar("turn_deadline", default=None)
+
+
+# Weights of the newest sample in the latency averages that drive the limit. The baseline
+# moves slowly, so a sudden slowdown registers as congestion for a few hundred requests
+# before it is accepted as the new normal.
+RECENT_SMOOTHING = 0.1
+BASELINE_SMOOTHING = 0.002
+
+
+def _ewma(average: Optional[float], sample: float, weight: float) -> float:
+    return sample if average is None else average + weight * (sample - average)
+
+
+class LLMOverloaded(Exception):
+    """Raised instead of queueing an LLM request that could not be served in time."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"LLM request shed ({reason})")
+        self.reason = reason
+
+
+@contextmanager
+def turn_deadline(seconds: Optional[float]):
+    """Gives every LLM request made inside the block a shared deadline `seconds` from now."""
+    token = _turn_deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _turn_deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    return _turn_deadline.get()
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on concurrent LLM requests with a bounded FIFO wait queue.
+
+    Each completed request adjusts the limit. While the recent latency average stays within
+    `latency_tolerance` times the long-run baseline, it adds 1/limit (about +1 per limit's worth
+    of requests); once recent latency climbs above that, or a request fails on every provider,
+    the limit is multiplied by `backoff` (at most once per baseline latency, so one slow burst
+    does not collapse it to the floor). Single slow outliers are smoothed out. When a provider
+    slows down the limit shrinks and excess turns wait here instead of piling onto the provider.
+
+    acquire() raises LLMOverloaded right away when the wait queue is full or the queue ahead
+    cannot drain before the caller's deadline, and when the deadline passes while queued.
+    Waiters may live on different event loops; slots are handed over thread-safely.
+    """
+
+    def __init__(self, initial_limit: int, min_limit: int, max_limit: int, max_queue: int,
+                 latency_tolerance: float = 1.5, backoff: float = 0.9):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.baseline: Optional[float] = None   # long-run EWMA of response latency (seconds)
+        self.recent: Optional[float] = None     # fast EWMA of response latency (seconds)
+        self.in_flight = 0
+        self._waiters: deque = deque()          # (loop, future) in arrival order
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"admitted": 0, "queued": 0, "shed_queue_full": 0, "shed_deadline": 0, "decreases": 0}
+
+    # --- Admission ---
+
+    async def acquire(self, deadline: Optional[float] = None):
+        """Takes a slot, waiting in line if needed; raises LLMOverloaded instead of waiting in vain."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self.in_flight += 1
+                self.stats["admitted"] += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                self._shed("queue_full")
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining < self._expected_wait():
+                self._shed("deadline")
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+            self.stats["queued"] += 1
+
+        try:
+            await asyncio.wait_for(waiter, remaining)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._abandon(loop, waiter)
+                self._shed("deadline")
+        except asyncio.CancelledError:
+            with self._lock:
+                self._abandon(loop, waiter)
+            raise
+        with self._lock:
+            self.stats["admitted"] += 1
+
+    def release(self, latency: Optional[float] = None, failed: bool = False):
+        """Returns a slot and feeds the request's outcome into the limit (latency None = no signal)."""
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self._decrease()
+            elif latency is not None:
+                self.recent = _ewma(self.recent, latency, RECENT_SMOOTHING)
+                self.baseline = _ewma(self.baseline, latency, BASELINE_SMOOTHING)
+                if self.recent > self.baseline * self.latency_tolerance:
+                    self._decrease()
+                else:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._wake_waiters()
+
+    # --- Internals (call with the lock held) ---
+
+    def _shed(self, reason: str):
+        self.stats[f"shed_{reason}"] += 1
+        METRICS.increment("llm_shed_total", reason=reason)
+        raise LLMOverloaded(reason)
+
+    def _expected_wait(self) -> float:
+        """Rough time until a new arrival's answer: the queue ahead drains `limit` requests per latency."""
+        latency = self.baseline or 0.0
+        return latency * (1 + len(self._waiters) // max(1, int(self.limit)))
+
+    def _abandon(self, loop: asyncio.AbstractEventLoop, waiter: asyncio.Future):
+        try:
+            self._waiters.remove((loop, waiter))
+        except ValueError:
+            pass  # already picked for a slot: _grant() sees the cancelled future and passes it on
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < (self.baseline or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self.stats["decreases"] += 1
+
+    def _wake_waiters(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            loop, waiter = self._waiters.popleft()
+            self.in_flight += 1
+            loop.call_soon_threadsafe(self._grant, waiter)
+
+    def _grant(self, waiter: asyncio.Future):
+        if waiter.done():
+            # The waiter timed out or was cancelled after it was picked: hand the slot on
+            self.release()
+        else:
+            waiter.set_result(None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiters),
+                "baseline_ms": round(self.baseline * 1000, 2) if self.baseline is not None else None,
+                "recent_ms": round(self.recent * 1000, 2) if self.recent is not None else None,
+            }
@@ -0,0 +1,358 @@
+# core/conversation_engine.py
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from config.messages import PROMPTS
+from config.settings import (
+    SINGLE_CALL_TURN_MODE, DEFAULT_TENANT, LLM_TURN_DEADLINE_SECONDS, LANGUAGE_ID_MIN_CONFIDENCE,
+    SLOT_SEARCH_HORIZON_DAYS,
+)
+from handlers.booking_handler import is_clinic_open, suggest_alternatives, get_translated_error_response
+from .appointment_ledger import AppointmentLedger, get_appointment_ledger
+from .availability import AvailabilityEngine
+from .concurrency_limiter import LLMOverloaded, turn_deadline
+from .conversation_state import ConversationState
+from .intent_detector import extract_entities_async, extract_and_localize_async, generate_faq_response_async
+from .language_id import detect_language
+from .llm_client import LLMFallbackService, get_llm_client
+from .metrics import METRICS, record_stage, stage, trace_turn
+from .profile_registry import ProfileRegistry, CompiledProfile
+from .state_store import StateStore, get_state_store
+
+logger = logging.getLogger(__name__)
+
+# Reply templates the controller may send after a turn in each state (single-call turn mode)
+TURN_REPLY_TEMPLATES = {
+    "START": ["AWAITING_NAME"],
+    "AWAITING_NAME": ["AWAITING_SERVICE"],
+    "AWAITING_SERVICE": ["AWAITING_TIME", "SERVICE_NOT_FOUND"],
+    "AWAITING_TIME": ["SUCCESS_BOOKING", "PAST_DATE", "TOO_SOON", "CLOSED_HOURS", "SLOT_TAKEN", "ALTERNATIVE_SLOTS", "RETRY_TIME"],
+}
+
+
+class ConversationEngine:
+    """
+    Async, transport-agnostic booking controller.
+
+    Runs the deterministic state machine (START -> AWAITING_NAME -> AWAITING_SERVICE ->
+    AWAITING_TIME -> BOOKED) for any number of users on one event loop. Turns of the same
+    user are serialized by a per-user lock (asyncio.Lock wakes waiters in FIFO order), so two
+    messages from one number never race on its ConversationState, while different users
+    proceed concurrently. The CLI and the webhook front end both call handle_message().
+
+    One engine serves every clinic in its ProfileRegistry; a bare business_data dict is
+    wrapped in a single-tenant registry. Confirmed bookings are recorded in the appointment
+    ledger, which also restores each clinic's booked slots on start-up.
+    """
+
+    def __init__(self, business_data: dict = None, llm_client: LLMFallbackService = None,
+                 registry: ProfileRegistry = None, ledger: AppointmentLedger = None):
+        if registry is None:
+            registry = ProfileRegistry.from_business_data(business_data) if business_data is not None else ProfileRegistry()
+        self.registry = registry
+        self.llm_client = llm_client or get_llm_client()
+        self.ledger = ledger or get_appointment_ledger()
+        # Opening hours, service durations and the booked-interval index, per clinic
+        self._availability: Dict[str, AvailabilityEngine] = {}
+        self._availability_versions: Dict[str, float] = {}
+
+        # Per-user locks, dropped again once no turn of that user is running or waiting
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_waiters: Dict[str, int] = {}
+        self._purge_task: Optional[asyncio.Task] = None
+
+    # --- Tenants ---
+
+    @property
+    def business_data(self) -> dict:
+        """Business profile of the default clinic."""
+        return self.registry.get(DEFAULT_TENANT).business_data
+
+    @property
+    def availability(self) -> AvailabilityEngine:
+        """Availability of the default clinic."""
+        return self.availability_for(self.registry.get(DEFAULT_TENANT))
+
+    def availability_for(self, profile: CompiledProfile) -> AvailabilityEngine:
+        """Returns the clinic's availability, re-reading hours and durations after a profile reload."""
+        availability = self._availability.get(profile.tenant_id)
+        if availability is None:
+            availability = self._availability[profile.tenant_id] = AvailabilityEngine(profile.business_data)
+            if self.ledger is not None:
+                for slot, service in self.ledger.bookings(profile.tenant_id, since=date.today()):
+                    availability.book(slot, service)
+        elif self._availability_versions.get(profile.tenant_id) != profile.version:
+            availability.load_profile(profile.business_data)
+        self._availability_versions[profile.tenant_id] = profile.version
+        return availability
+
+    @staticmethod
+    def _state_key(user_id: str, tenant_id: str) -> str:
+        """Conversation key; the default clinic keeps plain user ids so existing state stays valid."""
+        return user_id if tenant_id == DEFAULT_TENANT else f"{tenant_id}:{user_id}"
+
+    # --- Per-user Serialization ---
+
+    @asynccontextmanager
+    async def _user_lock(self, user_id: str):
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        self._lock_waiters[user_id] = self._lock_waiters.get(user_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_waiters[user_id] -= 1
+            if self._lock_waiters[user_id] == 0:
+                del self._lock_waiters[user_id]
+                del self._locks[user_id]
+
+    # --- Public API ---
+
+    async def handle_message(self, user_id: str, user_msg: str, tenant_id: str = DEFAULT_TENANT) -> str:
+        """
+        Processes one inbound message for a clinic and returns the assistant's reply.
+        The turn's LLM requests share one deadline; if they are shed under overload the user
+        gets the LLM_FAILURE message straight from the translation cache and the state is unchanged.
+        """
+        key = self._state_key(user_id, tenant_id)
+        with trace_turn(key, tenant=tenant_id), turn_deadline(LLM_TURN_DEADLINE_SECONDS):
+            queued_at = time.perf_counter()
+            async with self._user_lock(key):
+                record_stage("lock_wait", time.perf_counter() - queued_at)
+                profile = self.registry.get(tenant_id)
+                # State is read and written in threads, so a slow store never stalls other users' turns
+                state_manager = await ConversationState.load_async(key)
+                try:
+                    return await self._run_turn(state_manager, user_msg, profile, user_id)
+                except LLMOverloaded as e:
+                    logger.warning(f"Turn of {key} shed: {e}")
+                    METRICS.increment("turns_shed_total", tenant=tenant_id)
+                    return self.llm_client.render_template_cached(
+                        "LLM_FAILURE", state_manager.context.get("language", "English"), contact=profile.contact
+                    )
+                finally:
+                    await state_manager.save_pending_async()
+                    self._purge_sessions_if_due()
+
+    async def reset(self, user_id: str, tenant_id: str = DEFAULT_TENANT):
+        """Clears the conversation of one user."""
+        key = self._state_key(user_id, tenant_id)
+        async with self._user_lock(key):
+            state_manager = await ConversationState.load_async(key)
+            state_manager.reset()
+            await state_manager.save_pending_async()
+
+    async def get_state(self, user_id: str, tenant_id: str = DEFAULT_TENANT) -> str:
+        """Returns the current state name of one user."""
+        key = self._state_key(user_id, tenant_id)
+        async with self._user_lock(key):
+            return (await ConversationState.load_async(key)).state
+
+    async def get_language(self, user_id: str, tenant_id: str = DEFAULT_TENANT) -> Optional[str]:
+        """The user's last detected language (None until one is known), e.g. as a transcription hint."""
+        key = self._state_key(user_id, tenant_id)
+        # Under the user's lock, so a running turn is never read half-way
+        async with self._user_lock(key):
+            return (await ConversationState.load_async(key)).context.get("language")
+
+    async def template_reply(self, user_id: str, template_id: str, tenant_id: str = DEFAULT_TENANT, **format_args) -> str:
+        """Renders a fixed template in the user's last known language, outside the state machine."""
+        language = await self.get_language(user_id, tenant_id) or "English"
+        return await self.llm_client.translate_template_async(template_id, language, **format_args)
+
+    # --- Session Expiry ---
+
+    def _purge_sessions_if_due(self):
+        """Deletes expired sessions in a thread, at most once per the store's purge interval."""
+        store = get_state_store()
+        if store.purge_due() and (self._purge_task is None or self._purge_task.done()):
+            self._purge_task = asyncio.ensure_future(self._purge_sessions(store))
+
+    @staticmethod
+    async def _purge_sessions(store: StateStore):
+        try:
+            await asyncio.to_thread(store.purge_if_due)
+        except Exception:
+            logger.exception("Expired session purge failed")
+
+    # --- Extraction ---
+
+    async def _extract(self, state_manager: ConversationState, user_msg: str, profile: CompiledProfile,
+                       language_known: bool = False) -> dict:
+        """
+        Plain extraction, or - in single-call turn mode - extraction plus translation of the
+        candidate next replies in the same LLM request.
+        """
+        if not SINGLE_CALL_TURN_MODE or state_manager.state not in TURN_REPLY_TEMPLATES:
+            return await extract_entities_async(user_msg, state_manager.state, profile, self.llm_client)
+        return await extract_and_localize_async(
+            user_msg, state_manager.state, profile,
+            state_manager.context.get("language", "English"),
+            TURN_REPLY_TEMPLATES[state_manager.state],
+            self.llm_client,
+            language_known,
+        )
+
+    # --- Main Controller Logic ---
+
+    async def _run_turn(self, state_manager: ConversationState, user_msg: str, profile: CompiledProfile,
+                        user_id: str) -> str:
+        biz_data = profile.business_data
+        availability = self.availability_for(profile)
+
+        # 0. Identify the language locally; only uncertain messages leave it to the LLM
+        local_lang = detect_language(user_msg, LANGUAGE_ID_MIN_CONFIDENCE)
+        if local_lang:
+            state_manager.context['language'] = local_lang
+
+        # 1. Extract Entities and Intent (LLM Call)
+        with stage("extraction"):
+            llm_output = await self._extract(state_manager, user_msg, profile, language_known=local_lang is not None)
+
+        # Check for LLM Failure (Centralized Error Handling)
+        if llm_output.get("intent") == "LLM_FAILURE":
+            return await self.llm_client.translate_template_async(
+                "LLM_FAILURE", state_manager.context.get("language", "English"),
+                contact=profile.contact
+            )
+
+        # --- Multilingual & Context Setup ---
+        user_lang = local_lang or llm_output.get("detected_language") or state_manager.context.get("language", "English")
+        state_manager.context['language'] = user_lang
+
+        # Variables for prompt formatting (precomputed per profile version)
+        services_text = profile.services_text
+        hours = profile.hours
+
+        # 2. Deterministic State Progression
+        response_text = ""
+        current_intent = (llm_output.get("intent") or "OTHER").upper()
+
+        # --- START -> AWAITING_NAME ---
+        if not state_manager.is_booking_in_progress() and current_intent == "BOOKING":
+            state_manager.update_state("AWAITING_NAME")
+            response_text = await self.llm_client.translate_template_async("AWAITING_NAME", user_lang)
+
+        # --- AWAITING_NAME State ---
+        elif state_manager.state == "AWAITING_NAME":
+            extracted_name = llm_output.get("name")
+            if extracted_name:
+                state_manager.update_state("AWAITING_SERVICE", {"name": extracted_name})
+
+                response_text = await self.llm_client.translate_template_async(
+                    "AWAITING_SERVICE", user_lang,
+                    name=extracted_name,
+                    services_list=services_text
+                )
+            else:
+                response_text = PROMPTS["RETRY_NAME"]
+
+        # --- AWAITING_SERVICE State ---
+        elif state_manager.state == "AWAITING_SERVICE":
+            service = llm_output.get("service_request")
+
+            if service and service in profile.valid_services:
+                state_manager.update_state("AWAITING_TIME", {"service": service})
+
+                response_text = await self.llm_client.translate_template_async(
+                    "AWAITING_TIME", user_lang,
+                    service=service,
+                    hours=hours
+                )
+            else:
+                response_text = await self.llm_client.translate_template_async(
+                    "SERVICE_NOT_FOUND", user_lang,
+                    services_list=services_text
+                )
+
+        # --- AWAITING_TIME State (Validation Hub) ---
+        elif state_manager.state == "AWAITING_TIME":
+            date = llm_output.get("date")
+            time = llm_output.get("time")
+
+            if date and time:
+                requested_service = state_manager.context.get("service")
+                with stage("validation"):
+                    validation_result = is_clinic_open(date, time, biz_data, availability, requested_service)
+
+                if validation_result["valid"]:
+                    slot = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+                    # Reserve before the next await, so no concurrent turn can take the same slot
+                    if not availability.book(slot, requested_service):
+                        validation_result = {"valid": False, "reason": "SLOT_TAKEN"}
+                    elif not await self._record_booking(state_manager, profile, user_id, slot, requested_service, user_lang):
+                        # Another engine process confirmed an overlapping booking first
+                        availability.release(slot)
+                        validation_result = {"valid": False, "reason": "SLOT_TAKEN"}
+
+                if validation_result["valid"]:
+                    # SUCCESS: Book and Reset
+                    METRICS.increment("bookings_total", tenant=profile.tenant_id)
+                    # BOOKED is left again in this same turn, so only the reset below is persisted
+                    state_manager.update_state("BOOKED", {"date": date, "time": time}, persist=False)
+                    final_name = state_manager.context.get("name", "Patient")
+                    final_service = state_manager.context.get("service", "consultation")
+
+                    response_text = await self.llm_client.translate_template_async(
+                        "SUCCESS_BOOKING", user_lang,
+                        service=final_service, date=date, time=time, name=final_name
+                    )
+                    state_manager.reset()
+
+                else:
+                    # FAILURE PATH
+                    state_manager.update_state("AWAITING_TIME")
+
+                    # Other engine processes may have booked since this one loaded the clinic
+                    await self._sync_bookings(profile, availability, date)
+                    alternatives = suggest_alternatives(date, time, availability, requested_service)
+                    response_text = await get_translated_error_response(
+                        validation_result, biz_data, user_lang, self.llm_client, alternatives
+                    )
+
+            else:
+                # If date/time was not extracted, retry the prompt
+                response_text = await self.llm_client.translate_template_async("RETRY_TIME", user_lang)
+
+        # --- Default/FAQ Handling ---
+        else:
+            with stage("faq"):
+                response_text = await generate_faq_response_async(user_msg, profile, user_lang, self.llm_client)
+            if not state_manager.is_booking_in_progress():
+                state_manager.update_state("START")
+
+        return response_text
+
+    async def _sync_bookings(self, profile: CompiledProfile, availability: AvailabilityEngine, requested_date: str):
+        """Adds the ledger's bookings in the alternative-slot search window to the local index."""
+        if self.ledger is None:
+            return
+        try:
+            since = max(datetime.strptime(requested_date, "%Y-%m-%d").date(), date.today())
+        except (TypeError, ValueError):
+            since = date.today()
+        bookings = await asyncio.to_thread(
+            self.ledger.booked_between, profile.tenant_id, since, since + timedelta(days=SLOT_SEARCH_HORIZON_DAYS + 1)
+        )
+        for slot, service in bookings:
+            # Already-known bookings overlap themselves and are refused, so this only adds new ones
+            availability.book(slot, service)
+
+    async def _record_booking(self, state_manager: ConversationState, profile: CompiledProfile, user_id: str,
+                              slot: datetime, service: str, language: str) -> bool:
+        """Stores the booking and its confirmation/reminder in the ledger; False if the slot was taken meanwhile."""
+        if self.ledger is None:
+            return True
+        # The write transaction may wait on other processes' locks, so keep it off the event loop
+        appointment_id = await asyncio.to_thread(
+            self.ledger.record_booking, profile.tenant_id, user_id, state_manager.context.get("name"), service,
+            slot, self.availability_for(profile).duration_for(service), language,
+        )
+        if appointment_id is None:
+            METRICS.increment("booking_conflicts_total", tenant=profile.tenant_id)
+            return False
+        return True
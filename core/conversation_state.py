@@ -1,63 +1,87 @@
 # core/conversation_state.py
-import json
-import os
+import asyncio
+import logging
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-# Define the location for state files (one file per user/phone number)
-STATE_DIR = "data/conversations"
-os.makedirs(STATE_DIR, exist_ok=True)
-STATE_FILE_PATH = os.path.join(STATE_DIR, "{user_id}.json")
+from .metrics import stage
+from .state_store import StateStore, get_state_store
+
+logger = logging.getLogger(__name__)
 
 class ConversationState:
-    
+
     # Define States for the Booking Workflow
-    STATES = ["START", "AWAITING_NAME", "AWAITING_SERVICE", "AWAITING_TIME", 
+    STATES = ["START", "AWAITING_NAME", "AWAITING_SERVICE", "AWAITING_TIME",
               "CONFIRMATION", "BOOKED", "FAQ_MODE", "ESCALATED"]
 
-    def __init__(self, user_id: str):
+    # Context keys that describe the patient rather than the booking, kept across reset()
+    PERSISTENT_CONTEXT_KEYS = ["language"]
+
+    def __init__(self, user_id: str, store: StateStore = None, defer_saves: bool = False, load: bool = True):
         self.user_id = user_id
+        # Storage backend (SQLite / in-memory write-behind / JSON files, see config/settings.py)
+        self.store = store or get_state_store()
         self.state: str = "START"
         # Context stores extracted data: name, service, date, etc.
         self.context: Dict[str, Any] = {}
-        self._load_state()
+        # Async callers keep store I/O off the event loop: saves wait for save_pending_async()
+        self.defer_saves = defer_saves
+        self._pending_save: Optional[Dict[str, Any]] = None
+        if load:
+            self._load_state()
 
-    def _get_file_path(self):
-        return STATE_FILE_PATH.format(user_id=self.user_id)
+    @classmethod
+    async def load_async(cls, user_id: str, store: StateStore = None) -> "ConversationState":
+        """Loads the state in a thread; saves are deferred until save_pending_async()."""
+        state = cls(user_id, store, defer_saves=True, load=False)
+        await asyncio.to_thread(state._load_state)
+        return state
 
     def _load_state(self):
-        try:
-            with open(self._get_file_path(), 'r') as f:
-                data = json.load(f)
-                self.state = data.get("state", "START")
-                self.context = data.get("context", {})
-        except (FileNotFoundError, json.JSONDecodeError):
-            # State file doesn't exist or is invalid, start fresh
-            pass
+        with stage("state_load"):
+            data = self.store.load(self.user_id)
+        if data:
+            self.state = data.get("state", "START")
+            # Copy, so in-memory stores never see unsaved mutations
+            self.context = dict(data.get("context", {}))
 
     def save_state(self):
         data = {
             "state": self.state,
             "last_updated": datetime.now().isoformat(),
-            "context": self.context
+            "context": dict(self.context)
         }
-        with open(self._get_file_path(), 'w') as f:
-            json.dump(data, f, indent=4)
+        if self.defer_saves:
+            self._pending_save = data
+            return
+        with stage("state_save"):
+            self.store.save(self.user_id, data)
+
+    async def save_pending_async(self):
+        """Writes the latest deferred save (if any) in a thread."""
+        data, self._pending_save = self._pending_save, None
+        if data is not None:
+            with stage("state_save"):
+                await asyncio.to_thread(self.store.save, self.user_id, data)
 
-    def update_state(self, new_state: str, context_updates: Dict[str, Any] = None):
+    def update_state(self, new_state: str, context_updates: Dict[str, Any] = None, persist: bool = True):
+        """Moves to `new_state`. persist=False skips the write for transient states that are left in the same turn."""
         if new_state not in self.STATES:
-            print(f"ERROR: Invalid state '{new_state}' requested.")
+            logger.error(f"Invalid state '{new_state}' requested.")
             return
 
-        print(f"DEBUG: State transition: {self.state} -> {new_state}")
+        logger.debug(f"State transition: {self.state} -> {new_state}")
         self.state = new_state
         if context_updates:
             self.context.update(context_updates)
-        self.save_state()
+        if persist:
+            self.save_state()
 
     def is_booking_in_progress(self) -> bool:
         return self.state in ["AWAITING_NAME", "AWAITING_SERVICE", "AWAITING_TIME", "CONFIRMATION"]
 
     def reset(self):
-        """Resets the state, typically after booking or timeout."""
-        self.update_state("START", context_updates={})
\ No newline at end of file
+        """Resets the state and clears booking details, typically after booking or timeout."""
+        self.context = {key: self.context[key] for key in self.PERSISTENT_CONTEXT_KEYS if key in self.context}
+        self.update_state("START")
@@ -0,0 +1,256 @@
+# core/entity_extractor.py
+import re
+from datetime import date, timedelta
+from difflib import SequenceMatcher
+from typing import Dict, Any, List, Optional, Tuple
+
+from config.settings import ENTITY_FAST_PATH_MIN_CONFIDENCE
+
+# --- Vocabulary (English, romanized Hinglish and Devanagari) ---
+
+RELATIVE_DAYS = [
+    # Longest phrases first, so "day after tomorrow" is not read as "tomorrow"
+    ("day after tomorrow", 2), ("parso", 2), ("parson", 2), ("parsoon", 2), ("परसों", 2),
+    ("tomorrow", 1), ("tmrw", 1), ("tmr", 1), ("kal", 1), ("कल", 1),
+    ("today", 0), ("tonight", 0), ("aaj", 0), ("आज", 0),
+]
+
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "somvar": 0, "somwar": 0, "सोमवार": 0,
+    "tuesday": 1, "tue": 1, "tues": 1, "mangalvar": 1, "mangalwar": 1, "मंगलवार": 1,
+    "wednesday": 2, "wed": 2, "budhvar": 2, "budhwar": 2, "बुधवार": 2,
+    "thursday": 3, "thu": 3, "thurs": 3, "guruvar": 3, "guruwar": 3, "गुरुवार": 3,
+    "friday": 4, "fri": 4, "shukravar": 4, "shukrawar": 4, "शुक्रवार": 4,
+    "saturday": 5, "sat": 5, "shanivar": 5, "shaniwar": 5, "शनिवार": 5,
+    "sunday": 6, "sun": 6, "ravivar": 6, "raviwar": 6, "itwar": 6, "रविवार": 6,
+}
+
+# Every accepted spelling, so words that merely start like a month ("maybe", "decide") are not dates
+MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3, "apr": 4, "april": 4,
+    "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7, "aug": 8, "august": 8,
+    "sep": 9, "sept": 9, "september": 9, "oct": 10, "october": 10, "nov": 11, "november": 11,
+    "dec": 12, "december": 12,
+}
+
+# Day-period words that settle AM/PM for "5 baje"-style times
+MORNING_WORDS = ["morning", "subah", "subha", "सुबह"]
+AFTERNOON_WORDS = ["afternoon", "dopahar", "dopehar", "दोपहर"]
+EVENING_WORDS = ["evening", "shaam", "sham", "शाम", "night", "tonight", "raat", "रात"]
+
+_WORD = r"(?<![\w\u0900-\u097f]){}(?![\w\u0900-\u097f])"  # word boundary that also respects Devanagari
+_MONTH_NAME = r"(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\b"
+_NOT_A_TIME = r"(?!\s*(?:[ap]\.?m\b|baje|bje|बजे|o'?\s?clock))"  # "5-6 pm", "may 5 pm" are times, not dates
+
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+# Indian day-first order; never part of a clock time such as "10:30-11:30"
+NUMERIC_DATE = re.compile(r"(?<![:.])\b(\d{1,2})[/-](\d{1,2})(?:[/-](\d{2,4}))?\b(?![:.]\d)" + _NOT_A_TIME)
+DAY_MONTH = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?" + _MONTH_NAME + r"\.?(?:,?\s+(\d{4}))?\b")
+MONTH_DAY = re.compile(r"\b" + _MONTH_NAME + r"\.?\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?\b" + _NOT_A_TIME)
+
+MERIDIEM = r"(a\.?m\.?|p\.?m\.?)"
+CLOCK_TIME = re.compile(r"\b(\d{1,2})[:.](\d{2})\s*" + MERIDIEM + r"?(?![\w])")
+HOUR_MERIDIEM = re.compile(r"\b(\d{1,2})\s*" + MERIDIEM + r"(?![\w])")
+HOUR_BAJE = re.compile(r"(?:\b(saadhe|sadhe|sawa|sava|paune|pone)\s+)?\b(\d{1,2})\s*(?:baje|bje|बजे|o'?\s?clock)")
+TIME_RANGE = re.compile(r"\b(\d{1,2})(?:[:.](\d{2}))?\s*(?:-|–|to)\s*(\d{1,2})(?:[:.]\d{2})?\s*(a\.?m\.?|p\.?m\.?|baje|bje|बजे)")
+FRACTION_HOUR = re.compile(r"\b(saadhe|sadhe|sawa|sava|paune|pone)\s+(\d{1,2})\b")
+
+# Minutes implied by Hinglish fractions: saadhe 5 = 5:30, sawa 5 = 5:15, paune 5 = 4:45
+FRACTIONS = {"saadhe": (0, 30), "sadhe": (0, 30), "sawa": (0, 15), "sava": (0, 15), "paune": (-1, 45), "pone": (-1, 45)}
+
+
+def _contains_word(text: str, word: str) -> bool:
+    return re.search(_WORD.format(re.escape(word)), text) is not None
+
+
+def _remove_word(text: str, word: str) -> str:
+    return re.sub(_WORD.format(re.escape(word)), " ", text, count=1)
+
+
+# --- Dates ---
+
+def _future_date(year: Optional[int], month: int, day: int, today: date) -> Optional[date]:
+    """Builds a date; without an explicit year, picks the next occurrence from today."""
+    try:
+        if year is not None:
+            return date(year if year > 99 else 2000 + year, month, day)
+        candidate = date(today.year, month, day)
+        if candidate < today:
+            candidate = date(today.year + 1, month, day)
+        return candidate
+    except ValueError:
+        return None
+
+
+def extract_date(text: str, today: date = None) -> Tuple[Optional[date], float, str]:
+    """
+    Returns (date, confidence, remaining_text). The matched date phrase is removed from the
+    remaining text, so its digits are not mistaken for a time afterwards.
+    """
+    today = today or date.today()
+    lowered = text.lower()
+
+    match = ISO_DATE.search(lowered)
+    if match:
+        resolved = _future_date(int(match.group(1)), int(match.group(2)), int(match.group(3)), today)
+        return resolved, (1.0 if resolved else 0.0), lowered[:match.start()] + " " + lowered[match.end():]
+
+    for pattern, day_group, month_group, year_group in ((DAY_MONTH, 1, 2, 3), (MONTH_DAY, 2, 1, 3)):
+        match = pattern.search(lowered)
+        if match:
+            year = int(match.group(year_group)) if match.group(year_group) else None
+            resolved = _future_date(year, MONTHS[match.group(month_group)], int(match.group(day_group)), today)
+            return resolved, (1.0 if resolved else 0.0), lowered[:match.start()] + " " + lowered[match.end():]
+
+    # Day words before bare numbers: in "tomorrow 5-6 pm" the numbers are the time
+    for phrase, offset in RELATIVE_DAYS:
+        if _contains_word(lowered, phrase):
+            return today + timedelta(days=offset), 1.0, _remove_word(lowered, phrase)
+
+    for word, weekday in WEEKDAYS.items():
+        if _contains_word(lowered, word):
+            days_ahead = (weekday - today.weekday()) % 7 or 7
+            return today + timedelta(days=days_ahead), 1.0, _remove_word(lowered, word)
+
+    match = NUMERIC_DATE.search(lowered)
+    if match:
+        year = int(match.group(3)) if match.group(3) else None
+        resolved = _future_date(year, int(match.group(2)), int(match.group(1)), today)
+        # Day-first is the local convention, but 3/4 could still be read either way
+        confidence = 1.0 if resolved and (int(match.group(1)) > 12 or match.group(1) == match.group(2)) else 0.7
+        return resolved, (confidence if resolved else 0.0), lowered[:match.start()] + " " + lowered[match.end():]
+
+    return None, 0.0, lowered
+
+
+# --- Times ---
+
+def _apply_period(hour: int, text: str) -> Tuple[int, bool]:
+    """Applies a day-period word (subah/shaam/...) to a 12-hour clock value."""
+    if any(_contains_word(text, w) for w in MORNING_WORDS):
+        return (0 if hour == 12 else hour), True
+    if any(_contains_word(text, w) for w in AFTERNOON_WORDS + EVENING_WORDS):
+        return (hour if hour == 12 or hour >= 13 else hour + 12), True
+    return hour, False
+
+
+def _apply_meridiem(hour: int, meridiem: Optional[str]) -> Optional[int]:
+    if not meridiem:
+        return hour
+    if not 1 <= hour <= 12:
+        return None
+    if meridiem.startswith("p"):
+        return hour if hour == 12 else hour + 12
+    return 0 if hour == 12 else hour
+
+
+def _range_start(match: re.Match) -> str:
+    """'5-6 pm' -> '5 pm', '11-1 pm' -> '11 am': the start of a range, with the end's AM/PM."""
+    start, minutes, end, suffix = int(match.group(1)), match.group(2), int(match.group(3)), match.group(4)
+    if suffix[0] in "ap" and start % 12 > end % 12:
+        suffix = "am" if suffix.startswith("p") else "pm"
+    return f"{start}{':' + minutes if minutes else ''} {suffix}"
+
+
+def extract_time(text: str, context: str = "") -> Tuple[Optional[str], float]:
+    """
+    Returns (HH:MM in 24-hour format, confidence). Bare '5:30' without AM/PM is low confidence.
+    A range ('5-6 pm') yields its start. `context` is the full message, searched for
+    day-period words such as 'tonight' or 'shaam'.
+    """
+    lowered = TIME_RANGE.sub(_range_start, text.lower(), count=1)
+
+    if _contains_word(lowered, "noon") or _contains_word(lowered, "midday"):
+        return "12:00", 1.0
+
+    hour = minute = None
+    explicit = False
+    match = CLOCK_TIME.search(lowered)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2))
+        meridiem = match.group(3)
+        # A leading zero ("09:30") or an hour past 12 is already 24-hour notation
+        explicit = bool(meridiem) or hour >= 13 or hour == 0 or match.group(1).startswith("0")
+        hour = _apply_meridiem(hour, meridiem)
+    else:
+        match = HOUR_MERIDIEM.search(lowered)
+        if match:
+            hour, minute, explicit = _apply_meridiem(int(match.group(1)), match.group(2)), 0, True
+        else:
+            match = HOUR_BAJE.search(lowered) or FRACTION_HOUR.search(lowered)
+            if match:
+                fraction = match.group(1)
+                hour_shift, minute = FRACTIONS.get(fraction, (0, 0))
+                hour = int(match.group(2)) + hour_shift
+                if hour == 0:
+                    hour = 12
+
+    if hour is None or minute is None:
+        return None, 0.0
+
+    if not explicit and hour <= 12:
+        hour, explicit = _apply_period(hour, f"{lowered} {context.lower()}")
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        return None, 0.0
+    return f"{hour:02d}:{minute:02d}", (1.0 if explicit else 0.6)
+
+
+# --- Services ---
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"[a-z]+", text.lower())
+
+
+def _similar(word: str, candidate: str) -> bool:
+    if word == candidate:
+        return True
+    # Shared stems ("vaccine" / "vaccination", "paediatric" / "pediatric") and small typos
+    if len(word) >= 5 and len(candidate) >= 5 and (word.startswith(candidate[:5]) or candidate.startswith(word[:5])):
+        return True
+    return SequenceMatcher(None, word, candidate).ratio() >= 0.85
+
+
+def match_service(text: str, service_names: List[str]) -> Tuple[Optional[str], float]:
+    """
+    Fuzzy-matches the message against the configured services.
+    Confidence is 1.0 when every word of one service name is present, 0.85 when some of its
+    words are present and no other service matches at all, and low when it is ambiguous.
+    """
+    words = _tokens(text)
+    scores = []
+    for name in service_names:
+        name_tokens = _tokens(name)
+        matched = sum(1 for token in name_tokens if any(_similar(word, token) for word in words))
+        scores.append((matched / len(name_tokens) if name_tokens else 0.0, name))
+
+    scores.sort(reverse=True)
+    if not scores or scores[0][0] == 0:
+        return None, 0.0
+    best_coverage, best_name = scores[0]
+    runner_up = scores[1][0] if len(scores) > 1 else 0.0
+    if best_coverage == 1.0 and runner_up < 1.0:
+        return best_name, 1.0
+    if runner_up == 0.0:
+        return best_name, 0.85
+    return best_name, 0.4
+
+
+# --- Fast Path Entry Point ---
+
+def pre_extract(user_input: str, current_state: str, service_names: List[str], today: date = None) -> Optional[Dict[str, Any]]:
+    """
+    Rule-based extraction for AWAITING_SERVICE and AWAITING_TIME. Returns the entity dict in
+    the same shape as the LLM extraction when confident, otherwise None (ask the LLM).
+    """
+    if current_state == "AWAITING_SERVICE":
+        service, confidence = match_service(user_input, service_names)
+        if service and confidence >= ENTITY_FAST_PATH_MIN_CONFIDENCE:
+            return {"service_request": service}
+
+    elif current_state == "AWAITING_TIME":
+        booking_date, date_confidence, remainder = extract_date(user_input, today)
+        booking_time, time_confidence = extract_time(remainder, context=user_input)
+        if booking_date and booking_time and min(date_confidence, time_confidence) >= ENTITY_FAST_PATH_MIN_CONFIDENCE:
+            return {"date": booking_date.isoformat(), "time": booking_time}
+
+    return None
@@ -1,17 +1,21 @@
 # core/intent_detector.py (Refactored)
 import json
+import logging
 import os
 from datetime import datetime
-from .llm_client import LLMFallbackService # Import the new service
+from .llm_client import get_llm_client, is_source_language, TEMPLATE_CATALOGUE, NO_PROVIDER, SOURCE_LANGUAGE
+from .profile_registry import CompiledProfile, as_compiled_profile
+from .entity_extractor import pre_extract
+from .json_repair import repair_json, validate_fields
+from .metrics import METRICS
+from config.settings import FAQ_TOP_K
 
-# The LLM_CLIENT is now initialized once
-LLM_CLIENT = LLMFallbackService()
+logger = logging.getLogger(__name__)
 
-# --- Helper function for structured extraction (using the client) ---
+# --- Extraction Schema & Prompt (shared by the plain and single-call extraction) ---
 
-def extract_entities_sync(user_input: str, current_state: str, business_data: dict) -> dict:
-    
-    # ... (Schema definition and System Prompt remain the same as the last successful version) ...
+def _get_extraction_schema(current_state: str) -> dict:
+    """Returns the JSON schema the LLM must fill for the current state."""
     if current_state in ["START", "AWAITING_NAME"]:
         json_schema = {
             "intent": "string (BOOKING, FAQ, ESCALATION, GREETING, OTHER)",
@@ -32,68 +36,256 @@ def extract_entities_sync(user_input: str, current_state: str, business_data: di
         }
     else:
         json_schema = {"intent": "string (FALLBACK)"}
+    return json_schema
+
+# --- Extraction Validation (one validator per schema field; ValueError = ask again) ---
+
+INTENTS = {"BOOKING", "FAQ", "ESCALATION", "GREETING", "OTHER", "FALLBACK"}
+
+def _optional_text(value):
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        value = str(value)
+    if not isinstance(value, str):
+        raise ValueError(f"expected a string, got {type(value).__name__}")
+    value = value.strip()
+    return None if value.lower() in ("", "null", "none") else value
+
+def _intent(value):
+    text = _optional_text(value)
+    if text is None:
+        return None
+    return text.upper() if text.upper() in INTENTS else "OTHER"
 
-    # --- System Prompt Construction (CRITICAL INSTRUCTION FOR DATE/TIME and Multilingual) ---
-    current_datetime = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    system_prompt = f"""
+def _iso_date(value):
+    text = _optional_text(value)
+    return None if text is None else datetime.strptime(text, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+def _clock_time(value):
+    text = _optional_text(value)
+    return None if text is None else datetime.strptime(text, "%H:%M").strftime("%H:%M")
+
+FIELD_VALIDATORS = {"intent": _intent, "date": _iso_date, "time": _clock_time}
+
+def _validators(json_schema: dict) -> dict:
+    return {field: FIELD_VALIDATORS.get(field, _optional_text) for field in json_schema}
+
+# Stand-ins filled per request in prompts that are prebuilt once per profile
+CURRENT_DATE_TOKEN = "<<CURRENT_DATE>>"
+RELEVANT_INFO_TOKEN = "<<RELEVANT_INFO>>"
+
+def _build_extraction_prompt(current_state: str, profile: CompiledProfile) -> str:
+    """System Prompt Construction (CRITICAL INSTRUCTION FOR DATE/TIME and Multilingual)."""
+    return f"""
     You are a precise data extraction tool for a clinic.
     Your current task is to extract information from the user's message based on the current conversation state ('{current_state}').
     
-    **CRITICAL INSTRUCTION FOR DATE/TIME:** If the user uses relative terms like 'tomorrow', 'next week', 'tonight', or '5:30 PM', you MUST resolve them to the current, absolute date and time formats (YYYY-MM-DD and HH:MM 24-hour format) based on the current date: {datetime.now().strftime('%Y-%m-%d')}.
+    **CRITICAL INSTRUCTION FOR DATE/TIME:** If the user uses relative terms like 'tomorrow', 'next week', 'tonight', or '5:30 PM', you MUST resolve them to the current, absolute date and time formats (YYYY-MM-DD and HH:MM 24-hour format) based on the current date: {CURRENT_DATE_TOKEN}.
     
-    CLINIC DETAILS: {json.dumps(business_data.get('clinic_info', {}))}
-    CLINIC SERVICES: {[s['name'] for s in business_data.get('services', [])]}
+    CLINIC DETAILS: {json.dumps(profile.clinic_info)}
+    CLINIC SERVICES: {profile.services_list}
     
     Output MUST be a single, valid JSON object that strictly follows the REQUIRED JSON SCHEMA.
     Do NOT include any other text, markdown, or reasoning. Return null for missing fields.
     """
-    
+
+def _get_extraction_prompt(current_state: str, profile: CompiledProfile) -> str:
+    """Returns the prebuilt extraction prompt of a profile with today's date filled in."""
+    key = ("extract", current_state)
+    template = profile.prompt_cache.get(key)
+    if template is None:
+        template = profile.prompt_cache[key] = _build_extraction_prompt(current_state, profile)
+    return template.replace(CURRENT_DATE_TOKEN, datetime.now().strftime('%Y-%m-%d'))
+
+# --- Helper function for structured extraction (using the client) ---
+
+async def _request_entities(user_input: str, current_state: str, profile: CompiledProfile, json_schema: dict,
+                           llm_client):
+    """One structured extraction request. Returns the (repaired) JSON object, {} if nothing
+    could be salvaged from the answer, or None if no provider answered at all."""
     messages = [
-        {"role": "system", "content": system_prompt},
+        {"role": "system", "content": _get_extraction_prompt(current_state, profile)},
         {"role": "user", "content": f"User Input: '{user_input}'. REQUIRED JSON SCHEMA: {json_schema}"}
     ]
+    llm_result = await llm_client.get_response_async(messages, structured=True)
+    logger.debug(f"LLM Provider Used: {llm_result['provider']}")
+    if llm_result['provider'] == NO_PROVIDER:
+        return None
 
-    # Use the Fallback Service to get a structured JSON response
-    llm_result = LLM_CLIENT.get_response_sync(messages, structured=True)
+    data, repairs = repair_json(llm_result['content'])
+    if data is None:
+        logger.warning(f"Unusable JSON from {llm_result['provider']}: {llm_result['content'][:200]!r}")
+        return {}
+    if repairs:
+        logger.debug(f"Repaired JSON from {llm_result['provider']}: {', '.join(repairs)}")
+    return data
+
+async def _complete_entities(entities: dict, user_input: str, current_state: str, profile: CompiledProfile,
+                             llm_client) -> dict:
+    """Validates extracted entities against the state's schema and re-asks once, for the absent or invalid fields only."""
+    json_schema = _get_extraction_schema(current_state)
+    valid, missing = validate_fields(entities, _validators(json_schema))
+    if missing:
+        METRICS.increment("extraction_reasks_total", state=current_state)
+        logger.debug(f"Re-asking for missing fields: {missing}")
+        retry_schema = {field: json_schema[field] for field in missing}
+        retry = await _request_entities(user_input, current_state, profile, retry_schema, llm_client)
+        if retry:
+            valid.update(validate_fields(retry, _validators(retry_schema))[0])
+    return valid
+
+async def extract_entities_async(user_input: str, current_state: str, business_data, llm_client=None) -> dict:
+    """Extracts the intent and entities required by the current state as a dict.
+    `business_data` is a CompiledProfile or a raw business_data dict."""
+    profile = as_compiled_profile(business_data)
+    llm_client = llm_client or get_llm_client()
     
-    print(f"DEBUG: LLM Provider Used: {llm_result['provider']}")
+    # Fast path: dates, times and service names are usually resolved locally without the LLM
+    local_result = pre_extract(user_input, current_state, profile.services_list)
+    if local_result is not None:
+        logger.debug(f"Entities resolved locally: {local_result}")
+        METRICS.increment("extraction_total", path="local")
+        return local_result
+    METRICS.increment("extraction_total", path="llm")
+
+    # Use the Fallback Service to get a structured JSON response
+    data = await _request_entities(user_input, current_state, profile, _get_extraction_schema(current_state), llm_client)
+    if data is None:
+        return {"intent": "LLM_FAILURE"}
 
-    try:
-        # Check for the standardized failure intent before loading JSON
-        if '"intent": "LLM_FAILURE"' in llm_result['content']:
-            return {"intent": "LLM_FAILURE"}
+    entities = await _complete_entities(data, user_input, current_state, profile, llm_client)
+    # Only a turn with nothing usable even after the re-ask counts as a failure
+    return entities or {"intent": "LLM_FAILURE"}
 
-        return json.loads(llm_result['content'])
-        
-    except Exception as e:
-        print(f"Failed to parse LLM response to JSON from {llm_result['provider']}: {e}")
+def extract_entities_sync(user_input: str, current_state: str, business_data) -> dict:
+    """Synchronous wrapper for extract_entities_async (CLI only)."""
+    return get_llm_client().run_sync(extract_entities_async(user_input, current_state, business_data))
+
+# --- Single-call Turn Mode (extraction + localized replies in one request) ---
+
+async def extract_and_localize_async(user_input: str, current_state: str, business_data,
+                                     user_language: str, template_ids: list, llm_client,
+                                     language_known: bool = False) -> dict:
+    """
+    Extracts the entities for the current state AND translates the reply templates the
+    controller may send next, in one structured request. The translations are stored in
+    the translation cache of `llm_client` (placeholders intact), so the controller still picks
+    and formats the reply deterministically after validation without a second LLM call.
+    Falls back to extract_entities_async when the entities resolve locally, when every
+    candidate reply is already cached, or when the reply is in English and needs no
+    translation. `language_known` marks a language identified locally this turn.
+    """
+    profile = as_compiled_profile(business_data)
+    translation_cache = llm_client.translation_cache
+
+    # A confident local extraction needs no LLM call at all; replies are then localized on demand
+    local_result = pre_extract(user_input, current_state, profile.services_list)
+    if local_result is not None:
+        logger.debug(f"Entities resolved locally: {local_result}")
+        METRICS.increment("extraction_total", path="local")
+        return local_result
+
+    # English replies are the templates themselves; START/AWAITING_NAME take the best guess too
+    if is_source_language(user_language):
+        return await extract_entities_async(user_input, current_state, profile, llm_client)
+    language_known = language_known or current_state not in ["START", "AWAITING_NAME"]
+    missing = [t for t in template_ids if translation_cache.get_template(t, user_language) is None]
+    if not missing:
+        return await extract_entities_async(user_input, current_state, profile, llm_client)
+
+    reply_language = user_language if language_known else "the same language the user writes in (the detected_language)"
+    json_schema = _get_extraction_schema(current_state)
+    reply_templates = {template_id: TEMPLATE_CATALOGUE[template_id] for template_id in missing}
+
+    system_prompt = _get_extraction_prompt(current_state, profile) + f"""
+    You are ALSO a professional translator and receptionist. Translate each English reply template in REPLY TEMPLATES into a conversational, polite reply in {reply_language}. If that language is 'Hinglish' or 'Hindi', use the Devanagari script for pure Hindi words, but retain English words (e.g., 'booking,' 'service') in Roman script. Copy every placeholder in curly braces (e.g., {{name}}, {{service}}) exactly as written.
+    The output JSON object has exactly two keys: "entities" (following the REQUIRED JSON SCHEMA) and "replies" (mapping each template id to its translation).
+    """
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"User Input: '{user_input}'. REQUIRED JSON SCHEMA: {json_schema}. REPLY TEMPLATES: {json.dumps(reply_templates, ensure_ascii=False)}"}
+    ]
+
+    llm_result = await llm_client.get_response_async(messages, structured=True)
+    logger.debug(f"LLM Provider Used (single-call turn): {llm_result['provider']}")
+
+    if llm_result['provider'] == NO_PROVIDER:
         return {"intent": "LLM_FAILURE"}
+    data, _ = repair_json(llm_result['content'])
+    if data is None:
+        logger.warning(f"Unusable JSON from {llm_result['provider']}: {llm_result['content'][:200]!r}")
+        data = {}
+
+    entities = data.get("entities") if isinstance(data.get("entities"), dict) else data
+    replies = data.get("replies") if isinstance(data.get("replies"), dict) else {}
+    entities = await _complete_entities(entities, user_input, current_state, profile, llm_client)
+    if not entities:
+        return {"intent": "LLM_FAILURE"}
+
+    # Seed the translation cache; set_template() rejects replies that lost a placeholder.
+    # An English "translation" is never cached: the English template is the reply.
+    seeded_language = user_language if language_known else (entities.get("detected_language") or user_language)
+    if not is_source_language(seeded_language):
+        for template_id in missing:
+            if isinstance(replies.get(template_id), str):
+                translation_cache.set_template(template_id, seeded_language, TEMPLATE_CATALOGUE[template_id], replies[template_id].strip())
+    return entities
 
 # --- Helper function for FAQ response (using the client) ---
 
-def generate_faq_response_sync(user_input: str, business_data: dict) -> str:
-    """Synchronous wrapper for LLM call to generate a natural language response (FAQ/Chat)."""
-    
-    # ... (System Prompt construction for FAQ remains the same, emphasizing multilingual support) ...
-    system_prompt = f"""
-    You are Dr. Sharma's professional front desk assistant.
+def _get_faq_prompt(profile: CompiledProfile) -> str:
+    """Returns the prebuilt FAQ system prompt of a profile (snippets are filled in per question)."""
+    template = profile.prompt_cache.get(("faq", ""))
+    if template is None:
+        template = profile.prompt_cache[("faq", "")] = f"""
+    You are the professional front desk assistant of {profile.name}.
     You must communicate fluently in the language the user uses (English, Hindi, or Hinglish).
     
-    Answer the user's question using ONLY the provided CLINIC DETAILS AND FAQs.
+    Answer the user's question using ONLY the provided CLINIC DETAILS AND RELEVANT INFORMATION.
     If the question cannot be answered with the provided data, politely escalate by saying:
-    'I cannot find that information. Let me connect you with the admin at {business_data['clinic_info']['contact']}.'
+    'I cannot find that information. Let me connect you with the admin at {profile.contact}.'
     
-    CLINIC DETAILS: {json.dumps(business_data)}
+    CLINIC DETAILS: {profile.name} ({profile.clinic_info.get('specialty', '')}), contact {profile.contact}
+    RELEVANT INFORMATION:
+    {RELEVANT_INFO_TOKEN}
     """
+    return template
+
+async def generate_faq_response_async(user_input: str, business_data, user_language: str = SOURCE_LANGUAGE,
+                                      llm_client=None) -> str:
+    """Generates a natural language response (FAQ/Chat) from the clinic data, in `user_language`.
+    `business_data` is a CompiledProfile or a raw business_data dict."""
+    profile = as_compiled_profile(business_data)
+    llm_client = llm_client or get_llm_client()
+
+    # Fast path: a clear knowledge-base match needs no generation, only (cached) localization
+    entry = profile.knowledge_base.answer(user_input)
+    if entry is not None:
+        logger.debug("FAQ answered from the knowledge base index.")
+        METRICS.increment("faq_answers_total", path="index")
+        if entry.template_id is not None:
+            return await llm_client.translate_template_async(entry.template_id, user_language, **entry.template_args)
+        return await llm_client.translate_prompt_async(entry.answer, user_language)
+    METRICS.increment("faq_answers_total", path="llm")
+
+    # Otherwise the LLM only sees the few entries relevant to this question
+    snippets = profile.knowledge_base.top_snippets(user_input, FAQ_TOP_K)
+    relevant_info = "\n    ".join(f"- {snippet}" for snippet in snippets) or "- (no matching entries)"
+    system_prompt = _get_faq_prompt(profile).replace(RELEVANT_INFO_TOKEN, relevant_info)
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_input}
     ]
 
-    llm_result = LLM_CLIENT.get_response_sync(messages, structured=False)
+    llm_result = await llm_client.get_response_async(messages, structured=False)
     
-    # Check for the standardized failure intent
-    if '"intent": "LLM_FAILURE"' in llm_result['content']:
-        return f"⚠️ I apologize, both AI assistants are currently unstable. Please call the clinic directly at {business_data['clinic_info']['contact']} for immediate assistance."
+    # Neither provider answered
+    if llm_result['provider'] == NO_PROVIDER:
+        return f"⚠️ I apologize, both AI assistants are currently unstable. Please call the clinic directly at {profile.contact} for immediate assistance."
+
+    return llm_result['content']
 
-    return llm_result['content']
\ No newline at end of file
+def generate_faq_response_sync(user_input: str, business_data) -> str:
+    """Synchronous wrapper for generate_faq_response_async (CLI only)."""
+    return get_llm_client().run_sync(generate_faq_response_async(user_input, business_data))
@@ -0,0 +1,201 @@
+# core/json_repair.py
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .metrics import METRICS
+
+# ```json ... ``` (the closing fence may be missing when the answer was cut short)
+FENCE_PATTERN = re.compile(r"```[A-Za-z]*\s*(.*?)(?:```|$)", re.S)
+
+CLOSERS = {"{": "}", "[": "]"}
+
+PYTHON_LITERALS = re.compile(r"\b(None|True|False)\b")
+JSON_LITERALS = {"None": "null", "True": "true", "False": "false"}
+
+
+# --- Repair Steps ---
+
+def _strip_fence(text: str) -> str:
+    match = FENCE_PATTERN.search(text)
+    return match.group(1).strip() if match else text
+
+
+def _single_to_double_quotes(text: str) -> str:
+    """
+    Rewrites 'single-quoted' strings as JSON strings (double-quoted ones are copied unchanged)
+    and Python's None/True/False outside strings as JSON literals.
+    """
+    out, bare, quote, escaped = [], [], None, False
+
+    def flush_bare():
+        out.append(PYTHON_LITERALS.sub(lambda m: JSON_LITERALS[m.group(0)], "".join(bare)))
+        bare.clear()
+
+    for ch in text:
+        if quote is None:
+            if ch in "'\"":
+                flush_bare()
+                quote = ch
+                out.append('"')
+            else:
+                bare.append(ch)
+            continue
+        if escaped:
+            out.append("'" if ch == "'" else "\\" + ch)
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif ch == quote:
+            quote = None
+            out.append('"')
+        elif ch == '"':
+            out.append('\\"')
+        else:
+            out.append(ch)
+    flush_bare()
+    return "".join(out)
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """Drops commas directly before a closing bracket, outside strings: '{"a": [1,],}' -> '{"a": [1]}'."""
+    out, in_string, escaped, comma_at = [], False, False, None
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "}]" and comma_at is not None:
+            del out[comma_at]
+        if ch == "," and not in_string:
+            comma_at = len(out)
+        elif not ch.isspace():
+            comma_at = None
+        out.append(ch)
+    return "".join(out)
+
+
+def _scan(text: str) -> Tuple[Optional[int], List[str], bool, List[Tuple[int, List[str]]]]:
+    """
+    Walks the first JSON object in `text`. Returns the index just past its closing brace
+    (None if it never closes), the brackets still open at the end, whether the text ends
+    inside a string, and the commas outside strings with the brackets open at each.
+    """
+    stack, commas, in_string, escaped = [], [], False, False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in CLOSERS:
+            stack.append(ch)
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return i + 1, [], False, commas
+        elif ch == ",":
+            commas.append((i, list(stack)))
+    return None, stack, in_string, commas
+
+
+def _close_truncated(text: str, stack: List[str], in_string: bool, commas: List[Tuple[int, List[str]]]) -> Optional[Any]:
+    """Completes an object cut off mid-way; a member that was itself cut short is dropped."""
+    candidates = []
+    if not in_string:
+        candidates.append(text.rstrip().rstrip(",") + "".join(CLOSERS[b] for b in reversed(stack)))
+    for position, open_brackets in reversed(commas):
+        candidates.append(text[:position] + "".join(CLOSERS[b] for b in reversed(open_brackets)))
+    for candidate in candidates:
+        try:
+            return json.loads(_strip_trailing_commas(candidate))
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_object(text: str, repairs: List[str]) -> Optional[Any]:
+    start = text.find("{")
+    if start < 0:
+        return None
+    if start > 0:
+        repairs.append("leading_text")
+    body = text[start:]
+    end, stack, in_string, commas = _scan(body)
+    if end is not None:
+        if body[end:].strip():
+            repairs.append("trailing_text")
+        try:
+            return json.loads(body[:end])
+        except ValueError:
+            pass
+        try:
+            data = json.loads(_strip_trailing_commas(body[:end]))
+        except ValueError:
+            return None
+        repairs.append("trailing_commas")
+        return data
+    repairs.append("truncated")
+    return _close_truncated(body, stack, in_string, commas)
+
+
+# --- Public API ---
+
+def repair_json(text: str) -> Tuple[Optional[dict], List[str]]:
+    """
+    Parses an LLM's JSON answer, repairing the usual defects: markdown fences, prose before
+    or after the object, single-quoted strings, trailing commas and truncation at max_tokens. Returns the
+    object (None if nothing could be salvaged) and the names of the repairs that were needed.
+    """
+    if not isinstance(text, str):
+        return None, []
+    try:
+        data = json.loads(text)
+        return (data, []) if isinstance(data, dict) else (None, [])
+    except ValueError:
+        pass
+
+    cleaned = _strip_fence(text.strip())
+    fenced = cleaned != text.strip()
+    data, repairs = None, []
+    for requote in (False, True):
+        if requote and "'" not in cleaned:
+            break
+        repairs = (["fence"] if fenced else []) + (["single_quotes"] if requote else [])
+        data = _parse_object(_single_to_double_quotes(cleaned) if requote else cleaned, repairs)
+        if isinstance(data, dict):
+            break
+    if not isinstance(data, dict):
+        METRICS.increment("llm_json_repairs_total", result="failed")
+        return None, repairs
+    for repair in repairs:
+        METRICS.increment("llm_json_repairs_total", result=repair)
+    return data, repairs
+
+
+def validate_fields(data: dict, validators: Dict[str, Callable[[Any], Any]]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Checks `data` against one validator per required field. A validator returns the
+    normalized value (None is a valid "not mentioned") or raises ValueError. Returns the
+    valid fields and the names of the fields that are absent or invalid.
+    """
+    valid, missing = {}, []
+    for field, validator in validators.items():
+        if field not in data:
+            missing.append(field)
+            continue
+        try:
+            valid[field] = validator(data[field])
+        except (TypeError, ValueError):
+            missing.append(field)
+    return valid, missing
@@ -0,0 +1,168 @@
+# core/knowledge_base.py
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import FAQ_DIRECT_ANSWER_MIN_COVERAGE, FAQ_DIRECT_ANSWER_MIN_MARGIN
+
+# Words that carry no retrieval signal (English and Hinglish fillers, plus "clinic" which every question implies)
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "was", "were", "be", "do", "does", "did", "you", "your", "we",
+    "our", "i", "me", "my", "it", "to", "of", "on", "in", "at", "for", "and", "or", "can", "could",
+    "will", "would", "please", "there", "this", "that", "with", "have", "has", "what", "which",
+    "hi", "hello", "tell", "about", "any", "kya", "hai", "hain", "ka", "ki", "ke", "ko", "se", "aap",
+    "mujhe", "main", "hum", "bhi", "toh", "na", "clinic",
+}
+
+# Extra vocabulary (English and Hinglish) indexed with the clinic info and service entries,
+# so everyday phrasings reach the right entry without an LLM.
+HOURS_KEYWORDS = "hours timing timings open opening close closing closed time schedule when kab khula band"
+LOCATION_KEYWORDS = "location address where located directions reach kahan pata"
+CONTACT_KEYWORDS = "contact phone number call mobile whatsapp reach"
+SERVICE_KEYWORDS = "price cost fee fees charge charges rate how much long duration minutes takes kitna kitne paisa"
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9\u0900-\u097f]+")  # Latin digits/letters and Devanagari
+
+# A price with an amount ("₹800", "Rs 1,200"); anything else ("Varies") gets the on-request reply
+PRICE_AMOUNT_PATTERN = re.compile(r"\d")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases, splits on non-word characters, drops stopwords and folds simple plurals."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class KnowledgeEntry:
+    """
+    One retrievable unit: a FAQ pair, a service, or a clinic detail. Its direct reply is either
+    a MESSAGES template with arguments (localized through the translation cache) or, for FAQ
+    pairs, the clinic's own English answer text.
+    """
+
+    def __init__(self, kind: str, indexed_text: str, snippet: str, answer: Optional[str] = None,
+                 template_id: Optional[str] = None, template_args: Optional[Dict[str, str]] = None):
+        self.kind = kind
+        self.snippet = snippet                    # compact line handed to the LLM as context
+        self.answer = answer                      # free-text reply on a high-confidence match
+        self.template_id = template_id            # ...or a template rendered in the user's language
+        self.template_args = template_args or {}
+        self.term_counts = Counter(tokenize(indexed_text))
+        self.length = sum(self.term_counts.values())
+
+
+class KnowledgeBase:
+    """
+    Precomputed BM25 index over the FAQ, services and clinic details of a business profile.
+
+    answer() returns a ready reply when one entry clearly matches the question, so common
+    questions never reach the LLM. top_snippets() returns the k most relevant entries, so the
+    remaining LLM prompts carry a few lines instead of the whole profile.
+    """
+
+    def __init__(self, business_data: dict, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.entries: List[KnowledgeEntry] = self._build_entries(business_data)
+
+        # Document frequencies and average length, computed once per profile
+        document_frequency = Counter()
+        for entry in self.entries:
+            document_frequency.update(entry.term_counts.keys())
+        total = len(self.entries)
+        self.idf: Dict[str, float] = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()
+        }
+        self.average_length = (sum(e.length for e in self.entries) / total) if total else 0.0
+
+    # --- Index Construction ---
+
+    @staticmethod
+    def _build_entries(business_data: dict) -> List[KnowledgeEntry]:
+        entries = []
+        for item in business_data.get('faq', []) or []:
+            entries.append(KnowledgeEntry(
+                "faq", f"{item['q']} {item['a']}", f"Q: {item['q']} A: {item['a']}", item['a']
+            ))
+
+        clinic = business_data.get('clinic_info', {}) or {}
+        for service in business_data.get('services', []) or []:
+            details = {"service": service['name'], "price": str(service.get('price', 'N/A')),
+                       "duration": str(service.get('duration', 'N/A'))}
+            if PRICE_AMOUNT_PATTERN.search(details["price"]):
+                template_id, template_args = "SERVICE_DETAILS", details
+            else:
+                template_id = "SERVICE_DETAILS_PRICE_ON_REQUEST"
+                template_args = {"service": details["service"], "duration": details["duration"],
+                                 "contact": clinic.get('contact', '')}
+            entries.append(KnowledgeEntry(
+                "service",
+                f"{service['name']} {SERVICE_KEYWORDS}",
+                f"Service: {details['service']} | Price: {details['price']} | Duration: {details['duration']}",
+                template_id=template_id, template_args=template_args,
+            ))
+
+        clinic_details = [
+            ("hours", HOURS_KEYWORDS, "CLINIC_HOURS"),
+            ("location", LOCATION_KEYWORDS, "CLINIC_LOCATION"),
+            ("contact", CONTACT_KEYWORDS, "CLINIC_CONTACT"),
+        ]
+        for key, keywords, template_id in clinic_details:
+            if clinic.get(key):
+                entries.append(KnowledgeEntry(
+                    "clinic", f"{key} {keywords}", f"{key.capitalize()}: {clinic[key]}",
+                    template_id=template_id, template_args={key: clinic[key]},
+                ))
+        return entries
+
+    # --- Retrieval ---
+
+    def _score(self, entry: KnowledgeEntry, query_terms: List[str]) -> float:
+        score = 0.0
+        for term in query_terms:
+            tf = entry.term_counts.get(term)
+            if not tf:
+                continue
+            norm = self.k1 * (1 - self.b + self.b * entry.length / (self.average_length or 1))
+            score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return score
+
+    def search(self, query: str, top_k: int = 3) -> List[Tuple[float, KnowledgeEntry]]:
+        """Returns up to top_k (score, entry) pairs with a positive score, best first."""
+        query_terms = tokenize(query)
+        scored = [(self._score(entry, query_terms), entry) for entry in self.entries]
+        scored = [pair for pair in scored if pair[0] > 0]
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return scored[:top_k]
+
+    def answer(self, query: str) -> Optional[KnowledgeEntry]:
+        """
+        Returns the entry to reply with directly if it covers most of the question and clearly
+        beats the runner-up; otherwise None (the LLM should answer).
+        """
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return None
+        results = self.search(query, top_k=2)
+        if not results:
+            return None
+
+        best_score, best = results[0]
+        coverage = len(query_terms & set(best.term_counts)) / len(query_terms)
+        if coverage < FAQ_DIRECT_ANSWER_MIN_COVERAGE:
+            return None
+        if len(results) > 1 and best_score < FAQ_DIRECT_ANSWER_MIN_MARGIN * results[1][0]:
+            return None
+        return best
+
+    def top_snippets(self, query: str, k: int) -> List[str]:
+        """Returns the k most relevant entries as compact prompt lines."""
+        return [entry.snippet for _, entry in self.search(query, top_k=k)]
+
@@ -0,0 +1,87 @@
+# core/language_id.py
+import re
+from typing import Optional, Tuple
+
+from .metrics import METRICS
+
+DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+LATIN_LETTER = re.compile(r"[A-Za-z]")
+LATIN_WORD = re.compile(r"[a-z]+")
+
+# --- Lexicons ---
+
+# Romanized Hindi words that are not also common English words ("main", "to", "the" are left out)
+HINGLISH_WORDS = {
+    "hai", "hain", "ho", "hoga", "hogi", "tha", "thi", "nahi", "nahin", "nhi", "mat",
+    "mujhe", "muje", "mera", "meri", "mere", "hum", "hume", "humein", "aap", "aapka", "aapki", "aapko",
+    "tum", "tumhe", "unka", "unki", "kya", "kab", "kaise", "kaun", "kitna", "kitne", "kitni", "kahan", "kyun",
+    "ka", "ki", "ke", "ko", "se", "mein", "par", "aur", "ya", "bhi", "liye", "wala", "wali", "wale",
+    "karna", "karni", "karne", "karo", "karwana", "karwani", "krwana", "kar", "krna", "krni", "chahiye", "chahta", "chahti",
+    "lena", "leni", "lene", "dena", "dedo", "batana",
+    "dikhana", "dikhwana", "milna", "milega", "milegi", "sakta", "sakti", "sakte", "dijiye", "batao", "bataiye",
+    "haan", "han", "ji", "acha", "accha", "achha", "theek", "thik", "thoda", "bahut", "bohot", "abhi", "jaldi",
+    "kal", "aaj", "parso", "parson", "subah", "dopahar", "shaam", "sham", "raat", "baje", "bje",
+    "saadhe", "sadhe", "sawa", "paune", "naam", "dard", "daant", "dant", "bhai", "didi", "namaste", "shukriya", "dhanyavad",
+}
+
+# Frequent English words that Hinglish does not use. Booking vocabulary ("appointment",
+# "checkup", "slot", "time", "doctor") and fillers ("ok", "hi", "morning") are left out:
+# Hinglish borrows them as-is, so they are no evidence either way and would make
+# "kal appointment book krna" look English.
+ENGLISH_WORDS = {
+    "i", "im", "me", "my", "you", "your", "we", "our", "it", "is", "am", "are", "was", "be", "have", "has", "do",
+    "a", "an", "of", "to", "for", "at", "on", "in", "with", "and", "or", "but", "not", "this", "that", "there",
+    "what", "when", "where", "how", "which", "who", "why", "can", "could", "would", "will", "should", "please",
+    "want", "need", "like", "yes", "no", "thanks", "thank", "hello", "hey", "good",
+    "today", "tomorrow", "next", "week", "much", "many", "about", "after", "before", "get", "see", "come",
+}
+
+# Words of evidence needed for full confidence in a Latin-script message
+ENGLISH_EVIDENCE_WORDS = 3
+HINGLISH_EVIDENCE_WORDS = 2
+
+# Share of letters above which a message counts as written in one script only
+SCRIPT_MAJORITY = 0.8
+
+
+# --- Identification ---
+
+def identify_language(text: str) -> Tuple[Optional[str], float]:
+    """
+    Identifies the language of a message without the LLM: 'English', 'Hindi' or 'Hinglish'
+    and a confidence between 0 and 1 (None, 0.0 when the text gives nothing to go on, such
+    as a bare name or number).
+
+    Devanagari text is Hindi, Devanagari mixed with Latin words is Hinglish. Latin text is
+    Hinglish if it contains romanized Hindi words and English if it only contains English
+    ones. Short replies ("ok", "5 pm") score low, so they do not switch a conversation's language.
+    """
+    devanagari = len(DEVANAGARI.findall(text))
+    latin = len(LATIN_LETTER.findall(text))
+    if devanagari + latin == 0:
+        return None, 0.0
+
+    if devanagari:
+        share = devanagari / (devanagari + latin)
+        if share >= SCRIPT_MAJORITY:
+            return "Hindi", share
+        # Both scripts: Hindi words in Devanagari around Roman English ones
+        return "Hinglish", min(1.0, 0.5 + 2 * min(share, 1.0 - share))
+
+    words = LATIN_WORD.findall(text.lower())
+    hinglish = sum(1 for word in words if word in HINGLISH_WORDS)
+    english = sum(1 for word in words if word in ENGLISH_WORDS)
+    if hinglish:
+        return "Hinglish", min(1.0, hinglish / HINGLISH_EVIDENCE_WORDS)
+    if english:
+        coverage = english / len(words)
+        return "English", min(1.0, english / ENGLISH_EVIDENCE_WORDS) * min(1.0, coverage / 0.5)
+    return None, 0.0
+
+
+def detect_language(text: str, min_confidence: float) -> Optional[str]:
+    """The identified language if at least `min_confidence` sure, else None (leave it to the LLM/context)."""
+    language, confidence = identify_language(text)
+    detected = language if confidence >= min_confidence else None
+    METRICS.increment("language_id_total", result=detected or "unsure")
+    return detected
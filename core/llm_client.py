@@ -2,52 +2,142 @@
 import os
 import asyncio
 import json
+import logging
+import threading
+import time
 import aiohttp
 from dotenv import load_dotenv
-from openai import AsyncOpenAI, OpenAI
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Iterable
 
-load_dotenv()
+from config.messages import PROMPTS, MESSAGES
+from config.settings import (
+    TRANSLATION_CACHE_PATH, TRANSLATION_CACHE_MAX_ENTRIES,
+    LLM_POOL_MAX_CONNECTIONS, LLM_POOL_MAX_CONNECTIONS_PER_HOST, LLM_POOL_KEEPALIVE_SECONDS,
+    LLM_PRIMARY_TIMEOUT_SECONDS, LLM_FALLBACK_TIMEOUT_SECONDS,
+    LLM_HEDGING_ENABLED, LLM_HEDGE_PERCENTILE, LLM_HEDGE_DEFAULT_DELAY_SECONDS, LLM_HEDGE_MIN_DELAY_SECONDS,
+    LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_COOLDOWN_SECONDS,
+    LLM_RESPONSE_CACHE_ENABLED, LLM_RESPONSE_CACHE_MAX_ENTRIES, LLM_RESPONSE_CACHE_TTL_SECONDS,
+    LLM_CONCURRENCY_INITIAL_LIMIT, LLM_CONCURRENCY_MIN_LIMIT, LLM_CONCURRENCY_MAX_LIMIT,
+    LLM_CONCURRENCY_LATENCY_TOLERANCE, LLM_CONCURRENCY_BACKOFF, LLM_ADMISSION_MAX_QUEUE,
+)
+from .concurrency_limiter import AdaptiveLimiter, LLMOverloaded, current_deadline
+from .metrics import METRICS, SIZE_BUCKETS, current_trace, stage
+from .provider_health import ProviderHealth
+from .response_cache import ResponseCache
+from .translation_cache import TranslationCache
+
+logger = logging.getLogger(__name__)
 
 # --- Configuration ---
-# Primary (Chutes)
-CHUTES_API_KEY = os.getenv("CHUTES_API_KEY")
-CHUTES_MODEL = os.getenv("CHUTES_MODEL")
-CHUTES_BASE_URL = os.getenv("CHUTES_BASE_URL").replace("/chat/completions", "") # Openai clients expect the base URL
+# Provider keys, models and URLs come from the environment (.env), read when a client is built:
+#   Primary (Chutes):       CHUTES_API_KEY, CHUTES_MODEL, CHUTES_BASE_URL (full chat/completions endpoint)
+#   Fallback (OpenRouter):  OPENROUTER_API_KEY, OPENROUTER_MODEL, OPENROUTER_BASE_URL
+_ENV_LOADED = False
+
+
+def _load_env():
+    """Reads .env once per process, on first client construction rather than at import."""
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        load_dotenv()
+        _ENV_LOADED = True
+
+# Provider name of the sentinel result returned when every provider failed
+NO_PROVIDER = "NONE"
+
+# All fixed English templates, addressable by id (PROMPTS and MESSAGES keys never collide)
+TEMPLATE_CATALOGUE = {**PROMPTS, **MESSAGES}
+
+# Language the templates are written in: replies in it are formatted locally, never translated
+SOURCE_LANGUAGE = "English"
+
+TRANSLATOR_SYSTEM_PROMPT = "You are a professional translator and receptionist. Translate the following English prompt into a conversational, polite {language} response. If the requested language is 'Hinglish' or 'Hindi', use the Devanagari script for pure Hindi words, but retain English words (e.g., 'booking,' 'service') in Roman script, maintaining a conversational Hinglish style. Do NOT add extra context, just the translated prompt."
+PLACEHOLDER_INSTRUCTION = " The prompt is a template: copy every placeholder in curly braces (e.g., {name}, {service}) into your translation exactly as written, without translating or removing it."
+
+
+def is_source_language(language: Optional[str]) -> bool:
+    """True for SOURCE_LANGUAGE however it is spelled ('english', ' English' from an LLM's detected_language)."""
+    return isinstance(language, str) and language.strip().casefold() == SOURCE_LANGUAGE.casefold()
 
-# Fallback (OpenRouter)
-OR_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OR_MODEL = os.getenv("OPENROUTER_MODEL")
-OR_BASE_URL = os.getenv("OPENROUTER_BASE_URL")
 
 # --- LLM Client Class ---
 
 class LLMFallbackService:
     def __init__(self):
-        # 1. Primary Client (Chutes/aiohttp) - Uses low-level aiohttp for current Chutes endpoint format
+        _load_env()
+
+        # 1. Primary Provider (Chutes) - CHUTES_BASE_URL is the full chat/completions endpoint
         self.primary_config = {
-            "key": CHUTES_API_KEY,
+            "key": os.getenv("CHUTES_API_KEY"),
             "url": os.getenv("CHUTES_BASE_URL"),
-            "model": CHUTES_MODEL,
-            "name": "Chutes AI (Primary)"
+            "model": os.getenv("CHUTES_MODEL"),
+            "name": "Chutes AI (Primary)",
+            "timeout": LLM_PRIMARY_TIMEOUT_SECONDS,
         }
         
-        # 2. Fallback Client (OpenRouter/AsyncOpenAI) - Use ASYNC client
-        self.fallback_client = AsyncOpenAI(
-            base_url=OR_BASE_URL,
-            api_key=OR_API_KEY,
+        # 2. Fallback Provider (OpenRouter) - OpenAI-compatible endpoint, served from the same pool
+        self.fallback_config = {
+            "key": os.getenv("OPENROUTER_API_KEY"),
+            "url": f"{(os.getenv('OPENROUTER_BASE_URL') or '').rstrip('/')}/chat/completions",
+            "model": os.getenv("OPENROUTER_MODEL"),
+            "name": "OpenRouter (Fallback)",
+            "timeout": LLM_FALLBACK_TIMEOUT_SECONDS,
+        }
+        self.fallback_model = self.fallback_config['model']
+        self.fallback_name = self.fallback_config['name']
+
+        # 3. Provider Health - circuit breakers and latency stats, keyed by provider name
+        self.provider_health: Dict[str, ProviderHealth] = {
+            provider['name']: ProviderHealth(provider['name'], LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_COOLDOWN_SECONDS)
+            for provider in (self.primary_config, self.fallback_config)
+        }
+        self.hedge_stats = {"fired": 0, "fallback_wins": 0}
+
+        # 4. Translation Cache - fixed prompts are translated once per (template, language)
+        self.translation_cache = TranslationCache(TRANSLATION_CACHE_PATH, TRANSLATION_CACHE_MAX_ENTRIES)
+
+        # 5. Response Cache - identical prompts are answered once, concurrent duplicates share the call
+        self.response_cache = ResponseCache(LLM_RESPONSE_CACHE_MAX_ENTRIES, LLM_RESPONSE_CACHE_TTL_SECONDS)
+
+        # 6. Admission Control - adaptive cap on concurrent LLM requests, sheds what cannot be served in time
+        self.limiter = AdaptiveLimiter(
+            LLM_CONCURRENCY_INITIAL_LIMIT, LLM_CONCURRENCY_MIN_LIMIT, LLM_CONCURRENCY_MAX_LIMIT,
+            LLM_ADMISSION_MAX_QUEUE, LLM_CONCURRENCY_LATENCY_TOLERANCE, LLM_CONCURRENCY_BACKOFF,
         )
-        self.fallback_model = OR_MODEL
-        self.fallback_name = "OpenRouter (Fallback)"
 
-    async def _call_chutes_async(self, messages: list, response_format: Dict[str, Any] = None) -> str:
-        """Low-level aiohttp call to Chutes API (Primary)."""
+        # 7. Connection Pools - one keep-alive aiohttp session per event loop that uses the service
+        self._sessions: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+
+        # 8. Service Loop - long-lived loop on a daemon thread that backs the sync wrappers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+
+    # --- CONNECTION POOL ---
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Returns the pooled session bound to the running loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=LLM_POOL_MAX_CONNECTIONS,
+                limit_per_host=LLM_POOL_MAX_CONNECTIONS_PER_HOST,
+                keepalive_timeout=LLM_POOL_KEEPALIVE_SECONDS,
+                ssl=False,  # ssl=False for testing environment stability
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[loop] = session
+        return session
+
+    async def _post_chat_completion_async(self, provider: Dict[str, Any], messages: list, response_format: Dict[str, Any] = None) -> str:
+        """Low-level aiohttp call to an OpenAI-compatible chat/completions endpoint."""
         headers = {
-            "Authorization": f"Bearer {self.primary_config['key']}",
+            "Authorization": f"Bearer {provider['key']}",
             "Content-Type": "application/json"
         }
         body = {
-            "model": self.primary_config['model'],
+            "model": provider['model'],
             "messages": messages,
             "temperature": 0.1,  
             "max_tokens": 1024,
@@ -55,81 +145,389 @@ class LLMFallbackService:
         if response_format:
             body["response_format"] = response_format
 
-        async with aiohttp.ClientSession() as session:
-            # ssl=False for testing environment stability
-            async with session.post(self.primary_config['url'], headers=headers, json=body, ssl=False) as response:
-                if response.status != 200:
-                    data = await response.json()
+        session = self._get_session()
+        async with session.post(provider['url'], headers=headers, json=body) as response:
+            if response.status != 200:
+                try:
+                    data = await response.json(content_type=None)
                     error_msg = data.get("error", {}).get("message", "Unknown API error")
-                    raise Exception(f"Chutes HTTP Error ({response.status}): {error_msg}")
-                
-                data = await response.json()
-                if 'choices' in data and data['choices'] and 'message' in data['choices'][0]:
-                    return data['choices'][0]['message']['content']
-                else:
-                    raise Exception(f"Chutes Response Structure Missing.")
+                except (aiohttp.ContentTypeError, json.JSONDecodeError, AttributeError):
+                    error_msg = "Unknown API error"
+                raise Exception(f"{provider['name']} HTTP Error ({response.status}): {error_msg}")
+            
+            data = await response.json(content_type=None)
+            if 'choices' in data and data['choices'] and 'message' in data['choices'][0]:
+                return data['choices'][0]['message']['content']
+            else:
+                raise Exception(f"{provider['name']} Response Structure Missing.")
+
+    async def _call_chutes_async(self, messages: list, response_format: Dict[str, Any] = None) -> str:
+        """Call to Chutes API (Primary)."""
+        return await self._post_chat_completion_async(self.primary_config, messages, response_format)
 
     async def _call_openrouter_async(self, messages: list, response_format: Dict[str, Any] = None) -> str:
-        """Standard ASYNC SDK call to OpenRouter (Fallback)."""
-        completion = await self.fallback_client.chat.completions.create(
-            model=self.fallback_model,
-            messages=messages,
-            temperature=0.1,
-            max_tokens=1024,
-            response_format=response_format if response_format else None
-        )
-        return completion.choices[0].message.content
+        """Call to OpenRouter (Fallback)."""
+        return await self._post_chat_completion_async(self.fallback_config, messages, response_format)
+
+    # --- SERVICE LOOP & SYNCHRONOUS WRAPPERS (CLI) ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Starts the long-lived service loop on a daemon thread (once)."""
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="llm-service-loop", daemon=True
+                )
+                self._loop_thread.start()
+            return self._loop
 
-    # --- SYNCHRONOUS WRAPPER FOR CLI (Only used by main.py) ---
+    def run_sync(self, coro):
+        """Runs a coroutine on the service loop and blocks until it completes."""
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._loop_thread:
+            coro.close()
+            raise RuntimeError("Sync LLM wrappers cannot be called from the service loop; await the async method instead.")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
     
     def get_response_sync(self, messages: list, structured: bool = False) -> Dict[str, Any]:
         """
-        Synchronous wrapper implementing Primary-Fallback logic using asyncio.run().
+        Synchronous wrapper implementing Primary-Fallback logic on the persistent service loop.
         DO NOT USE THIS IN FASTAPI.
         """
-        return asyncio.run(self.get_response_async(messages, structured=structured))
+        return self.run_sync(self.get_response_async(messages, structured=structured))
+
+    # --- PROVIDER ATTEMPTS (deadline + breaker bookkeeping) ---
+
+    async def _attempt_provider(self, provider: Dict[str, Any], call, messages: list, response_format: Dict[str, Any] = None) -> str:
+        """Runs one provider call under its deadline and records the outcome in its health stats and metrics."""
+        health = self.provider_health[provider['name']]
+        started = time.monotonic()
+        outcome = "ok"
+        METRICS.observe("llm_prompt_chars", sum(len(m['content']) for m in messages), buckets=SIZE_BUCKETS, provider=provider['name'])
+        try:
+            content = await asyncio.wait_for(call(messages, response_format), timeout=provider['timeout'])
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            health.record_failure(f"Timed out after {provider['timeout']}s", timed_out=True)
+            raise
+        except asyncio.CancelledError:
+            # Lost a hedge race (or the turn was cancelled) - not the provider's fault
+            outcome = "cancelled"
+            health.breaker.release()
+            raise
+        except Exception as e:
+            outcome = "error"
+            health.record_failure(str(e))
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            METRICS.observe("llm_attempt_seconds", elapsed, provider=provider['name'], outcome=outcome)
+            trace = current_trace()
+            if trace is not None:
+                trace.llm_calls += 1
+                trace.add(f"llm[{provider['name']}]", elapsed)
+        health.record_success(elapsed)
+        METRICS.observe("llm_response_chars", len(content or ""), buckets=SIZE_BUCKETS, provider=provider['name'])
+        return content
+
+    def _admit(self, provider: Dict[str, Any]) -> bool:
+        """Asks the provider's circuit breaker whether a request may be sent right now."""
+        health = self.provider_health[provider['name']]
+        if health.breaker.allow_request():
+            return True
+        health.skipped += 1
+        METRICS.increment("llm_breaker_skips_total", provider=provider['name'])
+        logger.warning(f"Circuit open for {provider['name']}, skipping it.")
+        return False
+
+    def _hedge_delay(self) -> float:
+        """How long the primary may run before the fallback is fired in hedged mode."""
+        observed = self.provider_health[self.primary_config['name']].latency_percentile(LLM_HEDGE_PERCENTILE)
+        if observed is None:
+            return LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(LLM_HEDGE_MIN_DELAY_SECONDS, observed)
+
+    def _served(self, provider: Dict[str, Any], content: str) -> Dict[str, Any]:
+        self.provider_health[provider['name']].served += 1
+        METRICS.increment("llm_served_total", provider=provider['name'])
+        return {"content": content, "provider": provider['name']}
+
+    def get_provider_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-provider circuit state, outcome counters and latency percentiles."""
+        stats = {name: health.snapshot() for name, health in self.provider_health.items()}
+        stats["hedging"] = dict(self.hedge_stats)
+        stats["response_cache"] = self.response_cache.snapshot()
+        stats["admission"] = self.limiter.snapshot()
+        return stats
 
     # --- CORE ASYNC LOGIC (To be used in FastAPI/Phase 2) ---
     async def get_response_async(self, messages: list, structured: bool = False) -> Dict[str, Any]:
         """
-        Asynchronous method implementing Primary-Fallback logic.
-        Returns a dict: {"content": response_string, "provider": provider_name}
+        Asynchronous method implementing Primary-Fallback logic, behind the response cache and
+        admission control. Returns a dict: {"content": response_string, "provider": provider_name}
+        Raises LLMOverloaded when the request could not get a slot before the turn's deadline.
         """
-        response_format = {"type": "json_object"} if structured else None
-        
-        # 1. Attempt Primary (Chutes AI)
-        try:
-            print("INFO: Attempting Primary LLM (Chutes AI)...")
-            content = await self._call_chutes_async(messages, response_format)
-            return {"content": content, "provider": self.primary_config['name']}
-        except Exception as e:
-            print(f"WARN: Primary LLM failed ({e}). Falling back to OpenRouter.")
-            
-        # 2. Attempt Fallback 1 (OpenRouter)
+        if not LLM_RESPONSE_CACHE_ENABLED:
+            return await self._get_response_admitted(messages, structured)
+        return await self.response_cache.get_or_call(
+            messages, structured, lambda: self._get_response_admitted(messages, structured)
+        )
+
+    async def _get_response_admitted(self, messages: list, structured: bool = False) -> Dict[str, Any]:
+        """Holds a concurrency slot for the whole primary/fallback sequence and reports its latency."""
+        await self.limiter.acquire(current_deadline())
+        started = time.monotonic()
+        result = None
         try:
-            print("INFO: Attempting Fallback LLM 1 (OpenRouter)...")
-            content = await self._call_openrouter_async(messages, response_format)
-            return {"content": content, "provider": self.fallback_name}
-        except Exception as e:
-            print(f"ERROR: Fallback LLM 1 also failed: {e}")
+            result = await self._get_response_uncached(messages, structured)
+        finally:
+            if result is None:
+                self.limiter.release()
+            else:
+                self.limiter.release(time.monotonic() - started, failed=result["provider"] == NO_PROVIDER)
+        return result
+
+    async def _get_response_uncached(self, messages: list, structured: bool = False) -> Dict[str, Any]:
+        response_format = {"type": "json_object"} if structured else None
+
+        if LLM_HEDGING_ENABLED:
+            result = await self._get_response_hedged(messages, response_format)
+            if result is not None:
+                return result
+        else:
+            # 1. Attempt Primary (Chutes AI)
+            if self._admit(self.primary_config):
+                try:
+                    logger.debug("Attempting Primary LLM (Chutes AI)...")
+                    content = await self._attempt_provider(self.primary_config, self._call_chutes_async, messages, response_format)
+                    return self._served(self.primary_config, content)
+                except Exception as e:
+                    logger.warning(f"Primary LLM failed ({e!r}). Falling back to OpenRouter.")
+            METRICS.increment("llm_fallback_total")
+                
+            # 2. Attempt Fallback 1 (OpenRouter)
+            if self._admit(self.fallback_config):
+                try:
+                    logger.debug("Attempting Fallback LLM 1 (OpenRouter)...")
+                    content = await self._attempt_provider(self.fallback_config, self._call_openrouter_async, messages, response_format)
+                    return self._served(self.fallback_config, content)
+                except Exception as e:
+                    logger.error(f"Fallback LLM 1 also failed: {e!r}")
             
         # 3. Final Failure
-        return {"content": json.dumps({"intent": "LLM_FAILURE"}), "provider": "NONE"}
+        METRICS.increment("llm_failure_total")
+        return {"content": json.dumps({"intent": "LLM_FAILURE"}), "provider": NO_PROVIDER}
 
-    def translate_prompt_sync(self, required_prompt: str, user_language: str) -> str:
-        """Uses LLM to translate or localize a fixed prompt, preserving Hinglish style."""
-        
-        # NEW SYSTEM PROMPT: Explicitly instructs the LLM to adapt to Hinglish
+    async def _get_response_hedged(self, messages: list, response_format: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """
+        Hedged Primary-Fallback: the fallback is fired as soon as the primary is slower than its
+        usual latency percentile (or fails), and the first good answer wins. Returns None if both failed.
+        """
+        racers = {}
+        if self._admit(self.primary_config):
+            logger.debug("Attempting Primary LLM (Chutes AI), hedged...")
+            task = asyncio.ensure_future(self._attempt_provider(self.primary_config, self._call_chutes_async, messages, response_format))
+            racers[task] = self.primary_config
+            done, _ = await asyncio.wait({task}, timeout=self._hedge_delay())
+            if task in done and task.exception() is None:
+                return self._served(self.primary_config, task.result())
+            if task in done:
+                logger.warning(f"Primary LLM failed ({task.exception()!r}). Falling back to OpenRouter.")
+                del racers[task]
+                METRICS.increment("llm_fallback_total")
+            else:
+                self.hedge_stats["fired"] += 1
+                METRICS.increment("llm_hedge_fired_total")
+                logger.debug("Primary LLM is slow, firing hedged request to OpenRouter...")
+
+        if self._admit(self.fallback_config):
+            task = asyncio.ensure_future(self._attempt_provider(self.fallback_config, self._call_openrouter_async, messages, response_format))
+            racers[task] = self.fallback_config
+
+        try:
+            pending = set(racers)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        provider = racers[task]
+                        if len(racers) > 1 and provider is self.fallback_config:
+                            self.hedge_stats["fallback_wins"] += 1
+                        return self._served(provider, task.result())
+                    logger.warning(f"{racers[task]['name']} failed ({task.exception()!r}).")
+        finally:
+            for task in racers:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # mark a losing racer's failure as retrieved
+        return None
+
+    # --- SHUTDOWN ---
+
+    async def aclose(self):
+        """Closes the pooled session of the running loop (call before that loop shuts down)."""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+        await asyncio.to_thread(self.translation_cache.flush)
+
+    def close(self):
+        """Closes every pooled session and stops the service loop. Safe to call more than once."""
+        self.translation_cache.flush()
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            for session_loop, session in list(self._sessions.items()):
+                if session_loop is loop and not session.closed:
+                    asyncio.run_coroutine_threadsafe(session.close(), loop).result()
+            self._sessions.pop(loop, None)
+            loop.call_soon_threadsafe(loop.stop)
+            self._loop_thread.join()
+            loop.close()
+        self._loop = None
+        self._loop_thread = None
+
+    # --- TRANSLATION ---
+
+    async def _translate_async(self, text: str, user_language: str, is_template: bool = False) -> Optional[str]:
+        """Sends one translation request. Returns None if both providers failed."""
+        if is_source_language(user_language):
+            return text
+        system_prompt = TRANSLATOR_SYSTEM_PROMPT.format(language=user_language)
+        if is_template:
+            system_prompt += PLACEHOLDER_INSTRUCTION
         messages = [
-            {"role": "system", "content": f"You are a professional translator and receptionist. Translate the following English prompt into a conversational, polite {user_language} response. If the requested language is 'Hinglish' or 'Hindi', use the Devanagari script for pure Hindi words, but retain English words (e.g., 'booking,' 'service') in Roman script, maintaining a conversational Hinglish style. Do NOT add extra context, just the translated prompt."},
-            {"role": "user", "content": required_prompt}
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": text}
         ]
-        
-        # Use the same fallback logic for high reliability
-        llm_result = self.get_response_sync(messages, structured=False)
-        
-        if '"intent": "LLM_FAILURE"' in llm_result['content']:
-            # Return the original English prompt as the ultimate fallback
-            return required_prompt 
-        
-        return llm_result['content']
\ No newline at end of file
+
+        # Use the same fallback logic for high reliability; a shed translation falls back to English
+        try:
+            llm_result = await self.get_response_async(messages, structured=False)
+        except LLMOverloaded:
+            return None
+
+        if llm_result['provider'] == NO_PROVIDER:
+            return None
+
+        return llm_result['content'].strip()
+
+    async def translate_prompt_async(self, required_prompt: str, user_language: str) -> str:
+        """Uses LLM to translate or localize a fixed prompt, preserving Hinglish style."""
+        translated = await self._translate_async(required_prompt, user_language)
+
+        # Return the original English prompt as the ultimate fallback
+        return translated if translated is not None else required_prompt
+
+    def translate_prompt_sync(self, required_prompt: str, user_language: str) -> str:
+        """Synchronous wrapper for translate_prompt_async."""
+        return self.run_sync(self.translate_prompt_async(required_prompt, user_language))
+
+    async def translate_template_async(self, template_id: str, user_language: str, **format_args) -> str:
+        """
+        Localizes a PROMPTS/MESSAGES template through the translation cache.
+        The template is translated once with its placeholders intact and then formatted locally,
+        so only the first request per (template, language) ever reaches the LLM.
+        """
+        with stage("translation"):
+            return await self._translate_template(template_id, user_language, format_args)
+
+    async def _translate_template(self, template_id: str, user_language: str, format_args: Dict[str, Any]) -> str:
+        if is_source_language(user_language):
+            METRICS.increment("translation_cache_total", result="source")
+            return TEMPLATE_CATALOGUE[template_id].format(**format_args)
+        cached = self.translation_cache.render(template_id, user_language, format_args)
+        METRICS.increment("translation_cache_total", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            return cached
+
+        english_template = TEMPLATE_CATALOGUE[template_id]
+        english_text = english_template.format(**format_args)
+
+        if self.translation_cache.get_template(template_id, user_language) is None:
+            translated_template = await self._translate_async(english_template, user_language, is_template=True)
+            if translated_template is not None and self.translation_cache.set_template(
+                template_id, user_language, english_template, translated_template
+            ):
+                return self.translation_cache.render(template_id, user_language, format_args)
+
+        # The LLM mangled the placeholders: translate this exact rendering and remember it
+        translated = await self._translate_async(english_text, user_language)
+        if translated is None:
+            return english_text
+        self.translation_cache.set_rendered(template_id, user_language, format_args, translated)
+        return translated
+
+    def render_template_cached(self, template_id: str, user_language: str, **format_args) -> str:
+        """Localizes a template from the translation cache only (English if uncached); never calls the LLM."""
+        if is_source_language(user_language):
+            return TEMPLATE_CATALOGUE[template_id].format(**format_args)
+        cached = self.translation_cache.render(template_id, user_language, format_args)
+        return cached if cached is not None else TEMPLATE_CATALOGUE[template_id].format(**format_args)
+
+    def translate_template_sync(self, template_id: str, user_language: str, **format_args) -> str:
+        """Synchronous wrapper for translate_template_async."""
+        return self.run_sync(self.translate_template_async(template_id, user_language, **format_args))
+
+    async def warm_translation_cache_async(self, languages: Iterable[str], template_ids: Iterable[str] = None) -> int:
+        """
+        Pre-translates the whole template catalogue (or just `template_ids`) for the given languages
+        (run at startup), so hot-path turns never wait on a translation call. Templates already
+        cached are skipped. Returns the number of templates translated.
+        """
+        templates = TEMPLATE_CATALOGUE if template_ids is None else {t: TEMPLATE_CATALOGUE[t] for t in template_ids}
+
+        async def _warm_one(template_id: str, english_template: str, language: str) -> bool:
+            translated = await self._translate_async(english_template, language, is_template=True)
+            if translated is not None and self.translation_cache.set_template(
+                template_id, language, english_template, translated
+            ):
+                return True
+            logger.warning(f"Could not pre-translate template '{template_id}' into {language}.")
+            return False
+
+        jobs = [
+            _warm_one(template_id, english_template, language)
+            for language in languages if not is_source_language(language)
+            for template_id, english_template in templates.items()
+            if self.translation_cache.get_template(template_id, language) is None
+        ]
+        # The catalogue is small; translate it concurrently over the shared connection pool
+        results = await asyncio.gather(*jobs)
+        return sum(results)
+
+    def warm_translation_cache(self, languages: Iterable[str]) -> int:
+        """Synchronous wrapper for warm_translation_cache_async."""
+        return self.run_sync(self.warm_translation_cache_async(languages))
+
+
+# --- Shared Client ---
+
+_SHARED_CLIENT: Optional[LLMFallbackService] = None
+_SHARED_CLIENT_LOCK = threading.Lock()
+
+
+def get_llm_client() -> LLMFallbackService:
+    """Returns the process-wide client, creating it on first use (one pool, cache and limiter per process)."""
+    global _SHARED_CLIENT
+    with _SHARED_CLIENT_LOCK:
+        if _SHARED_CLIENT is None:
+            _SHARED_CLIENT = LLMFallbackService()
+        return _SHARED_CLIENT
+
+
+def set_llm_client(client: LLMFallbackService):
+    """Replaces the process-wide client (e.g. one with a throwaway translation cache for benchmarks)."""
+    global _SHARED_CLIENT
+    with _SHARED_CLIENT_LOCK:
+        _SHARED_CLIENT = client
+
+
+def close_llm_client():
+    """Closes the process-wide client's sessions and service loop (call on shutdown)."""
+    global _SHARED_CLIENT
+    with _SHARED_CLIENT_LOCK:
+        if _SHARED_CLIENT is not None:
+            _SHARED_CLIENT.close()
+            _SHARED_CLIENT = None
@@ -0,0 +1,119 @@
+# core/message_coalescer.py
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from config.settings import COALESCE_WINDOW_SECONDS, COALESCE_MAX_WAIT_SECONDS, DEFAULT_TENANT
+from .conversation_engine import ConversationEngine
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingBurst:
+    """Messages of one user collected for the next turn."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.messages: List[str] = []
+        self.waiters: List[asyncio.Future] = []
+        self.first_at = loop.time()
+        self.last_at = self.first_at
+        self.flush_task: Optional[asyncio.Task] = None
+
+
+class MessageCoalescer:
+    """
+    Debounces bursts like "hi" / "I want to book" / "for my son" into ONE engine turn.
+
+    A user's messages are collected until no new one arrives for `window` seconds, or until
+    `max_wait` seconds after the first one, whichever comes first. The burst then runs as a
+    single handle_message() call with the messages joined by newlines: one extraction, one
+    state transition, one reply.
+
+    submit() resolves with the reply for the message that closed the burst (the latest one)
+    and with None for the earlier messages absorbed into it, so a transport sends exactly one
+    reply per turn. Messages arriving while that turn runs start the next burst; the engine's
+    per-user lock keeps the turns in order.
+    """
+
+    def __init__(self, engine: ConversationEngine, window: float = COALESCE_WINDOW_SECONDS,
+                 max_wait: float = COALESCE_MAX_WAIT_SECONDS):
+        self.engine = engine
+        self.window = window
+        self.max_wait = max(max_wait, window)
+        self._pending: Dict[tuple, _PendingBurst] = {}
+
+    async def submit(self, user_id: str, user_msg: str, tenant_id: str = DEFAULT_TENANT) -> Optional[str]:
+        """Queues one inbound message; returns the turn's reply, or None if a later message carries it."""
+        if self.window <= 0:
+            return await self.engine.handle_message(user_id, user_msg, tenant_id)
+
+        loop = asyncio.get_running_loop()
+        key = (tenant_id, user_id)
+        burst = self._pending.get(key)
+        if burst is None:
+            burst = self._pending[key] = _PendingBurst(loop)
+            burst.flush_task = asyncio.create_task(self._flush_when_quiet(key, burst))
+        burst.messages.append(user_msg)
+        burst.last_at = loop.time()
+
+        waiter = loop.create_future()
+        burst.waiters.append(waiter)
+        return await waiter
+
+    async def flush_all(self):
+        """Runs every pending burst now (e.g. before shutdown)."""
+        for key, burst in list(self._pending.items()):
+            burst.flush_task.cancel()
+            await self._run_burst(key, burst)
+
+    # --- Internals ---
+
+    async def _flush_when_quiet(self, key: tuple, burst: _PendingBurst):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                deadline = min(burst.last_at + self.window, burst.first_at + self.max_wait)
+                delay = deadline - loop.time()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # flush_all() claims the burst before cancelling; otherwise nobody will run it
+            if self._pending.get(key) is burst:
+                del self._pending[key]
+                self._cancel_waiters(burst)
+            raise
+        await self._run_burst(key, burst)
+
+    async def _run_burst(self, key: tuple, burst: _PendingBurst):
+        # Detach first, so messages arriving during the turn open a new burst
+        if self._pending.get(key) is not burst:
+            return
+        del self._pending[key]
+
+        tenant_id, user_id = key
+        if len(burst.messages) > 1:
+            logger.debug(f"Coalesced {len(burst.messages)} messages from {user_id} into one turn.")
+        try:
+            reply = await self.engine.handle_message(user_id, "\n".join(burst.messages), tenant_id)
+        except Exception as e:
+            for waiter in burst.waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+        except BaseException:
+            # Cancelled mid-turn (e.g. at shutdown): release the callers, then propagate
+            self._cancel_waiters(burst)
+            raise
+
+        *absorbed, last = burst.waiters
+        for waiter in absorbed:
+            if not waiter.done():
+                waiter.set_result(None)
+        if not last.done():
+            last.set_result(reply)
+
+    @staticmethod
+    def _cancel_waiters(burst: _PendingBurst):
+        for waiter in burst.waiters:
+            waiter.cancel()
@@ -0,0 +1,311 @@
+# core/metrics.py
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from config.settings import LOG_LEVEL
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency buckets: 0.1 ms .. 30 s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Upper bounds (characters) of the prompt/response size buckets
+SIZE_BUCKETS = (64, 256, 1024, 2048, 4096, 8192, 16384, 65536)
+
+
+# --- Histograms ---
+
+class Histogram:
+    """Fixed-bucket histogram: O(log buckets) to record, percentiles interpolated within a bucket."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = percentile / 100 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / bucket_count, self.max)
+            seen += bucket_count
+        return self.max
+
+    def merge(self, other: "Histogram"):
+        """Adds another histogram with the same buckets (e.g. one recorded in a worker process)."""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, object]) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label_text(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels] + ([extra] if extra else [])
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """Process-wide counters and histograms, keyed by metric name plus labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[LabelKey, Histogram] = {}
+        self._counters: Dict[LabelKey, float] = {}
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self._histograms.get(_key(name, labels))
+
+    def counter(self, name: str, **labels) -> float:
+        return self._counters.get(_key(name, labels), 0)
+
+    def collect(self, name: str) -> list:
+        """Every (labels, Histogram) pair recorded under `name`."""
+        with self._lock:
+            return [(dict(labels), h) for (metric, labels), h in self._histograms.items() if metric == name]
+
+    def counter_total(self, name: str) -> float:
+        """Sum of a counter over all of its label sets."""
+        with self._lock:
+            return sum(value for (metric, _), value in self._counters.items() if metric == name)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    # --- Cross-process Aggregation ---
+
+    def export_state(self) -> dict:
+        """Picklable copy of every counter and histogram, to be merged into another registry."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {key: (h.buckets, list(h.counts), h.count, h.sum, h.max) for key, h in self._histograms.items()},
+            }
+
+    def merge_state(self, state: dict):
+        """Adds the counters and histograms of an export_state() into this registry."""
+        with self._lock:
+            for key, value in state["counters"].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, (buckets, counts, count, total, maximum) in state["histograms"].items():
+                other = Histogram(buckets)
+                other.counts, other.count, other.sum, other.max = counts, count, total, maximum
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(buckets)
+                histogram.merge(other)
+
+    # --- Export ---
+
+    def snapshot(self) -> dict:
+        """JSON-friendly view: counters, and count/sum/p50/p95/p99/max per histogram."""
+        with self._lock:
+            return {
+                "counters": {f"{name}{_label_text(labels)}": value for (name, labels), value in sorted(self._counters.items())},
+                "histograms": {f"{name}{_label_text(labels)}": h.snapshot() for (name, labels), h in sorted(self._histograms.items())},
+            }
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{_label_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, bucket_count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                    cumulative += bucket_count
+                    le = 'le="%s"' % bound
+                    lines.append(f"{name}_bucket{_label_text(labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_label_text(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+# --- Per-turn Tracing ---
+
+class TurnTrace:
+    """Stage durations of one conversation turn (shared by every task the turn spawns)."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.llm_calls = 0
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def summary(self) -> str:
+        total = time.perf_counter() - self.started
+        parts = " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in self.stages.items())
+        return f"turn user={self.user_id} total={total * 1000:.1f}ms llm_calls={self.llm_calls} {parts}"
+
+
+_CURRENT_TRACE: contextvars.ContextVar[Optional[TurnTrace]] = contextvars.ContextVar("turn_trace", default=None)
+
+
+def current_trace() -> Optional[TurnTrace]:
+    return _CURRENT_TRACE.get()
+
+
+@contextmanager
+def trace_turn(user_id: str, **labels):
+    """Times a whole turn (turn_seconds) and logs its stage breakdown at DEBUG level."""
+    trace = TurnTrace(user_id)
+    token = _CURRENT_TRACE.set(trace)
+    try:
+        yield trace
+    finally:
+        _CURRENT_TRACE.reset(token)
+        METRICS.observe("turn_seconds", time.perf_counter() - trace.started, **labels)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(trace.summary())
+
+
+def record_stage(name: str, seconds: float, **labels):
+    """Records an already measured stage duration (turn_stage_seconds{stage=...})."""
+    METRICS.observe("turn_stage_seconds", seconds, stage=name, **labels)
+    trace = _CURRENT_TRACE.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+
+@contextmanager
+def stage(name: str, **labels):
+    """Times one stage of the current turn."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started, **labels)
+
+
+# --- Exposure: scrape endpoint and periodic dump ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, content_type = json.dumps(METRICS.snapshot(), indent=2).encode(), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, content_type = METRICS.render_prometheus().encode(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes are not worth a log line each
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves /metrics (Prometheus) and /metrics.json from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Metrics available at http://{host}:{server.server_port}/metrics")
+    return server
+
+
+def start_periodic_dump(interval_seconds: float) -> threading.Event:
+    """Logs the metrics snapshot as one JSON line every interval. Set the returned event to stop."""
+    stop = threading.Event()
+
+    def _dump():
+        while not stop.wait(interval_seconds):
+            logger.info("metrics " + json.dumps(METRICS.snapshot()))
+
+    threading.Thread(target=_dump, name="metrics-dump", daemon=True).start()
+    return stop
+
+
+# --- Logging ---
+
+_LISTENER: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(level: str = LOG_LEVEL):
+    """
+    Routes all log records through a queue to one background writer thread, so turns on the
+    event loop never block on the terminal. Output keeps the 'LEVEL: message' look of the CLI.
+    """
+    global _LISTENER
+    if _LISTENER is not None:
+        return
+    records = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+    _LISTENER = logging.handlers.QueueListener(records, stream_handler)
+    _LISTENER.start()
+    atexit.register(_LISTENER.stop)
+
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(records)]
+    root.setLevel(level)
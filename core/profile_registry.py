@@ -0,0 +1,154 @@
+# core/profile_registry.py
+import glob
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+import yaml
+
+from config.settings import CLINIC_PROFILES, CLINIC_PROFILE_DIR, DEFAULT_TENANT, PROFILE_RELOAD_CHECK_SECONDS
+from .knowledge_base import KnowledgeBase
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledProfile:
+    """
+    Everything derived from one clinic's business_profile.yaml, computed once per version
+    of the file instead of on every message: service lists and sets, the FAQ index, and a
+    cache for prompt prefixes (filled by core/intent_detector.py on first use).
+    """
+
+    def __init__(self, tenant_id: str, business_data: dict, path: Optional[str] = None, mtime: float = 0.0):
+        self.tenant_id = tenant_id
+        self.business_data = business_data
+        self.path = path
+        self.mtime = mtime
+        # Bumped on every reload; consumers holding derived state compare against it
+        self.version = mtime or time.time()
+
+        clinic_info = business_data.get('clinic_info', {}) or {}
+        self.clinic_info: Dict[str, Any] = clinic_info
+        self.name: str = clinic_info.get('name', tenant_id)
+        self.hours: str = clinic_info.get('hours', '')
+        self.contact: str = clinic_info.get('contact', '')
+
+        # Validation rules
+        self.services_list = [s['name'] for s in business_data.get('services', []) or []]
+        self.services_text = ', '.join(self.services_list)
+        self.valid_services = frozenset(self.services_list)
+
+        # FAQ retrieval index
+        self.knowledge_base = KnowledgeBase(business_data)
+
+        # Prebuilt prompt prefixes, keyed by (purpose, state)
+        self.prompt_cache: Dict[Tuple[str, str], str] = {}
+
+
+def load_profile_yaml(path: str) -> dict:
+    """Loads one business profile from YAML."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+class ProfileRegistry:
+    """
+    Serves the compiled profile of many clinics (tenants) from one process.
+
+    Tenants come from CLINIC_PROFILES and from every *.yaml file in CLINIC_PROFILE_DIR
+    (tenant id = file name). get() re-checks a file's mtime at most every `check_interval`
+    seconds and recompiles it when it changed, so edits go live without a restart. A file
+    that fails to parse keeps serving the last good version.
+    """
+
+    def __init__(self, profiles: Dict[str, str] = None, profile_dir: Optional[str] = CLINIC_PROFILE_DIR,
+                 check_interval: float = PROFILE_RELOAD_CHECK_SECONDS):
+        self.check_interval = check_interval
+        self._paths: Dict[str, str] = dict(CLINIC_PROFILES if profiles is None else profiles)
+        if profile_dir and os.path.isdir(profile_dir):
+            for path in sorted(glob.glob(os.path.join(profile_dir, "*.yaml"))):
+                self._paths.setdefault(os.path.splitext(os.path.basename(path))[0], path)
+        self._profiles: Dict[str, CompiledProfile] = {}
+        self._last_checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_business_data(cls, business_data: dict, tenant_id: str = DEFAULT_TENANT) -> "ProfileRegistry":
+        """A registry holding one in-memory profile (no file, no reload)."""
+        registry = cls(profiles={}, profile_dir=None)
+        registry.register(tenant_id, business_data)
+        return registry
+
+    def register(self, tenant_id: str, business_data: dict):
+        """Adds or replaces an in-memory profile."""
+        with self._lock:
+            self._paths.pop(tenant_id, None)
+            self._profiles[tenant_id] = CompiledProfile(tenant_id, business_data)
+
+    def tenants(self) -> list:
+        return sorted(set(self._paths) | set(self._profiles))
+
+    def get(self, tenant_id: str = DEFAULT_TENANT) -> CompiledProfile:
+        """Returns the current compiled profile of a tenant, hot-reloading it if its file changed."""
+        profile = self._profiles.get(tenant_id)
+        path = self._paths.get(tenant_id)
+        if path is None:
+            if profile is None:
+                raise KeyError(f"Unknown clinic profile '{tenant_id}'.")
+            return profile
+
+        now = time.monotonic()
+        if profile is not None and now - self._last_checked.get(tenant_id, 0.0) < self.check_interval:
+            return profile
+
+        with self._lock:
+            self._last_checked[tenant_id] = now
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError as e:
+                if profile is None:
+                    raise
+                logger.warning(f"Cannot stat profile {path} ({e}); keeping the loaded version.")
+                return profile
+            if profile is not None and profile.mtime == mtime:
+                return profile
+            try:
+                compiled = CompiledProfile(tenant_id, load_profile_yaml(path), path, mtime)
+            except Exception as e:
+                if profile is None:
+                    raise
+                logger.error(f"Reloading profile {path} failed ({e}); keeping the previous version.")
+                return profile
+            if profile is not None:
+                logger.info(f"Reloaded clinic profile '{tenant_id}' from {path}.")
+            self._profiles[tenant_id] = compiled
+            return compiled
+
+
+# --- Compiled Profiles for Bare business_data Dicts ---
+
+# A few recently used dicts (a process normally has one); each entry holds its dict, so the
+# id() it is keyed by cannot be reused by another object while the entry exists
+_COMPILED_MAX_ENTRIES = 8
+_COMPILED: "OrderedDict[int, Tuple[dict, CompiledProfile]]" = OrderedDict()
+_COMPILED_LOCK = threading.Lock()
+
+
+def as_compiled_profile(business_data) -> CompiledProfile:
+    """Accepts a CompiledProfile or a raw business_data dict (compiled once, kept in a small LRU)."""
+    if isinstance(business_data, CompiledProfile):
+        return business_data
+    key = id(business_data)
+    with _COMPILED_LOCK:
+        cached = _COMPILED.get(key)
+        if cached is not None and cached[0] is business_data:
+            _COMPILED.move_to_end(key)
+            return cached[1]
+        compiled = CompiledProfile(DEFAULT_TENANT, business_data)
+        _COMPILED[key] = (business_data, compiled)
+        while len(_COMPILED) > _COMPILED_MAX_ENTRIES:
+            _COMPILED.popitem(last=False)
+        return compiled
@@ -0,0 +1,110 @@
+# core/provider_health.py
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker for one LLM provider.
+
+    CLOSED    -> requests flow; `failure_threshold` consecutive failures open the circuit.
+    OPEN      -> requests are skipped until `cooldown_seconds` have passed.
+    HALF_OPEN -> exactly one probe request is let through; success closes, failure re-opens.
+    """
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        """Returns True if a request may be sent now. Call only right before actually sending it."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown_seconds:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        # HALF_OPEN: admit a single probe
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Frees a probe slot when the request was cancelled before it produced a verdict."""
+        self._probe_in_flight = False
+
+
+class ProviderHealth:
+    """Circuit breaker plus rolling latency/outcome statistics for one provider."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown_seconds: float = 30.0, window: int = 200):
+        self.name = name
+        self.breaker = CircuitBreaker(failure_threshold, cooldown_seconds)
+        # Latencies (seconds) of the most recent successful calls
+        self.latencies: deque = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.skipped = 0        # requests not sent because the circuit was open
+        self.served = 0         # responses that were actually returned to the caller
+        self.last_error: Optional[str] = None
+
+    def record_success(self, latency: float):
+        self.successes += 1
+        self.latencies.append(latency)
+        self.breaker.record_success()
+
+    def record_failure(self, error: str, timed_out: bool = False):
+        self.failures += 1
+        if timed_out:
+            self.timeouts += 1
+        self.last_error = error
+        self.breaker.record_failure()
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Returns the given latency percentile in seconds, or None without samples."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, int(round(percentile / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "skipped": self.skipped,
+            "served": self.served,
+            "p50_ms": _to_ms(self.latency_percentile(50)),
+            "p95_ms": _to_ms(self.latency_percentile(95)),
+            "last_error": self.last_error,
+        }
+
+
+def _to_ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
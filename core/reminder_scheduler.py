@@ -0,0 +1,220 @@
+# core/reminder_scheduler.py
+import asyncio
+import heapq
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from config.settings import (
+    REMINDER_HORIZON_SECONDS, REMINDER_POLL_SECONDS, REMINDER_BATCH_SIZE,
+    REMINDER_MAX_ATTEMPTS, REMINDER_RETRY_DELAY_SECONDS,
+)
+from .appointment_ledger import AppointmentLedger, REMINDER_TEMPLATES, SLOT_FORMAT, get_appointment_ledger
+from .llm_client import LLMFallbackService, get_llm_client
+from .metrics import METRICS
+from .profile_registry import ProfileRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderScheduler:
+    """
+    Sends the confirmations and reminders recorded in the AppointmentLedger when they fall due.
+
+    The ledger holds every pending message; only those due within `horizon` seconds are kept
+    in memory, in a min-heap of (due_at, reminder_id), so hundreds of thousands of future
+    reminders cost a few index reads rather than memory. Every `poll_interval` seconds the
+    window is extended and bookings recorded since the last poll (by any engine process) are
+    picked up by id. On restart the heap is simply reloaded, messages missed while down included.
+
+    Due messages go out in batches of `batch_size`: one ledger lookup, one translation per
+    (template, language) the batch still lacks, local formatting per patient, the sends
+    through the OutboundDispatcher, and one transaction recording the outcome. Failed sends
+    are retried `retry_delay` seconds later, up to `max_attempts`; messages for appointments
+    that were cancelled or have already started are skipped.
+    """
+
+    def __init__(self, dispatcher, ledger: AppointmentLedger = None, registry: ProfileRegistry = None,
+                 llm_client: LLMFallbackService = None, horizon: float = REMINDER_HORIZON_SECONDS,
+                 poll_interval: float = REMINDER_POLL_SECONDS, batch_size: int = REMINDER_BATCH_SIZE,
+                 max_attempts: int = REMINDER_MAX_ATTEMPTS, retry_delay: float = REMINDER_RETRY_DELAY_SECONDS):
+        self.dispatcher = dispatcher
+        self.ledger = ledger or get_appointment_ledger()
+        if self.ledger is None:
+            raise ValueError("The reminder scheduler needs an appointment ledger (APPOINTMENT_LEDGER_PATH).")
+        self.registry = registry or ProfileRegistry()
+        self.llm_client = llm_client or get_llm_client()
+        self.horizon = horizon
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        self._heap: List[Tuple[float, int]] = []
+        self._queued: Set[int] = set()
+        self._loaded_until: Optional[float] = None  # every pending message due before this is in the heap
+        self._last_id = 0                           # every message with a higher id is new since the last poll
+        self._next_poll = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._sending: Optional[asyncio.Task] = None
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "skipped": 0, "batches": 0}
+
+    # --- Lifecycle ---
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self):
+        """Stops the scheduler once the batch being sent (if any) is recorded, so nothing goes out twice."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._sending is not None:
+            await asyncio.gather(self._sending, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            try:
+                if time.time() >= self._next_poll:
+                    await self._poll()
+                batch = self._pop_due(time.time())
+                if batch:
+                    # Shielded: cancelling the loop must not stop a batch between sending and recording it
+                    self._sending = asyncio.ensure_future(self._send_batch(batch))
+                    await asyncio.shield(self._sending)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Reminder scheduler iteration failed")
+                self._next_poll = time.time() + self.poll_interval
+            next_due = self._heap[0][0] if self._heap else float("inf")
+            await asyncio.sleep(max(0.0, min(next_due, self._next_poll) - time.time()))
+
+    # --- Heap ---
+
+    async def _poll(self):
+        """Moves the in-memory window forward and picks up messages recorded since the last poll."""
+        now = time.time()
+        up_to_id = await asyncio.to_thread(self.ledger.max_reminder_id)
+        if self._loaded_until is not None:
+            self._push_all(await asyncio.to_thread(
+                self.ledger.pending_added_between, self._last_id, up_to_id, self._loaded_until
+            ))
+        loaded_until = now + self.horizon
+        self._push_all(await asyncio.to_thread(self.ledger.pending_due_between, self._loaded_until, loaded_until))
+        self._loaded_until, self._last_id = loaded_until, up_to_id
+        self._next_poll = now + self.poll_interval
+
+    def _push_all(self, rows: List[Tuple[int, float]]):
+        for reminder_id, due_at in rows:
+            self._push(reminder_id, due_at)
+
+    def _push(self, reminder_id: int, due_at: float):
+        if reminder_id not in self._queued:
+            self._queued.add(reminder_id)
+            heapq.heappush(self._heap, (due_at, reminder_id))
+
+    def _pop_due(self, now: float) -> List[int]:
+        batch = []
+        while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+            _, reminder_id = heapq.heappop(self._heap)
+            self._queued.discard(reminder_id)
+            batch.append(reminder_id)
+        return batch
+
+    # --- Sending ---
+
+    async def _send_batch(self, reminder_ids: List[int]):
+        try:
+            await self._send_and_record(reminder_ids)
+        except Exception:
+            logger.exception(f"Reminder batch of {len(reminder_ids)} failed (reminder ids {reminder_ids}); "
+                             f"retrying in {self.retry_delay:.0f}s")
+            self._requeue(reminder_ids)
+        except BaseException:
+            self._requeue(reminder_ids)
+            raise
+
+    def _requeue(self, reminder_ids: List[int]):
+        # The popped ids are still pending in the ledger but no longer in the heap: queue them
+        # again, or they would wait for a restart. A failure after sending may repeat a message,
+        # which beats silently dropping it.
+        retry_at = time.time() + self.retry_delay
+        for reminder_id in reminder_ids:
+            self._push(reminder_id, retry_at)
+
+    async def _send_and_record(self, reminder_ids: List[int]):
+        details = await asyncio.to_thread(self.ledger.reminder_details, reminder_ids)
+        now = time.time()
+        due, skipped = [], []
+        for item in details:
+            if item["status"] != "pending":
+                continue  # finished by another scheduler since it was loaded
+            starts_at = datetime.strptime(item["starts_at"], SLOT_FORMAT)
+            if item["appointment_status"] != "booked" or starts_at.timestamp() <= now:
+                skipped.append(item["id"])
+            else:
+                due.append((item, starts_at))
+
+        # Localize each message kind once per language, then only format per patient
+        languages = {item["language"] for item, _ in due}
+        template_ids = {REMINDER_TEMPLATES[item["kind"]] for item, _ in due}
+        if due:
+            await self.llm_client.warm_translation_cache_async(languages, template_ids)
+        sends = [
+            self.dispatcher.send_text(item["user_id"], self._render(item, starts_at))
+            for item, starts_at in due
+        ]
+        results = await asyncio.gather(*sends, return_exceptions=True)
+
+        sent, retry, failed = [], {}, []
+        outcomes = Counter()
+        for (item, _), result in zip(due, results):
+            if not isinstance(result, Exception):
+                sent.append(item["id"])
+                outcomes[(item["kind"], "sent")] += 1
+            elif item["attempts"] + 1 < self.max_attempts:
+                retry[item["id"]] = now + self.retry_delay
+                outcomes[(item["kind"], "retried")] += 1
+                logger.warning(f"Sending {item['kind']} {item['id']} (appointment {item['appointment_id']}) failed, "
+                               f"attempt {item['attempts'] + 1}/{self.max_attempts}: {result}")
+            else:
+                failed.append(item["id"])
+                outcomes[(item["kind"], "failed")] += 1
+                logger.error(f"Giving up on {item['kind']} {item['id']} (appointment {item['appointment_id']}) "
+                             f"to {item['user_id']}: {result}")
+        await asyncio.to_thread(self.ledger.finish, sent, retry, failed, skipped)
+        for reminder_id, due_at in retry.items():
+            self._push(reminder_id, due_at)
+
+        self.stats["batches"] += 1
+        for key, count in (("sent", len(sent)), ("retried", len(retry)), ("failed", len(failed)), ("skipped", len(skipped))):
+            self.stats[key] += count
+        for (kind, result), count in outcomes.items():
+            METRICS.increment("reminders_total", count, kind=kind, result=result)
+        if skipped:
+            METRICS.increment("reminders_total", len(skipped), kind="any", result="skipped")
+
+    def _render(self, item: Dict[str, Any], starts_at: datetime) -> str:
+        try:
+            profile = self.registry.get(item["tenant_id"])
+            clinic, contact = profile.name, profile.contact
+        except KeyError:
+            clinic, contact = item["tenant_id"], ""
+        return self.llm_client.render_template_cached(
+            REMINDER_TEMPLATES[item["kind"]], item["language"],
+            name=item["name"] or "Patient", service=item["service"] or "consultation",
+            date=starts_at.strftime("%Y-%m-%d"), time=starts_at.strftime("%H:%M"),
+            clinic=clinic, contact=contact,
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "scheduled": len(self._heap),
+            "next_due_in": round(self._heap[0][0] - time.time(), 1) if self._heap else None,
+        }
@@ -0,0 +1,141 @@
+# core/response_cache.py
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .metrics import METRICS
+
+ISO_DATE_PATTERN = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+RESULT_LABELS = {"hits": "hit", "misses": "miss", "coalesced": "coalesced"}
+
+
+def normalize_messages(messages: list) -> list:
+    """Collapses whitespace in every message, so re-indented prompts and stray spaces share a key."""
+    return [
+        {"role": m.get("role"), "content": WHITESPACE_PATTERN.sub(" ", str(m.get("content", ""))).strip()}
+        for m in messages
+    ]
+
+
+def _end_of_today() -> float:
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return time.time() + (midnight - now).total_seconds()
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of LLM responses keyed on the normalized messages and the structured flag,
+    with single-flight deduplication: concurrent identical requests share one provider call.
+
+    Prompts that mention today's date (the extraction prompt resolves 'tomorrow' against it)
+    expire at midnight at the latest, so relative dates are never resolved against a stale day.
+    Failures and structured answers that are not valid JSON are never stored.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expired": 0, "not_cached": 0}
+
+    @staticmethod
+    def make_key(messages: list, structured: bool) -> str:
+        payload = json.dumps({"messages": normalize_messages(messages), "structured": bool(structured)},
+                             ensure_ascii=False, sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    # --- Storage ---
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.stats["expired"] += 1
+                return None
+            self._entries.move_to_end(key)
+            return result
+
+    def put(self, key: str, result: Dict[str, Any], date_sensitive: bool = False):
+        expires_at = time.time() + self.ttl_seconds
+        if date_sensitive:
+            expires_at = min(expires_at, _end_of_today())
+        with self._lock:
+            self._entries[key] = (expires_at, dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def is_cacheable(result: Dict[str, Any], structured: bool) -> bool:
+        if result.get("provider") == "NONE":
+            return False
+        if structured:
+            try:
+                json.loads(result["content"])
+            except (TypeError, ValueError):
+                return False
+        return True
+
+    # --- Lookup with single-flight ---
+
+    async def get_or_call(self, messages: list, structured: bool,
+                          call: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Returns a cached response, joins an identical in-flight call, or makes the call once."""
+        key = self.make_key(messages, structured)
+        cached = self.get(key)
+        if cached is not None:
+            self._count("hits")
+            return dict(cached)
+
+        flight_key = (asyncio.get_running_loop(), key)
+        task = self._in_flight.get(flight_key)
+        if task is not None:
+            self._count("coalesced")
+        else:
+            self._count("misses")
+            # A separate task, so a cancelled caller does not cancel the call others are waiting on
+            task = asyncio.ensure_future(self._call_and_store(key, messages, structured, call))
+            self._in_flight[flight_key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(flight_key, None))
+        return dict(await asyncio.shield(task))
+
+    async def _call_and_store(self, key: str, messages: list, structured: bool,
+                              call: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        result = await call()
+        if self.is_cacheable(result, structured):
+            date_sensitive = any(ISO_DATE_PATTERN.search(m.get("content", "")) for m in messages)
+            self.put(key, result, date_sensitive)
+        else:
+            self.stats["not_cached"] += 1
+        return result
+
+    def _count(self, stat: str):
+        self.stats[stat] += 1
+        METRICS.increment("llm_response_cache_total", result=RESULT_LABELS[stat])
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_ratio": round((self.stats["hits"] + self.stats["coalesced"]) / lookups, 4) if lookups else None,
+        }
@@ -0,0 +1,415 @@
+# core/state_store.py
+import abc
+import argparse
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from config.settings import (
+    STATE_BACKEND, STATE_DIR, STATE_DB_PATH, SESSION_TTL_SECONDS, STATE_PURGE_INTERVAL_SECONDS,
+    STATE_WRITE_BEHIND_INTERVAL_SECONDS, STATE_WRITE_BEHIND_MAX_BATCH,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _age_seconds(data: Dict[str, Any]) -> float:
+    """Seconds since the record's 'last_updated' timestamp (0 if it has none)."""
+    try:
+        return time.time() - datetime.fromisoformat(data["last_updated"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+
+# --- Storage Interface ---
+
+class StateStore(abc.ABC):
+    """
+    Persistence interface for ConversationState records.
+    A record is the dict {"state": str, "last_updated": ISO timestamp, "context": dict}.
+    Records older than `ttl_seconds` are treated as expired sessions and never returned; an
+    expired record is deleted when it is read, and all of them every `purge_interval` seconds
+    by purge_if_due() (called by the conversation engine and the write-behind flusher).
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, purge_interval: Optional[float] = STATE_PURGE_INTERVAL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self._next_purge = time.monotonic() + (purge_interval or 0)
+        self._purge_lock = threading.Lock()
+
+    def _is_expired(self, data: Dict[str, Any]) -> bool:
+        return bool(self.ttl_seconds) and _age_seconds(data) > self.ttl_seconds
+
+    def purge_due(self) -> bool:
+        """True once purge_interval has passed since the last purge (cheap, safe on the event loop)."""
+        return bool(self.ttl_seconds and self.purge_interval) and time.monotonic() >= self._next_purge
+
+    def purge_if_due(self) -> int:
+        """Runs purge_expired() if it is due, at most once per purge_interval. Returns how many were removed."""
+        with self._purge_lock:
+            if not self.purge_due():
+                return 0
+            self._next_purge = time.monotonic() + self.purge_interval
+        removed = self.purge_expired()
+        if removed:
+            logger.info(f"Purged {removed} expired sessions.")
+        return removed
+
+    @abc.abstractmethod
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abc.abstractmethod
+    def save(self, user_id: str, data: Dict[str, Any]):
+        ...
+
+    @abc.abstractmethod
+    def delete(self, user_id: str):
+        ...
+
+    def purge_expired(self) -> int:
+        """Deletes expired sessions. Returns how many were removed."""
+        return 0
+
+    def flush(self):
+        """Forces buffered writes to durable storage (no-op for write-through stores)."""
+
+    def close(self):
+        self.flush()
+
+
+# --- Backend 1: One JSON File per User (legacy layout) ---
+
+class JsonFileStateStore(StateStore):
+    """The original data/conversations/{user_id}.json layout, written compactly."""
+
+    def __init__(self, state_dir: str = STATE_DIR, ttl_seconds: Optional[float] = None,
+                 purge_interval: Optional[float] = STATE_PURGE_INTERVAL_SECONDS):
+        super().__init__(ttl_seconds, purge_interval)
+        self.state_dir = state_dir
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def _get_file_path(self, user_id: str) -> str:
+        return os.path.join(self.state_dir, f"{user_id}.json")
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._get_file_path(user_id), 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            # State file doesn't exist or is invalid, start fresh
+            return None
+        if self._is_expired(data):
+            self.delete(user_id)
+            return None
+        return data
+
+    def save(self, user_id: str, data: Dict[str, Any]):
+        with open(self._get_file_path(user_id), 'w') as f:
+            json.dump(data, f, separators=(",", ":"))
+
+    def delete(self, user_id: str):
+        try:
+            os.remove(self._get_file_path(user_id))
+        except FileNotFoundError:
+            pass
+
+    def purge_expired(self) -> int:
+        if not self.ttl_seconds:
+            return 0
+        removed = 0
+        for path in glob.glob(os.path.join(self.state_dir, "*.json")):
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+# --- Backend 2: SQLite in WAL Mode ---
+
+class SQLiteStateStore(StateStore):
+    """All sessions in one SQLite table. WAL lets readers run alongside the single writer."""
+
+    def __init__(self, db_path: str = STATE_DB_PATH, ttl_seconds: Optional[float] = None,
+                 purge_interval: Optional[float] = STATE_PURGE_INTERVAL_SECONDS):
+        super().__init__(ttl_seconds, purge_interval)
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS conversations ("
+            " user_id TEXT PRIMARY KEY,"
+            " state TEXT NOT NULL,"
+            " context TEXT NOT NULL,"
+            " last_updated REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_updated ON conversations (last_updated)")
+        self._conn.commit()
+
+    @staticmethod
+    def _to_row(user_id: str, data: Dict[str, Any]) -> tuple:
+        try:
+            updated = datetime.fromisoformat(data["last_updated"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            updated = time.time()
+        return (user_id, data.get("state", "START"), json.dumps(data.get("context", {})), updated)
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, context, last_updated FROM conversations WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        if self.ttl_seconds and time.time() - row[2] > self.ttl_seconds:
+            self.delete(user_id)
+            return None
+        return {
+            "state": row[0],
+            "last_updated": datetime.fromtimestamp(row[2]).isoformat(),
+            "context": json.loads(row[1]),
+        }
+
+    def save(self, user_id: str, data: Dict[str, Any]):
+        self.save_many({user_id: data})
+
+    def save_many(self, records: Dict[str, Dict[str, Any]]):
+        """Upserts a batch of records in a single transaction."""
+        rows = [self._to_row(user_id, data) for user_id, data in records.items()]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO conversations (user_id, state, context, last_updated) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET state = excluded.state, "
+                    "context = excluded.context, last_updated = excluded.last_updated",
+                    rows,
+                )
+
+    def delete(self, user_id: str):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM conversations WHERE user_id = ?", (user_id,))
+
+    def purge_expired(self) -> int:
+        if not self.ttl_seconds:
+            return 0
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "DELETE FROM conversations WHERE last_updated < ?", (time.time() - self.ttl_seconds,)
+                )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# --- Backend 3: In-memory with Write-behind Batching ---
+
+class MemoryStateStore(StateStore):
+    """
+    Keeps every session in memory and serves reads from there. Writes only mark the record
+    dirty; a background thread flushes dirty records to the backing store in batches every
+    `flush_interval` seconds (or sooner once `max_batch` records are waiting). Several
+    transitions of the same user between two flushes cost a single write.
+    Without a backing store this is a pure in-memory store (state is lost on restart).
+    """
+
+    def __init__(self, backing: Optional[StateStore] = None, ttl_seconds: Optional[float] = None,
+                 flush_interval: float = STATE_WRITE_BEHIND_INTERVAL_SECONDS,
+                 max_batch: int = STATE_WRITE_BEHIND_MAX_BATCH,
+                 purge_interval: Optional[float] = STATE_PURGE_INTERVAL_SECONDS):
+        super().__init__(ttl_seconds, purge_interval)
+        self.backing = backing
+        self.max_batch = max_batch
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._dirty: Dict[str, Optional[Dict[str, Any]]] = {}  # None marks a pending delete
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._flusher = None
+        if backing is not None:
+            self._flush_interval = flush_interval
+            self._flusher = threading.Thread(target=self._flush_loop, name="state-write-behind", daemon=True)
+            self._flusher.start()
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            data = self._records.get(user_id)
+        if data is None and self.backing is not None and user_id not in self._dirty:
+            data = self.backing.load(user_id)
+            if data is not None:
+                with self._lock:
+                    self._records.setdefault(user_id, data)
+        if data is None:
+            return None
+        if self._is_expired(data):
+            with self._lock:
+                if self._records.get(user_id) is data:
+                    del self._records[user_id]
+            return None
+        return data
+
+    def save(self, user_id: str, data: Dict[str, Any]):
+        with self._lock:
+            self._records[user_id] = data
+            if self.backing is not None:
+                self._dirty[user_id] = data
+                if len(self._dirty) >= self.max_batch:
+                    self._wakeup.set()
+
+    def delete(self, user_id: str):
+        with self._lock:
+            self._records.pop(user_id, None)
+            if self.backing is not None:
+                self._dirty[user_id] = None
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            expired = [user_id for user_id, data in self._records.items() if self._is_expired(data)]
+            for user_id in expired:
+                del self._records[user_id]
+        removed = len(expired)
+        if self.backing is not None:
+            removed = max(removed, self.backing.purge_expired())
+        return removed
+
+    def flush(self):
+        """Writes all dirty records to the backing store in one batch."""
+        if self.backing is None:
+            return
+        with self._flush_lock:
+            with self._lock:
+                batch, self._dirty = self._dirty, {}
+            if not batch:
+                return
+            saves = {user_id: data for user_id, data in batch.items() if data is not None}
+            if saves:
+                if isinstance(self.backing, SQLiteStateStore):
+                    self.backing.save_many(saves)
+                else:
+                    for user_id, data in saves.items():
+                        self.backing.save(user_id, data)
+            for user_id, data in batch.items():
+                if data is None:
+                    self.backing.delete(user_id)
+
+    def _flush_loop(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind flush failed: {e}")
+            try:
+                self.purge_if_due()
+            except Exception as e:
+                logger.error(f"Expired session purge failed: {e}")
+
+    def close(self):
+        if self._flusher is not None:
+            self._stopped.set()
+            self._wakeup.set()
+            self._flusher.join()
+        self.flush()
+        if self.backing is not None:
+            self.backing.close()
+
+
+# --- Default Store (selected in config/settings.py) ---
+
+_DEFAULT_STORE: Optional[StateStore] = None
+_DEFAULT_STORE_LOCK = threading.Lock()
+
+
+def create_state_store(backend: str = STATE_BACKEND) -> StateStore:
+    """Builds a store for the given backend name: 'sqlite', 'memory' or 'json'."""
+    if backend == "sqlite":
+        return SQLiteStateStore(STATE_DB_PATH, ttl_seconds=SESSION_TTL_SECONDS)
+    if backend == "memory":
+        backing = SQLiteStateStore(STATE_DB_PATH, ttl_seconds=SESSION_TTL_SECONDS) if STATE_DB_PATH else None
+        return MemoryStateStore(backing, ttl_seconds=SESSION_TTL_SECONDS)
+    if backend == "json":
+        return JsonFileStateStore(STATE_DIR, ttl_seconds=SESSION_TTL_SECONDS)
+    raise ValueError(f"Unknown state backend '{backend}'.")
+
+
+def get_state_store() -> StateStore:
+    """Returns the process-wide store, creating it on first use."""
+    global _DEFAULT_STORE
+    with _DEFAULT_STORE_LOCK:
+        if _DEFAULT_STORE is None:
+            _DEFAULT_STORE = create_state_store()
+        return _DEFAULT_STORE
+
+
+def set_state_store(store: StateStore):
+    """Replaces the process-wide store (e.g. a throwaway database for benchmarks), closing the old one."""
+    global _DEFAULT_STORE
+    with _DEFAULT_STORE_LOCK:
+        if _DEFAULT_STORE is not None and _DEFAULT_STORE is not store:
+            _DEFAULT_STORE.close()
+        _DEFAULT_STORE = store
+
+
+def close_state_store():
+    """Flushes and closes the process-wide store (call on shutdown)."""
+    global _DEFAULT_STORE
+    with _DEFAULT_STORE_LOCK:
+        if _DEFAULT_STORE is not None:
+            _DEFAULT_STORE.close()
+            _DEFAULT_STORE = None
+
+
+# --- Migration Tool ---
+
+def migrate_json_states(source_dir: str, target: StateStore) -> int:
+    """Copies every data/conversations/{user_id}.json record into `target`. Returns the count."""
+    records = {}
+    for path in sorted(glob.glob(os.path.join(source_dir, "*.json"))):
+        user_id = os.path.splitext(os.path.basename(path))[0]
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping unreadable state file {path}.")
+            continue
+        records[user_id] = {
+            "state": data.get("state", "START"),
+            "last_updated": data.get("last_updated", datetime.now().isoformat()),
+            "context": data.get("context", {}),
+        }
+    if isinstance(target, SQLiteStateStore):
+        target.save_many(records)
+    else:
+        for user_id, data in records.items():
+            target.save(user_id, data)
+    target.flush()
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate per-user JSON state files into SQLite.")
+    parser.add_argument("--source", default=STATE_DIR, help="Directory holding {user_id}.json files")
+    parser.add_argument("--db", default=STATE_DB_PATH, help="Target SQLite database")
+    args = parser.parse_args()
+
+    store = SQLiteStateStore(args.db)
+    count = migrate_json_states(args.source, store)
+    store.close()
+    print(f"Migrated {count} conversation(s) from {args.source} into {args.db}.")
@@ -0,0 +1,205 @@
+# core/translation_cache.py
+import asyncio
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes of one process are still serialized by _save_lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Matches str.format placeholders such as {name} or {services_list}
+PLACEHOLDER_PATTERN = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+
+def extract_placeholders(template: str) -> set:
+    """Returns the set of placeholder names used in a template."""
+    return set(PLACEHOLDER_PATTERN.findall(template))
+
+
+class TranslationCache:
+    """
+    Two-level cache for localized prompts.
+
+    1. Template level (persisted): (template_id, language) -> translated template that
+       still contains its {placeholders}. Translated once, formatted locally forever after.
+    2. Rendered level (in memory, LRU): (template_id, language, format args) -> final text.
+       Also holds renders of templates whose translation lost a placeholder and therefore
+       had to be translated with the arguments already filled in.
+
+    Several engine processes may share one cache file. Each save merges with what is on disk
+    under an exclusive file lock and replaces the file from a private temp file, so no process
+    discards another's translations; saves triggered on an event loop run in a thread.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 512):
+        self.path = path
+        self.max_entries = max_entries
+        self._templates: Dict[str, str] = {}
+        self._rendered: "OrderedDict[Tuple, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._save_requested = False
+        self._save_task: Optional[asyncio.Task] = None
+        self._load()
+
+    # --- Keys ---
+
+    @staticmethod
+    def _template_key(template_id: str, language: str) -> str:
+        return f"{template_id}::{language.strip().lower()}"
+
+    @staticmethod
+    def _rendered_key(template_id: str, language: str, format_args: Dict[str, Any]) -> Tuple:
+        return (template_id, language.strip().lower(), tuple(sorted((k, str(v)) for k, v in format_args.items())))
+
+    # --- Template Level ---
+
+    def get_template(self, template_id: str, language: str) -> Optional[str]:
+        return self._templates.get(self._template_key(template_id, language))
+
+    def set_template(self, template_id: str, language: str, english_template: str, translated: str) -> bool:
+        """
+        Stores a translated template if it kept every placeholder of the English original.
+        Returns False (and stores nothing) when the translation is unusable as a template.
+        """
+        if extract_placeholders(translated) != extract_placeholders(english_template):
+            return False
+        # Same placeholders but more braces, e.g. an escaped '{{name}}' that would render literally
+        if (translated.count("{"), translated.count("}")) != (english_template.count("{"), english_template.count("}")):
+            return False
+        try:
+            # Reject stray braces that would break str.format later on
+            translated.format(**{p: "" for p in extract_placeholders(translated)})
+        except (KeyError, IndexError, ValueError):
+            return False
+        with self._lock:
+            self._templates[self._template_key(template_id, language)] = translated
+        self._schedule_save()
+        return True
+
+    # --- Rendered Level ---
+
+    def get_rendered(self, template_id: str, language: str, format_args: Dict[str, Any]) -> Optional[str]:
+        key = self._rendered_key(template_id, language, format_args)
+        with self._lock:
+            if key not in self._rendered:
+                return None
+            self._rendered.move_to_end(key)
+            return self._rendered[key]
+
+    def set_rendered(self, template_id: str, language: str, format_args: Dict[str, Any], text: str):
+        key = self._rendered_key(template_id, language, format_args)
+        with self._lock:
+            self._rendered[key] = text
+            self._rendered.move_to_end(key)
+            while len(self._rendered) > self.max_entries:
+                self._rendered.popitem(last=False)
+
+    def render(self, template_id: str, language: str, format_args: Dict[str, Any]) -> Optional[str]:
+        """Returns the localized text from cache, or None if a translation call is still needed."""
+        cached = self.get_rendered(template_id, language, format_args)
+        if cached is not None:
+            return cached
+
+        translated_template = self.get_template(template_id, language)
+        if translated_template is None:
+            return None
+        try:
+            text = translated_template.format(**format_args)
+        except (KeyError, IndexError, ValueError):
+            return None
+        self.set_rendered(template_id, language, format_args, text)
+        return text
+
+    # --- On-disk Store ---
+
+    def _read_file(self) -> Dict[str, str]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            # Cache file doesn't exist or is invalid, start empty
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _load(self):
+        if self.path:
+            self._templates = self._read_file()
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _schedule_save(self):
+        """Saves in a thread when called on an event loop (bursts coalesce into one write), else right away."""
+        if not self.path:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._save()
+            return
+        with self._lock:
+            self._save_requested = True
+            if self._save_task is not None and not self._save_task.done():
+                return  # the running save task picks the request up
+            self._save_task = loop.create_task(self._save_in_background())
+
+    async def _save_in_background(self):
+        while True:
+            with self._lock:
+                if not self._save_requested:
+                    return
+                self._save_requested = False
+            try:
+                await asyncio.to_thread(self._save)
+            except OSError as e:
+                logger.warning(f"Could not save the translation cache: {e}")
+
+    def flush(self):
+        """Writes a save that is still pending (call on shutdown)."""
+        with self._lock:
+            pending, self._save_requested = self._save_requested, False
+        if pending:
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._save_lock, self._file_lock():
+            # Merge, so translations other processes saved since our last read are kept
+            on_disk = self._read_file()
+            with self._lock:
+                for key, translated in on_disk.items():
+                    self._templates.setdefault(key, translated)
+                snapshot = dict(self._templates)
+            # A private temp file in the same directory, replaced atomically
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory or '.', delete=False,
+                                             prefix=f"{os.path.basename(self.path)}.", suffix=".tmp") as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            try:
+                os.replace(f.name, self.path)
+            except OSError:
+                os.unlink(f.name)
+                raise
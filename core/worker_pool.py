@@ -0,0 +1,289 @@
+# core/worker_pool.py
+import asyncio
+import hashlib
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from bisect import bisect, insort
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from config.settings import (
+    DEFAULT_TENANT, WORKER_PROCESSES, WORKER_VIRTUAL_NODES,
+    WORKER_HEALTH_CHECK_SECONDS, WORKER_SHUTDOWN_TIMEOUT_SECONDS,
+)
+from .appointment_ledger import close_appointment_ledger
+from .conversation_engine import ConversationEngine
+from .llm_client import close_llm_client
+from .metrics import METRICS, MetricsRegistry, configure_logging
+from .profile_registry import ProfileRegistry
+from .state_store import close_state_store
+
+logger = logging.getLogger(__name__)
+
+# Engine coroutines a worker runs on request; all take (user_id, ..., tenant_id)
+ENGINE_METHODS = {"handle_message", "reset", "get_state", "get_language", "template_reply"}
+
+
+class WorkerError(Exception):
+    """A request failed inside an engine worker, or its worker died before answering."""
+
+
+# --- Consistent Hashing ---
+
+class HashRing:
+    """
+    Maps conversation keys onto workers. Each worker owns `replicas` points on a 64-bit ring
+    and a key belongs to the first point at or after its hash, so adding or removing a worker
+    only moves the keys of the ring segments it gains or loses.
+    """
+
+    def __init__(self, nodes: Iterable[Any] = (), replicas: int = WORKER_VIRTUAL_NODES):
+        self.replicas = replicas
+        self._points: list = []  # sorted (hash, node)
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+    def add(self, node: Any):
+        for replica in range(self.replicas):
+            insort(self._points, (self._hash(f"{node}#{replica}"), node))
+
+    def remove(self, node: Any):
+        self._points = [point for point in self._points if point[1] != node]
+
+    def node_for(self, key: str) -> Any:
+        if not self._points:
+            raise LookupError("The hash ring has no nodes.")
+        index = bisect(self._points, (self._hash(key),))
+        return self._points[index % len(self._points)][1]
+
+
+# --- Worker Process ---
+
+def create_engine() -> ConversationEngine:
+    """Default engine of a worker: every configured clinic, the process-wide LLM client and state store."""
+    return ConversationEngine(registry=ProfileRegistry())
+
+
+def _worker_main(worker_id: int, engine_factory: Callable, factory_args: tuple,
+                 requests: multiprocessing.Queue, results: multiprocessing.Queue):
+    configure_logging()
+    try:
+        asyncio.run(_serve(worker_id, engine_factory(*factory_args), requests, results))
+    finally:
+        close_llm_client()
+        close_state_store()
+        close_appointment_ledger()
+
+
+async def _serve(worker_id: int, engine: ConversationEngine, requests: multiprocessing.Queue,
+                 results: multiprocessing.Queue):
+    """Runs requests concurrently on one loop until the None sentinel, then drains them."""
+    loop = asyncio.get_running_loop()
+    running = set()
+    logger.debug(f"Engine worker {worker_id} ready.")
+    while True:
+        request = await loop.run_in_executor(None, requests.get)
+        if request is None:
+            break
+        task = asyncio.create_task(_run_request(engine, request, results))
+        running.add(task)
+        task.add_done_callback(running.discard)
+    await asyncio.gather(*running, return_exceptions=True)
+    await engine.llm_client.aclose()
+
+
+async def _run_request(engine: ConversationEngine, request: tuple, results: multiprocessing.Queue):
+    request_id, method, args, kwargs = request
+    try:
+        if method == "metrics":
+            payload = METRICS.export_state()
+        elif method in ENGINE_METHODS:
+            payload = await getattr(engine, method)(*args, **kwargs)
+        else:
+            raise ValueError(f"Unknown worker method '{method}'")
+        results.put((request_id, True, payload))
+    except Exception as e:
+        logger.exception(f"Worker request {method} failed")
+        results.put((request_id, False, f"{type(e).__name__}: {e}"))
+
+
+# --- Pool ---
+
+class ShardedWorkerPool:
+    """
+    Serves conversations from several engine processes, so turns use every core.
+
+    Each (tenant, user) is pinned to one worker through a HashRing, so a conversation's state
+    is only ever read and written by a single process: no cross-process write conflicts, and
+    the in-memory state store and per-user locks stay valid. Workers are started with the
+    'spawn' method, build their engine (and, lazily, their own LLM client) on start-up and
+    are restarted under the same ring position if they die; the turns they were running fail
+    with WorkerError.
+
+    The pool exposes the engine's coroutines (handle_message, reset, get_state, get_language,
+    template_reply), so the message coalescer, audio pipeline and webhook front end can use
+    it in place of a ConversationEngine. Call start() first and close()/aclose() on shutdown.
+    """
+
+    def __init__(self, processes: int = WORKER_PROCESSES, engine_factory: Callable = create_engine,
+                 factory_args: tuple = ()):
+        self.processes = processes
+        self.engine_factory = engine_factory
+        self.factory_args = factory_args
+        self.ring = HashRing(range(processes))
+        self.restarts = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._results = self._context.Queue()
+        self._requests: Dict[int, multiprocessing.Queue] = {}
+        self._workers: Dict[int, multiprocessing.Process] = {}
+        self._pending: Dict[int, Tuple[int, asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closing = False
+        self._collector: threading.Thread = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        for worker_id in range(self.processes):
+            self._spawn(worker_id)
+        self._collector = threading.Thread(target=self._collect_results, name="worker-results", daemon=True)
+        self._collector.start()
+        logger.info(f"Started {self.processes} engine workers.")
+
+    def _spawn(self, worker_id: int):
+        requests = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main, name=f"engine-worker-{worker_id}", daemon=True,
+            args=(worker_id, self.engine_factory, self.factory_args, requests, self._results),
+        )
+        process.start()
+        self._requests[worker_id] = requests
+        self._workers[worker_id] = process
+
+    def close(self):
+        """Lets every worker finish its running turns, then stops it. Blocking; see aclose()."""
+        self._closing = True
+        for requests in self._requests.values():
+            requests.put(None)
+        deadline = time.monotonic() + WORKER_SHUTDOWN_TIMEOUT_SECONDS
+        for worker_id, process in self._workers.items():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Engine worker {worker_id} did not stop in time, terminating it.")
+                process.terminate()
+                process.join()
+        if self._collector is not None:
+            self._collector.join()
+        self._fail_pending(lambda worker_id: True, "The worker pool was closed.")
+
+    async def aclose(self):
+        await asyncio.to_thread(self.close)
+
+    # --- Requests ---
+
+    def worker_for(self, user_id: str, tenant_id: str = DEFAULT_TENANT) -> int:
+        return self.ring.node_for(ConversationEngine._state_key(user_id, tenant_id))
+
+    async def _call(self, worker_id: int, method: str, *args, **kwargs) -> Any:
+        if self._closing:
+            raise WorkerError("The worker pool is closed.")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        request_id = next(self._ids)
+        # Under the lock, so a restart cannot swap the queue between registering and sending
+        with self._lock:
+            self._pending[request_id] = (worker_id, loop, future)
+            self._requests[worker_id].put((request_id, method, args, kwargs))
+        return await future
+
+    async def handle_message(self, user_id: str, user_msg: str, tenant_id: str = DEFAULT_TENANT) -> str:
+        return await self._call(self.worker_for(user_id, tenant_id), "handle_message", user_id, user_msg, tenant_id)
+
+    async def reset(self, user_id: str, tenant_id: str = DEFAULT_TENANT):
+        return await self._call(self.worker_for(user_id, tenant_id), "reset", user_id, tenant_id)
+
+    async def get_state(self, user_id: str, tenant_id: str = DEFAULT_TENANT) -> str:
+        return await self._call(self.worker_for(user_id, tenant_id), "get_state", user_id, tenant_id)
+
+    async def get_language(self, user_id: str, tenant_id: str = DEFAULT_TENANT) -> Optional[str]:
+        return await self._call(self.worker_for(user_id, tenant_id), "get_language", user_id, tenant_id)
+
+    async def template_reply(self, user_id: str, template_id: str, tenant_id: str = DEFAULT_TENANT, **format_args) -> str:
+        return await self._call(self.worker_for(user_id, tenant_id), "template_reply", user_id, template_id, tenant_id, **format_args)
+
+    async def collect_metrics(self) -> MetricsRegistry:
+        """Merges the metrics of every worker into one registry."""
+        registry = MetricsRegistry()
+        for state in await asyncio.gather(*(self._call(worker_id, "metrics") for worker_id in self._workers)):
+            registry.merge_state(state)
+        return registry
+
+    # --- Results & Supervision (collector thread) ---
+
+    def _collect_results(self):
+        next_check = time.monotonic() + WORKER_HEALTH_CHECK_SECONDS
+        while True:
+            try:
+                request_id, ok, payload = self._results.get(timeout=WORKER_HEALTH_CHECK_SECONDS)
+            except queue.Empty:
+                if self._closing and not any(p.is_alive() for p in self._workers.values()):
+                    return
+            else:
+                self._resolve(request_id, ok, payload)
+            if not self._closing and time.monotonic() >= next_check:
+                self._restart_dead_workers()
+                next_check = time.monotonic() + WORKER_HEALTH_CHECK_SECONDS
+
+    def _resolve(self, request_id: int, ok: bool, payload: Any):
+        with self._lock:
+            entry = self._pending.pop(request_id, None)
+        if entry is not None:
+            _settle_threadsafe(entry, ok, payload)
+
+    def _restart_dead_workers(self):
+        for worker_id, process in list(self._workers.items()):
+            if process.is_alive():
+                continue
+            logger.error(f"Engine worker {worker_id} exited (code {process.exitcode}), restarting it.")
+            with self._lock:
+                failed = self._pop_pending(lambda owner: owner == worker_id)
+                self._spawn(worker_id)
+            for entry in failed:
+                _settle_threadsafe(entry, False, f"Engine worker {worker_id} died.")
+            self.restarts += 1
+            METRICS.increment("worker_restarts_total", worker=worker_id)
+
+    def _fail_pending(self, owned_by: Callable[[int], bool], reason: str):
+        with self._lock:
+            failed = self._pop_pending(owned_by)
+        for entry in failed:
+            _settle_threadsafe(entry, False, reason)
+
+    def _pop_pending(self, owned_by: Callable[[int], bool]) -> list:
+        request_ids = [rid for rid, (worker_id, _, _) in self._pending.items() if owned_by(worker_id)]
+        return [self._pending.pop(rid) for rid in request_ids]
+
+
+def _settle_threadsafe(entry: tuple, ok: bool, payload: Any):
+    _, loop, future = entry
+    try:
+        loop.call_soon_threadsafe(_settle, future, ok, payload)
+    except RuntimeError:
+        pass  # the caller's loop is already closed
+
+
+def _settle(future: asyncio.Future, ok: bool, payload: Any):
+    if future.done():
+        return
+    if ok:
+        future.set_result(payload)
+    else:
+        future.set_exception(WorkerError(payload))
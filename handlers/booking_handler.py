@@ -0,0 +1,90 @@
+# handlers/booking_handler.py
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union
+
+from config.settings import BOOKING_BUFFER_MINUTES, SLOT_SUGGESTION_COUNT # Constants for validation
+
+# --- Validation Helper (I. Remaining Logical & Validation Checks) ---
+def is_clinic_open(booking_date_str: str, booking_time_str: str, business_data: dict,
+                   availability=None, service: Optional[str] = None) -> Dict[str, Union[bool, str]]:
+    """
+    Checks if the proposed date/time falls within operating hours, is not in the past,
+    and is not too soon for an immediate booking. With an AvailabilityEngine it also checks
+    the time of day against the clinic hours and that the slot is not already booked.
+    """
+    current_datetime = datetime.now()
+    
+    try:
+        booking_datetime = datetime.strptime(f"{booking_date_str} {booking_time_str}", "%Y-%m-%d %H:%M")
+        booking_date = booking_datetime.date()
+    except ValueError:
+        # Catch unexpected date/time format errors from LLM extraction
+        return {"valid": False, "reason": "PAST_DATE"}
+        
+    # Check 1: Is the proposed date in the past?
+    if booking_date < current_datetime.date():
+        return {"valid": False, "reason": "PAST_DATE"}
+        
+    # Check 2: If the proposed date is TODAY, is the time too soon?
+    if booking_date == current_datetime.date():
+        # Require a buffer time (e.g., 30 minutes)
+        if booking_datetime < (current_datetime + timedelta(minutes=BOOKING_BUFFER_MINUTES)):
+            return {"valid": False, "reason": "TOO_SOON"}
+
+    if availability is None:
+        # Check 3: Is it a weekend (Saturday or Sunday)?
+        # Monday is 0, Sunday is 6
+        if booking_datetime.weekday() >= 5:
+            return {"valid": False, "reason": "CLOSED_HOURS"}
+        return {"valid": True, "reason": "OK"}
+
+    # Check 3: Does the whole appointment fit inside the opening hours of that day?
+    start = booking_datetime.hour * 60 + booking_datetime.minute
+    if not availability.within_opening_hours(booking_date, start, start + availability.duration_for(service)):
+        return {"valid": False, "reason": "CLOSED_HOURS"}
+
+    # Check 4: Is the slot still free?
+    if not availability.is_slot_free(booking_datetime, service):
+        return {"valid": False, "reason": "SLOT_TAKEN"}
+        
+    return {"valid": True, "reason": "OK"}
+
+# --- Nearest Free Slots for a Rejected Request ---
+def suggest_alternatives(booking_date_str: str, booking_time_str: str, availability, service: Optional[str] = None) -> List[datetime]:
+    """Returns the nearest free slots at or after the requested time (never inside the booking buffer)."""
+    earliest = datetime.now() + timedelta(minutes=BOOKING_BUFFER_MINUTES)
+    try:
+        requested = datetime.strptime(f"{booking_date_str} {booking_time_str}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        requested = earliest
+    return availability.next_free_slots(max(requested, earliest), service, SLOT_SUGGESTION_COUNT)
+
+def format_slots(slots: List[datetime]) -> str:
+    return ", ".join(slot.strftime("%a %Y-%m-%d %H:%M") for slot in slots)
+
+# --- Helper for Formatting and Translating Validation Errors ---
+async def get_translated_error_response(validation_result: Dict[str, Union[bool, str]], biz_data: dict, user_lang: str, llm_client,
+                                        alternatives: Optional[List[datetime]] = None) -> str:
+    """Centralizes the logic for formatting and translating validation failure messages."""
+    
+    reason = validation_result["reason"]
+    hours = biz_data['clinic_info']['hours']
+    
+    # 1. Select the format arguments for the failure reason's template
+    if reason == "TOO_SOON":
+        format_args = {"minutes": BOOKING_BUFFER_MINUTES}
+    elif reason == "CLOSED_HOURS":
+        format_args = {"hours": hours}
+    else:
+        # Catches PAST_DATE, SLOT_TAKEN and any other unexpected 'reason' codes
+        format_args = {}
+        
+    # 2. Translate (cached per template and language) and format the message
+    response_text = await llm_client.translate_template_async(reason, user_lang, **format_args)
+
+    # 3. Offer concrete free slots, so the patient can pick one instead of guessing again
+    if alternatives:
+        response_text += " " + await llm_client.translate_template_async(
+            "ALTERNATIVE_SLOTS", user_lang, alternatives=format_slots(alternatives)
+        )
+    return response_text
@@ -0,0 +1,215 @@
+# services/audio_processor.py
+import asyncio
+import logging
+import shutil
+from typing import Awaitable, Callable, Dict, Optional
+
+import aiohttp
+
+from config.settings import (
+    AUDIO_MAX_WORKERS, AUDIO_MAX_QUEUE, AUDIO_MAX_BYTES, AUDIO_MAX_DURATION_SECONDS, AUDIO_SAMPLE_RATE,
+    AUDIO_DOWNLOAD_TIMEOUT_SECONDS, AUDIO_DECODE_TIMEOUT_SECONDS, DEFAULT_TENANT,
+)
+from core.conversation_engine import ConversationEngine
+from .openai_service import Transcriber, create_transcriber
+
+logger = logging.getLogger(__name__)
+
+# Decoded audio is 16-bit mono PCM
+BYTES_PER_SAMPLE = 2
+
+
+class AudioRejected(Exception):
+    """A voice note that cannot be turned into text; `template_id` names the reply to send instead."""
+
+    def __init__(self, template_id: str, detail: str = ""):
+        super().__init__(detail or template_id)
+        self.template_id = template_id
+
+
+# --- Download & Decode (in memory, no temp files) ---
+
+def require_ffmpeg():
+    """Raises if the ffmpeg binary (a system dependency, see README) is not on PATH."""
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("Voice notes need ffmpeg on PATH (e.g. `apt install ffmpeg` or `brew install ffmpeg`).")
+
+
+async def download_media(session: aiohttp.ClientSession, url: str, headers: Dict[str, str] = None,
+                         max_bytes: int = AUDIO_MAX_BYTES) -> bytes:
+    """Streams a media file into memory, aborting as soon as it exceeds `max_bytes`."""
+    async with session.get(url, headers=headers) as resp:
+        if resp.status != 200:
+            raise AudioRejected("VOICE_NOTE_FAILED", f"Media download failed with HTTP {resp.status}")
+        if resp.content_length is not None and resp.content_length > max_bytes:
+            raise AudioRejected("VOICE_NOTE_TOO_LONG", f"Media is {resp.content_length} bytes")
+        buffer = bytearray()
+        async for chunk in resp.content.iter_chunked(64 * 1024):
+            buffer.extend(chunk)
+            if len(buffer) > max_bytes:
+                raise AudioRejected("VOICE_NOTE_TOO_LONG", f"Media exceeds {max_bytes} bytes")
+        return bytes(buffer)
+
+
+async def decode_to_pcm(data: bytes, sample_rate: int = AUDIO_SAMPLE_RATE,
+                        max_seconds: float = AUDIO_MAX_DURATION_SECONDS) -> bytes:
+    """
+    Decodes any container ffmpeg understands (WhatsApp sends OGG/Opus) to 16-bit mono PCM at
+    `sample_rate`, piping stdin -> stdout. ffmpeg stops just past the duration cap, so an
+    over-long note never expands into a large PCM buffer.
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+            "-i", "pipe:0", "-t", f"{max_seconds + 0.5:.1f}",
+            "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+    except FileNotFoundError:
+        raise AudioRejected("VOICE_NOTE_FAILED", "ffmpeg is not installed")
+
+    try:
+        pcm, stderr = await asyncio.wait_for(process.communicate(data), timeout=AUDIO_DECODE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise AudioRejected("VOICE_NOTE_FAILED", "Decoding timed out")
+    if process.returncode != 0 or not pcm:
+        raise AudioRejected("VOICE_NOTE_FAILED", f"ffmpeg failed: {stderr.decode(errors='replace')[:200]}")
+
+    if len(pcm) / (sample_rate * BYTES_PER_SAMPLE) > max_seconds:
+        raise AudioRejected("VOICE_NOTE_TOO_LONG", f"Voice note is longer than {max_seconds}s")
+    return pcm
+
+
+# --- Bounded Pipeline ---
+
+class _AudioJob:
+    def __init__(self, user_id: str, tenant_id: str, media_url: str, headers: Optional[Dict[str, str]],
+                 future: asyncio.Future):
+        self.user_id = user_id
+        self.tenant_id = tenant_id
+        self.media_url = media_url
+        self.headers = headers
+        self.future = future
+
+
+class AudioPipeline:
+    """
+    Voice notes -> text, on their own bounded worker pool.
+
+    Jobs wait in a queue of at most `max_queue` entries (only URLs, no audio), and at most
+    `max_workers` notes are downloaded, decoded and transcribed at once, so peak audio memory
+    is about max_workers * AUDIO_MAX_BYTES however many notes arrive. Text turns never wait
+    for these workers. A full queue is answered straight away with VOICE_NOTE_BUSY.
+
+    The transcript is then handed to `handle_text` - by default the engine's handle_message,
+    or a MessageCoalescer's submit - outside the pool, exactly like a typed message. `engine`
+    is a ConversationEngine or a ShardedWorkerPool; the language hint comes from the one that
+    owns the conversation.
+
+    `download` and `decode` default to download_media and decode_to_pcm (ffmpeg); tests and
+    offline runs can pass their own. Call start() once at start-up: with the ffmpeg decoder it
+    fails fast if ffmpeg is not installed.
+    """
+
+    def __init__(self, engine: ConversationEngine, transcriber: Transcriber = None,
+                 handle_text: Callable[..., Awaitable[Optional[str]]] = None,
+                 max_workers: int = AUDIO_MAX_WORKERS, max_queue: int = AUDIO_MAX_QUEUE,
+                 download: Callable[..., Awaitable[bytes]] = download_media,
+                 decode: Callable[[bytes], Awaitable[bytes]] = decode_to_pcm):
+        self.engine = engine
+        self.transcriber = transcriber or create_transcriber()
+        self.handle_text = handle_text or engine.handle_message
+        self.download = download
+        self.decode = decode
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.stats = {"accepted": 0, "rejected_busy": 0, "rejected_too_long": 0, "failed": 0, "transcribed": 0}
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self):
+        """Starts the workers; raises if the ffmpeg decoder is in use and ffmpeg is missing."""
+        if self.decode is decode_to_pcm:
+            require_ffmpeg()
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=AUDIO_DOWNLOAD_TIMEOUT_SECONDS))
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+
+    # --- Public API ---
+
+    async def submit(self, user_id: str, media_url: str, tenant_id: str = DEFAULT_TENANT,
+                     headers: Dict[str, str] = None) -> Optional[str]:
+        """Transcribes one voice note and runs it as a message; returns the reply to send."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(_AudioJob(user_id, tenant_id, media_url, headers, future))
+        except asyncio.QueueFull:
+            self.stats["rejected_busy"] += 1
+            logger.warning(f"Audio queue full ({self.max_queue}); rejecting voice note from {user_id}.")
+            return await self.engine.template_reply(user_id, "VOICE_NOTE_BUSY", tenant_id)
+        self.stats["accepted"] += 1
+
+        try:
+            transcript = await future
+        except AudioRejected as e:
+            logger.warning(f"Voice note from {user_id} rejected: {e}")
+            if e.template_id == "VOICE_NOTE_TOO_LONG":
+                self.stats["rejected_too_long"] += 1
+            else:
+                self.stats["failed"] += 1
+            return await self.engine.template_reply(
+                user_id, e.template_id, tenant_id, seconds=int(AUDIO_MAX_DURATION_SECONDS)
+            )
+
+        logger.debug(f"Voice note from {user_id} transcribed ({len(transcript)} chars).")
+        return await self.handle_text(user_id, transcript, tenant_id)
+
+    async def aclose(self):
+        """Stops the workers and closes the download and transcription sessions."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._session is not None:
+            await self._session.close()
+        await self.transcriber.aclose()
+        self._queue = None
+
+    # --- Internals ---
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                transcript = await self._process(job)
+                if not job.future.done():
+                    job.future.set_result(transcript)
+            except Exception as e:
+                if not isinstance(e, AudioRejected):
+                    e = AudioRejected("VOICE_NOTE_FAILED", f"{type(e).__name__}: {e}")
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: _AudioJob) -> str:
+        data = await self.download(self._session, job.media_url, job.headers)
+        pcm = await self.decode(data)
+        del data  # only the PCM is needed from here on
+        # The user's last detected language steers Whisper towards Hindi when it applies
+        language = await self.engine.get_language(job.user_id, job.tenant_id)
+        transcript = (await self.transcriber.transcribe(pcm, AUDIO_SAMPLE_RATE, language)).strip()
+        if not transcript:
+            raise AudioRejected("VOICE_NOTE_FAILED", "Empty transcript")
+        self.stats["transcribed"] += 1
+        return transcript
+
@@ -0,0 +1,118 @@
+# services/openai_service.py
+import abc
+import hashlib
+import io
+import os
+import wave
+from typing import Dict, Optional
+
+import aiohttp
+from dotenv import load_dotenv
+
+from config.settings import TRANSCRIBER_BACKEND, TRANSCRIBE_TIMEOUT_SECONDS
+
+# --- Configuration ---
+# Key, endpoint and model come from the environment (.env), read when a transcriber is built:
+#   OPENAI_API_KEY, OPENAI_BASE_URL (default https://api.openai.com/v1), WHISPER_MODEL (default whisper-1)
+_ENV_LOADED = False
+
+
+def _load_env():
+    """Reads .env once per process, on first transcriber construction rather than at import."""
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        load_dotenv()
+        _ENV_LOADED = True
+
+
+def pcm_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    """Wraps 16-bit mono PCM in a WAV container, in memory."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+# --- Transcriber Interface ---
+
+class Transcriber(abc.ABC):
+    """Speech-to-text backend. Receives 16-bit mono PCM and returns the transcript text."""
+
+    @abc.abstractmethod
+    async def transcribe(self, pcm: bytes, sample_rate: int, language_hint: Optional[str] = None) -> str:
+        ...
+
+    async def aclose(self):
+        pass
+
+
+class WhisperTranscriber(Transcriber):
+    """OpenAI-compatible /audio/transcriptions endpoint (Whisper handles Hindi and Hinglish audio)."""
+
+    def __init__(self, api_key: str = None, base_url: str = None, model: str = None,
+                 timeout: float = TRANSCRIBE_TIMEOUT_SECONDS):
+        _load_env()
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.url = f"{(base_url or os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')).rstrip('/')}/audio/transcriptions"
+        self.model = model or os.getenv("WHISPER_MODEL", "whisper-1")
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Created lazily, so it binds to the loop that runs the audio workers
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def transcribe(self, pcm: bytes, sample_rate: int, language_hint: Optional[str] = None) -> str:
+        form = aiohttp.FormData()
+        form.add_field("model", self.model)
+        form.add_field("response_format", "text")
+        if language_hint in ("Hindi", "Hinglish"):
+            form.add_field("language", "hi")
+        form.add_field("file", pcm_to_wav(pcm, sample_rate), filename="voice_note.wav", content_type="audio/wav")
+
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        async with self._get_session().post(self.url, data=form, headers=headers) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"Transcription failed with HTTP {resp.status}: {(await resp.text())[:200]}")
+            return (await resp.text()).strip()
+
+    async def aclose(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class StubTranscriber(Transcriber):
+    """
+    Local stand-in for tests and offline runs: returns the transcript registered for the
+    exact audio (keyed by the SHA-1 of the PCM), else `default_text`.
+    """
+
+    def __init__(self, default_text: str = "", transcripts: Dict[str, str] = None):
+        self.default_text = default_text
+        self.transcripts: Dict[str, str] = dict(transcripts or {})
+        self.calls = 0
+
+    @staticmethod
+    def fingerprint(pcm: bytes) -> str:
+        return hashlib.sha1(pcm).hexdigest()
+
+    def register(self, pcm: bytes, text: str):
+        self.transcripts[self.fingerprint(pcm)] = text
+
+    async def transcribe(self, pcm: bytes, sample_rate: int, language_hint: Optional[str] = None) -> str:
+        self.calls += 1
+        return self.transcripts.get(self.fingerprint(pcm), self.default_text)
+
+
+def create_transcriber(backend: str = TRANSCRIBER_BACKEND) -> Transcriber:
+    """Builds a transcriber for the given backend name: 'whisper' or 'stub'."""
+    if backend == "whisper":
+        return WhisperTranscriber()
+    if backend == "stub":
+        return StubTranscriber()
+    raise ValueError(f"Unknown transcriber backend '{backend}'.")
@@ -0,0 +1,251 @@
+# services/whatsapp_service.py
+import asyncio
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+import aiohttp
+from dotenv import load_dotenv
+
+from config.settings import (
+    WHATSAPP_SEND_RATE_PER_SECOND, WHATSAPP_SEND_BURST,
+    WHATSAPP_PER_RECIPIENT_RATE_PER_SECOND, WHATSAPP_PER_RECIPIENT_BURST,
+    WHATSAPP_MAX_RETRIES, WHATSAPP_RETRY_BASE_DELAY_SECONDS, WHATSAPP_RETRY_MAX_DELAY_SECONDS,
+    WHATSAPP_MAX_QUEUE, WHATSAPP_POOL_MAX_CONNECTIONS, WHATSAPP_SEND_TIMEOUT_SECONDS,
+)
+from core.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# --- Configuration ---
+# Credentials and endpoint come from the environment (.env), read when a dispatcher is built:
+#   WHATSAPP_ACCESS_TOKEN, WHATSAPP_PHONE_NUMBER_ID and WHATSAPP_API_BASE_URL
+#   (point the latter at tools/fake_cloud_api.py for local load tests)
+DEFAULT_WHATSAPP_API_BASE_URL = "https://graph.facebook.com/v20.0"
+_ENV_LOADED = False
+
+
+def _load_env():
+    """Reads .env once per process, on first dispatcher construction rather than at import."""
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        load_dotenv()
+        _ENV_LOADED = True
+
+# Idle per-recipient buckets are swept once this many are held
+RECIPIENT_BUCKET_SWEEP_SIZE = 10000
+
+
+class SendFailed(Exception):
+    """A message that could not be delivered to the Cloud API (after retries, or rejected outright)."""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self) -> float:
+        """Seconds until one token is available (0 if one is available now)."""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            delay = self.wait_time()
+            if delay <= 0:
+                self.tokens -= 1
+                return
+            await asyncio.sleep(delay)
+
+
+class OutboundDispatcher:
+    """
+    Async sender for WhatsApp Cloud API replies.
+
+    Every recipient has its own FIFO queue drained by one task, so replies to a number always
+    leave in the order they were queued, while different numbers are sent concurrently. Each
+    send takes a token from the account-wide bucket (business-number throughput) and from
+    the recipient's bucket (the per-user pair limit). 429 and 5xx responses and network errors
+    are retried with exponential backoff and full jitter, honouring Retry-After; other 4xx
+    responses fail at once. All sends share one pooled keep-alive session.
+    """
+
+    def __init__(self, base_url: str = None, phone_number_id: str = None, access_token: str = None,
+                 rate_per_second: float = WHATSAPP_SEND_RATE_PER_SECOND, burst: float = WHATSAPP_SEND_BURST,
+                 max_retries: int = WHATSAPP_MAX_RETRIES, max_queue: int = WHATSAPP_MAX_QUEUE):
+        _load_env()
+        base_url = base_url or os.getenv("WHATSAPP_API_BASE_URL", DEFAULT_WHATSAPP_API_BASE_URL)
+        phone_number_id = phone_number_id or os.getenv("WHATSAPP_PHONE_NUMBER_ID")
+        self.url = f"{base_url.rstrip('/')}/{phone_number_id}/messages"
+        self.access_token = access_token or os.getenv("WHATSAPP_ACCESS_TOKEN")
+        self.max_retries = max_retries
+        self.max_queue = max_queue
+
+        self._bucket = TokenBucket(rate_per_second, burst)
+        self._recipient_buckets: Dict[str, TokenBucket] = {}
+        self._queues: Dict[str, Deque[Tuple[dict, asyncio.Future]]] = {}
+        self._drainers: Dict[str, asyncio.Task] = {}
+        self._queued = 0
+        self._in_flight = 0
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "rejected_full": 0, "throttled": 0}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=WHATSAPP_POOL_MAX_CONNECTIONS, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=WHATSAPP_SEND_TIMEOUT_SECONDS)
+            )
+        return self._session
+
+    # --- Public API ---
+
+    def send_text(self, to: str, text: str) -> asyncio.Future:
+        """
+        Queues a text reply and returns a future resolving to the Cloud API message id
+        (or raising SendFailed). Callers may await it or fire and forget.
+        """
+        payload = {
+            "messaging_product": "whatsapp",
+            "recipient_type": "individual",
+            "to": to,
+            "type": "text",
+            "text": {"preview_url": False, "body": text},
+        }
+        return self.send(to, payload)
+
+    def send(self, to: str, payload: dict) -> asyncio.Future:
+        """Queues any Cloud API message payload for `to`."""
+        future = asyncio.get_running_loop().create_future()
+        # Failures are already logged, so fire-and-forget callers get no "never retrieved" warning
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        if self._queued >= self.max_queue:
+            self._count("rejected_full")
+            logger.error(f"Outbound queue full ({self.max_queue}); dropping message to {to}.")
+            future.set_exception(SendFailed("Outbound queue is full"))
+            return future
+
+        self._queues.setdefault(to, deque()).append((payload, future))
+        self._queued += 1
+        if to not in self._drainers:
+            self._drainers[to] = asyncio.create_task(self._drain(to))
+        return future
+
+    def metrics(self) -> dict:
+        """Queue depths and counters, for health checks (the counters are also whatsapp_messages_total{result=...})."""
+        depths = [len(queue) for queue in self._queues.values()]
+        return {
+            "queue_depth": self._queued,
+            "active_recipients": len(self._queues),
+            "max_recipient_depth": max(depths, default=0),
+            "in_flight": self._in_flight,
+            **self.stats,
+        }
+
+    async def drain(self):
+        """Waits until every queued message has been sent or has failed."""
+        while self._drainers:
+            await asyncio.gather(*list(self._drainers.values()), return_exceptions=True)
+
+    async def aclose(self, drain: bool = True):
+        """Optionally flushes the queues, then closes the pooled session."""
+        if drain:
+            await self.drain()
+        for task in list(self._drainers.values()):
+            task.cancel()
+        await asyncio.gather(*list(self._drainers.values()), return_exceptions=True)
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    # --- Internals ---
+
+    def _count(self, stat: str):
+        self.stats[stat] += 1
+        METRICS.increment("whatsapp_messages_total", result=stat)
+
+    async def _drain(self, to: str):
+        queue = self._queues[to]
+        bucket = self._recipient_buckets.setdefault(
+            to, TokenBucket(WHATSAPP_PER_RECIPIENT_RATE_PER_SECOND, WHATSAPP_PER_RECIPIENT_BURST)
+        )
+        try:
+            while queue:
+                payload, future = queue[0]
+                try:
+                    await bucket.acquire()
+                    message_id = await self._post_with_retries(to, payload)
+                    if not future.done():
+                        future.set_result(message_id)
+                except Exception as e:
+                    self._count("failed")
+                    logger.error(f"Message to {to} failed: {e}")
+                    if not future.done():
+                        future.set_exception(e if isinstance(e, SendFailed) else SendFailed(str(e)))
+                finally:
+                    # Popped only once handled, so queue depth counts the message being sent
+                    queue.popleft()
+                    self._queued -= 1
+        finally:
+            del self._queues[to]
+            del self._drainers[to]
+            if len(self._recipient_buckets) > RECIPIENT_BUCKET_SWEEP_SIZE:
+                self._sweep_recipient_buckets()
+
+    def _sweep_recipient_buckets(self):
+        """Drops buckets of idle recipients that have refilled completely (they carry no state)."""
+        for to, bucket in list(self._recipient_buckets.items()):
+            if to not in self._queues:
+                bucket.wait_time()
+                if bucket.tokens >= bucket.capacity:
+                    del self._recipient_buckets[to]
+
+    async def _post_with_retries(self, to: str, payload: dict) -> Optional[str]:
+        headers = {"Authorization": f"Bearer {self.access_token}", "Content-Type": "application/json"}
+        for attempt in range(self.max_retries + 1):
+            await self._bucket.acquire()
+            retry_after = None
+            self._in_flight += 1
+            try:
+                async with self._get_session().post(self.url, json=payload, headers=headers) as resp:
+                    if resp.status == 200:
+                        data = await resp.json(content_type=None)
+                        self._count("sent")
+                        return (data.get("messages") or [{}])[0].get("id")
+                    body = (await resp.text())[:200]
+                    if resp.status != 429 and resp.status < 500:
+                        raise SendFailed(f"HTTP {resp.status}: {body}")
+                    if resp.status == 429:
+                        self._count("throttled")
+                    retry_after = resp.headers.get("Retry-After")
+                    error = f"HTTP {resp.status}: {body}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = f"{type(e).__name__}: {e}"
+            finally:
+                self._in_flight -= 1
+
+            if attempt == self.max_retries:
+                raise SendFailed(f"Giving up after {attempt + 1} attempts ({error})")
+            self._count("retried")
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: Optional[str]) -> float:
+        """Exponential backoff with full jitter; a Retry-After header sets the floor."""
+        delay = random.uniform(0, min(WHATSAPP_RETRY_MAX_DELAY_SECONDS, WHATSAPP_RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+        try:
+            return max(delay, float(retry_after)) if retry_after else delay
+        except ValueError:
+            return delay
@@ -0,0 +1,67 @@
+# tests/conftest.py
+import json
+import os
+
+import pytest
+import yaml
+
+from core.appointment_ledger import AppointmentLedger
+from core.llm_client import TEMPLATE_CATALOGUE
+from core.state_store import MemoryStateStore, close_state_store, set_state_store
+from core.translation_cache import TranslationCache
+
+PROFILE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "business_profile.yaml")
+
+
+class FakeLLMClient:
+    """Stands in for LLMFallbackService: canned extraction answers, English templates, no network."""
+
+    def __init__(self, entities: dict = None):
+        self.translation_cache = TranslationCache(None)
+        self.entities = entities or {"intent": "BOOKING", "name": None, "service_request": None,
+                                     "detected_language": "English"}
+        self.requests = []
+
+    async def get_response_async(self, messages, structured: bool = False) -> dict:
+        self.requests.append(messages)
+        return {"provider": "fake", "content": json.dumps(self.entities)}
+
+    async def translate_template_async(self, template_id: str, user_language: str, **format_args) -> str:
+        return TEMPLATE_CATALOGUE[template_id].format(**format_args)
+
+    def render_template_cached(self, template_id: str, user_language: str, **format_args) -> str:
+        return TEMPLATE_CATALOGUE[template_id].format(**format_args)
+
+    async def translate_prompt_async(self, text: str, user_language: str) -> str:
+        return text
+
+    async def warm_translation_cache_async(self, languages, template_ids=None) -> int:
+        return 0
+
+
+@pytest.fixture
+def business_data() -> dict:
+    with open(PROFILE_PATH, encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture
+def state_store():
+    """A throwaway in-memory process-wide state store."""
+    store = MemoryStateStore(None)
+    set_state_store(store)
+    yield store
+    close_state_store()
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = AppointmentLedger(str(tmp_path / "appointments.db"))
+    yield ledger
+    ledger.close()
+
+
+@pytest.fixture
+def engine(business_data, state_store, ledger):
+    from core.conversation_engine import ConversationEngine
+    return ConversationEngine(business_data, llm_client=FakeLLMClient(), ledger=ledger)
@@ -0,0 +1,92 @@
+# tests/test_appointment_ledger.py
+import threading
+from datetime import datetime, timedelta
+
+from core.appointment_ledger import AppointmentLedger
+
+SLOT = datetime(2030, 1, 7, 10, 0)
+
+
+def book(ledger: AppointmentLedger, starts_at: datetime, minutes: int = 30, user_id: str = "u1"):
+    return ledger.record_booking("clinic", user_id, "Ravi", "General Consultation", starts_at, minutes, "English")
+
+
+def race(ledgers, starts_at_of) -> list:
+    """Books from every ledger at once (one thread each); returns the appointment ids (None = refused)."""
+    barrier = threading.Barrier(len(ledgers))
+    results = [None] * len(ledgers)
+
+    def attempt(index: int, ledger: AppointmentLedger):
+        barrier.wait()
+        results[index] = book(ledger, starts_at_of(index), user_id=f"u{index}")
+
+    threads = [threading.Thread(target=attempt, args=(i, ledger)) for i, ledger in enumerate(ledgers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+# --- Overlap Guard ---
+
+def test_overlapping_bookings_are_refused(ledger):
+    assert book(ledger, SLOT) is not None
+    assert book(ledger, SLOT) is None
+    assert book(ledger, SLOT + timedelta(minutes=15)) is None
+    assert book(ledger, SLOT - timedelta(minutes=15)) is None
+    # Back-to-back slots and other clinics are fine
+    assert book(ledger, SLOT + timedelta(minutes=30)) is not None
+    assert book(ledger, SLOT - timedelta(minutes=30)) is not None
+    assert ledger.record_booking("other", "u1", None, None, SLOT, 30, "English") is not None
+
+
+def test_cancelled_slot_can_be_booked_again(ledger):
+    appointment_id = book(ledger, SLOT)
+    assert ledger.cancel(appointment_id)
+    assert not ledger.cancel(appointment_id)
+    assert book(ledger, SLOT) is not None
+
+
+def test_concurrent_processes_never_confirm_the_same_slot(tmp_path):
+    # Separate connections to one database file, as separate engine processes would have
+    path = str(tmp_path / "appointments.db")
+    ledgers = [AppointmentLedger(path) for _ in range(6)]
+    try:
+        for round_ in range(5):
+            slot = SLOT + timedelta(days=round_)
+            # Everyone wants 10:00, or a slot overlapping it
+            results = race(ledgers, lambda i: slot + timedelta(minutes=10 * (i % 3)))
+            assert sum(result is not None for result in results) == 1
+        assert len(ledgers[0].bookings("clinic", SLOT.date())) == 5
+    finally:
+        for other in ledgers:
+            other.close()
+
+
+def test_concurrent_bookings_of_free_slots_all_succeed(tmp_path):
+    path = str(tmp_path / "appointments.db")
+    ledgers = [AppointmentLedger(path) for _ in range(4)]
+    try:
+        results = race(ledgers, lambda i: SLOT + timedelta(minutes=30 * i))
+        assert all(result is not None for result in results)
+        assert len(set(results)) == 4
+    finally:
+        for other in ledgers:
+            other.close()
+
+
+# --- Reminders ---
+
+def test_booking_records_a_confirmation_and_a_reminder(ledger):
+    starts_at = datetime.now().replace(second=0, microsecond=0) + timedelta(days=2)
+    book(ledger, starts_at)
+    pending = ledger.pending_due_between(None, starts_at.timestamp())
+    details = ledger.reminder_details(reminder_id for reminder_id, _ in pending)
+    assert sorted(item["kind"] for item in details) == ["confirmation", "reminder"]
+
+
+def test_no_reminder_when_the_slot_is_within_the_lead_time(ledger):
+    book(ledger, datetime.now().replace(second=0, microsecond=0) + timedelta(hours=2))
+    details = ledger.reminder_details(reminder_id for reminder_id, _ in ledger.pending_due_between(None, 2e9))
+    assert [item["kind"] for item in details] == ["confirmation"]
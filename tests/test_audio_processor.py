@@ -0,0 +1,176 @@
+# tests/test_audio_processor.py
+import asyncio
+
+import pytest
+
+from config.messages import MESSAGES
+from services import audio_processor
+from services.audio_processor import AudioPipeline
+from services.openai_service import StubTranscriber
+
+PCM = b"\x01\x00" * 1600
+
+
+async def fake_download(session, url, headers=None) -> bytes:
+    return url.encode()
+
+
+class GatedDecoder:
+    """Decodes every note to PCM, but holds each one until `release` is set; tracks concurrency."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.active = 0
+        self.peak = 0
+        self.entered = 0
+
+    async def __call__(self, data: bytes) -> bytes:
+        self.active += 1
+        self.entered += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await self.release.wait()
+            return PCM
+        finally:
+            self.active -= 1
+
+
+async def settle(condition, rounds: int = 100):
+    for _ in range(rounds):
+        if condition():
+            return
+        await asyncio.sleep(0)
+    assert condition()
+
+
+def make_pipeline(engine, decoder, transcriber=None, handled=None, **kwargs) -> AudioPipeline:
+    async def handle_text(user_id, text, tenant_id):
+        handled.append((user_id, text))
+        return f"reply to {text}"
+
+    return AudioPipeline(engine, transcriber or StubTranscriber("kal appointment chahiye"),
+                         handle_text=handle_text if handled is not None else None,
+                         download=fake_download, decode=decoder, **kwargs)
+
+
+# --- Start-up ---
+
+def test_pipeline_builds_without_ffmpeg(engine, monkeypatch):
+    monkeypatch.setattr(audio_processor.shutil, "which", lambda name: None)
+    pipeline = make_pipeline(engine, GatedDecoder())
+    assert pipeline._workers == []
+
+
+def test_start_requires_ffmpeg_for_the_default_decoder(engine, monkeypatch):
+    monkeypatch.setattr(audio_processor.shutil, "which", lambda name: None)
+    pipeline = AudioPipeline(engine, StubTranscriber(), download=fake_download)
+    with pytest.raises(RuntimeError, match="ffmpeg"):
+        asyncio.run(pipeline.start())
+
+
+# --- Transcription ---
+
+def test_stub_transcript_is_handled_as_a_text_message(engine):
+    async def run():
+        transcriber = StubTranscriber()
+        transcriber.register(PCM, "mujhe checkup karwana hai")
+        handled = []
+        decoder = GatedDecoder()
+        decoder.release.set()
+        pipeline = make_pipeline(engine, decoder, transcriber, handled)
+        await pipeline.start()
+        try:
+            reply = await pipeline.submit("user-1", "https://media/1")
+        finally:
+            await pipeline.aclose()
+        return reply, handled, pipeline.stats, transcriber.calls
+
+    reply, handled, stats, calls = asyncio.run(run())
+    assert handled == [("user-1", "mujhe checkup karwana hai")]
+    assert reply == "reply to mujhe checkup karwana hai"
+    assert calls == 1
+    assert stats["accepted"] == 1 and stats["transcribed"] == 1
+
+
+def test_stub_transcript_reaches_the_engine(engine):
+    async def run():
+        decoder = GatedDecoder()
+        decoder.release.set()
+        pipeline = make_pipeline(engine, decoder)
+        try:
+            reply = await pipeline.submit("user-1", "https://media/1")
+        finally:
+            await pipeline.aclose()
+        return reply, await engine.get_state("user-1")
+
+    reply, state = asyncio.run(run())
+    assert reply
+    assert state != "START"
+
+
+def test_empty_transcript_is_answered_with_a_template(engine):
+    async def run():
+        decoder = GatedDecoder()
+        decoder.release.set()
+        pipeline = make_pipeline(engine, decoder, StubTranscriber(""), [])
+        try:
+            return await pipeline.submit("user-1", "https://media/1"), pipeline.stats
+        finally:
+            await pipeline.aclose()
+
+    reply, stats = asyncio.run(run())
+    assert reply == MESSAGES["VOICE_NOTE_FAILED"]
+    assert stats["failed"] == 1 and stats["transcribed"] == 0
+
+
+# --- Bounded Pool ---
+
+def test_at_most_max_workers_notes_are_processed_at_once(engine):
+    async def run():
+        decoder = GatedDecoder()
+        handled = []
+        pipeline = make_pipeline(engine, decoder, handled=handled, max_workers=3, max_queue=10)
+        await pipeline.start()
+        try:
+            submits = [asyncio.create_task(pipeline.submit(f"user-{i}", f"https://media/{i}")) for i in range(7)]
+            await settle(lambda: decoder.entered == 3)
+            # The others wait in the queue while the workers are busy
+            await asyncio.sleep(0.01)
+            peak_while_held, workers = decoder.peak, len(pipeline._workers)
+            decoder.release.set()
+            await asyncio.gather(*submits)
+        finally:
+            await pipeline.aclose()
+        return peak_while_held, workers, decoder.peak, len(handled)
+
+    peak_while_held, workers, peak, handled = asyncio.run(run())
+    assert workers == 3
+    assert peak_while_held == 3
+    assert peak == 3
+    assert handled == 7
+
+
+def test_full_queue_is_answered_busy_straight_away(engine):
+    async def run():
+        decoder = GatedDecoder()
+        handled = []
+        pipeline = make_pipeline(engine, decoder, handled=handled, max_workers=1, max_queue=2)
+        await pipeline.start()
+        try:
+            first = asyncio.create_task(pipeline.submit("user-1", "https://media/1"))
+            await settle(lambda: decoder.entered == 1)
+            queued = [asyncio.create_task(pipeline.submit(f"user-{i}", f"https://media/{i}")) for i in (2, 3)]
+            await settle(lambda: pipeline._queue.full())
+            # Answered without waiting for the busy worker
+            busy = await asyncio.wait_for(pipeline.submit("user-4", "https://media/4"), timeout=1.0)
+            decoder.release.set()
+            await asyncio.gather(first, *queued)
+        finally:
+            await pipeline.aclose()
+        return busy, pipeline.stats, handled
+
+    busy, stats, handled = asyncio.run(run())
+    assert busy == MESSAGES["VOICE_NOTE_BUSY"]
+    assert stats["rejected_busy"] == 1
+    assert stats["accepted"] == 3
+    assert sorted(user for user, _ in handled) == ["user-1", "user-2", "user-3"]
@@ -0,0 +1,137 @@
+# tests/test_availability.py
+from datetime import date, datetime
+
+import pytest
+
+import core.availability as availability_module
+from core.availability import AvailabilityEngine, parse_duration_minutes, parse_opening_hours
+from config.settings import SLOT_DEFAULT_DURATION_MINUTES, SLOT_GRANULARITY_MINUTES
+
+# A Monday, so MONDAY + timedelta(days=n) has weekday n
+MONDAY = date(2030, 1, 7)
+
+
+def at(day: int, hhmm: str) -> datetime:
+    """Day `day` of the test week (0 = MONDAY) at 'HH:MM'."""
+    hour, minute = map(int, hhmm.split(":"))
+    return datetime(MONDAY.year, MONDAY.month, MONDAY.day + day, hour, minute)
+
+
+def engine(hours: str, services=None) -> AvailabilityEngine:
+    return AvailabilityEngine({"clinic_info": {"hours": hours}, "services": services or []})
+
+
+# --- Opening Hours ---
+
+@pytest.mark.parametrize("hours, expected", [
+    ("Mon-Fri: 10:00 - 14:00 & 17:00 - 20:00 (Evening Slot is by Appointment Only)",
+     {day: [(600, 840), (1020, 1200)] for day in range(5)}),
+    ("Mon-Sat: 10am - 6pm; Sun: Closed", {day: [(600, 1080)] for day in range(6)}),
+    ("Tue: 9:30 - 12 | Thu: 2 pm to 5:30 pm", {1: [(570, 720)], 3: [(840, 1050)]}),
+    # No day names: open every day
+    ("10:00 - 18:00", {day: [(600, 1080)] for day in range(7)}),
+    # Day ranges wrap around the week
+    ("Fri-Mon: 10:00 - 12:00", {day: [(600, 720)] for day in (4, 5, 6, 0)}),
+    # Overnight windows are split at midnight, the early hours belonging to the next day
+    ("Fri-Sat: 8 pm - 2 am", {4: [(1200, 1440)], 5: [(0, 120), (1200, 1440)], 6: [(0, 120)]}),
+    ("Sun: 18:00 - 00:00", {6: [(1080, 1440)]}),
+    ("Sun: 12 am - 12 am", {6: [(0, 1440)]}),
+    ("By appointment only", {}),
+])
+def test_parse_opening_hours(hours, expected):
+    assert parse_opening_hours(hours) == expected
+
+
+def test_closed_days_and_unparseable_hours():
+    sundays_closed = engine("Mon-Sat: 10:00 - 18:00; Sun: closed")
+    assert sundays_closed.is_slot_free(at(5, "10:00"))
+    assert not sundays_closed.is_slot_free(at(6, "10:00"))
+    # Unparseable hours fall back to weekdays, any time of day
+    fallback = engine("Call us")
+    assert fallback.is_slot_free(at(0, "03:00"))
+    assert not fallback.is_slot_free(at(5, "12:00"))
+
+
+def test_overnight_window_bookings_stay_within_a_day():
+    night = engine("Fri: 22:00 - 02:00", [{"name": "Emergency", "duration": "1 hour"}])
+    assert night.is_slot_free(at(4, "22:30"), "Emergency")
+    assert night.is_slot_free(at(5, "01:00"), "Emergency")
+    # 23:30 + 1 hour would cross midnight
+    assert not night.is_slot_free(at(4, "23:30"), "Emergency")
+    assert not night.is_slot_free(at(5, "01:30"), "Emergency")
+
+
+@pytest.mark.parametrize("text, minutes", [
+    ("15 mins", 15), ("1 hour", 60), ("1.5 hrs", 90), ("45", 45), ("2h", 120),
+    (None, SLOT_DEFAULT_DURATION_MINUTES), ("varies", SLOT_DEFAULT_DURATION_MINUTES),
+])
+def test_parse_duration_minutes(text, minutes):
+    assert parse_duration_minutes(text) == minutes
+
+
+# --- Bookings ---
+
+SERVICES = [{"name": "Cleaning", "duration": "30 mins"}, {"name": "Root Canal", "duration": "1 hour"}]
+
+
+def test_book_refuses_overlaps():
+    clinic = engine("Mon-Fri: 10:00 - 14:00", SERVICES)
+    assert clinic.book(at(0, "11:00"), "Root Canal")        # 11:00 - 12:00
+    assert not clinic.book(at(0, "11:00"), "Cleaning")      # same start
+    assert not clinic.book(at(0, "11:30"), "Cleaning")      # inside
+    assert not clinic.book(at(0, "10:45"), "Cleaning")      # ends inside
+    assert not clinic.book(at(0, "10:30"), "Root Canal")    # ends inside
+    assert clinic.book(at(0, "10:30"), "Cleaning")          # ends exactly at 11:00
+    assert clinic.book(at(0, "12:00"), "Cleaning")          # starts exactly at 12:00
+    assert not clinic.book(at(0, "10:15"), "Cleaning")      # overlaps the 10:30 booking
+    # The same time on another day is unaffected
+    assert clinic.book(at(1, "11:00"), "Root Canal")
+
+
+def test_book_refuses_slots_outside_opening_hours():
+    clinic = engine("Mon-Fri: 10:00 - 14:00 & 17:00 - 20:00", SERVICES)
+    assert not clinic.book(at(0, "09:45"), "Cleaning")
+    assert not clinic.book(at(0, "13:45"), "Cleaning")      # runs past 14:00
+    assert not clinic.book(at(0, "14:30"), "Cleaning")      # between the windows
+    assert not clinic.book(at(5, "11:00"), "Cleaning")      # Saturday
+    assert clinic.book(at(0, "13:30"), "Cleaning")
+
+
+def test_release_frees_the_slot():
+    clinic = engine("Mon-Fri: 10:00 - 14:00", SERVICES)
+    assert clinic.book(at(0, "11:00"), "Root Canal")
+    clinic.release(at(0, "11:00"))
+    assert clinic.book(at(0, "11:30"), "Cleaning")
+    # Releasing a slot that was never booked changes nothing
+    clinic.release(at(0, "12:30"))
+    assert not clinic.is_slot_free(at(0, "11:30"), "Cleaning")
+
+
+# --- Next Free Slots ---
+
+def test_next_free_slots_round_up_to_the_grid():
+    clinic = engine("Mon-Fri: 10:00 - 14:00", SERVICES)
+    assert SLOT_GRANULARITY_MINUTES == 15
+    assert clinic.next_free_slots(at(0, "10:07"), "Cleaning", 3) == [at(0, "10:15"), at(0, "10:30"), at(0, "10:45")]
+    assert clinic.next_free_slots(at(0, "10:15"), "Cleaning", 1) == [at(0, "10:15")]
+    # Before opening, the search starts at the opening time
+    assert clinic.next_free_slots(at(0, "06:00"), "Cleaning", 1) == [at(0, "10:00")]
+
+
+def test_next_free_slots_skip_bookings_and_closing_time():
+    clinic = engine("Mon-Fri: 10:00 - 14:00", SERVICES)
+    clinic.book(at(0, "10:00"), "Root Canal")      # 10:00 - 11:00
+    clinic.book(at(0, "11:10"), "Cleaning")        # 11:10 - 11:40, off the grid
+    assert clinic.next_free_slots(at(0, "10:00"), "Cleaning", 2) == [at(0, "11:45"), at(0, "12:00")]
+    # The last slot must end by closing time; then the search moves to the next open day
+    assert clinic.next_free_slots(at(0, "13:20"), "Root Canal", 2) == [at(1, "10:00"), at(1, "10:15")]
+    assert clinic.next_free_slots(at(4, "13:30"), "Cleaning", 2) == [at(4, "13:30"), at(7, "10:00")]
+
+
+def test_next_free_slots_stop_at_the_horizon(monkeypatch):
+    sundays_only = engine("Sun: 10:00 - 11:00", SERVICES)
+    # Monday -> the next Sunday is 6 days ahead
+    monkeypatch.setattr(availability_module, "SLOT_SEARCH_HORIZON_DAYS", 6)
+    assert sundays_only.next_free_slots(at(0, "09:00"), "Root Canal", 3) == [at(6, "10:00")]
+    monkeypatch.setattr(availability_module, "SLOT_SEARCH_HORIZON_DAYS", 5)
+    assert sundays_only.next_free_slots(at(0, "09:00"), "Root Canal", 3) == []
@@ -0,0 +1,127 @@
+# tests/test_concurrency_limiter.py
+import asyncio
+import time
+
+import pytest
+
+from core.concurrency_limiter import AdaptiveLimiter, LLMOverloaded, current_deadline, turn_deadline
+
+
+def limiter(initial: int = 4, min_limit: int = 1, max_limit: int = 16, max_queue: int = 8) -> AdaptiveLimiter:
+    return AdaptiveLimiter(initial, min_limit, max_limit, max_queue)
+
+
+def complete(limiter: AdaptiveLimiter, latencies, failed: bool = False):
+    """Runs one request per latency through the limiter, one after the other."""
+    async def run():
+        for latency in latencies:
+            await limiter.acquire()
+            limiter.release(latency, failed=failed)
+    asyncio.run(run())
+
+
+# --- AIMD ---
+
+def test_limit_grows_additively_on_steady_latency():
+    steady = limiter(initial=4)
+    complete(steady, [0.05] * 4)
+    # About +1 per limit's worth of successful requests
+    assert 4.9 < steady.limit < 5.0
+    complete(steady, [0.05] * 1000)
+    assert steady.limit == steady.max_limit
+
+
+def test_limit_shrinks_when_latency_climbs():
+    overloaded = limiter(initial=10, max_limit=20)
+    complete(overloaded, [0.001] * 50)
+    grown = overloaded.limit
+    complete(overloaded, [0.5])
+    assert overloaded.limit == pytest.approx(grown * overloaded.backoff)
+    assert overloaded.stats["decreases"] == 1
+
+
+def test_failures_shrink_the_limit_down_to_the_floor():
+    failing = limiter(initial=4, min_limit=2)
+    complete(failing, [None], failed=True)
+    assert failing.limit == pytest.approx(4 * failing.backoff)
+    for _ in range(30):
+        complete(failing, [None], failed=True)
+    assert failing.limit == 2
+
+
+def test_one_slow_burst_decreases_once_per_baseline_latency():
+    slow = limiter(initial=8)
+    complete(slow, [1.0])   # baseline ~1 s
+    complete(slow, [None, None, None], failed=True)
+    assert slow.stats["decreases"] == 1
+
+
+def test_a_single_slow_outlier_is_smoothed_out():
+    steady = limiter(initial=8)
+    complete(steady, [0.1] * 20)
+    complete(steady, [0.3])
+    assert steady.stats["decreases"] == 0
+
+
+# --- Admission ---
+
+def test_waiters_are_admitted_in_order_as_slots_free_up():
+    async def run():
+        one = limiter(initial=1, max_limit=1)
+        await one.acquire()
+        order = []
+
+        async def wait(n):
+            await one.acquire()
+            order.append(n)
+            one.release(None)
+
+        waiters = [asyncio.create_task(wait(n)) for n in range(3)]
+        await asyncio.sleep(0.01)
+        assert one.snapshot()["waiting"] == 3
+        one.release(None)
+        await asyncio.gather(*waiters)
+        return order, one.snapshot()
+
+    order, snapshot = asyncio.run(run())
+    assert order == [0, 1, 2]
+    assert snapshot["in_flight"] == 0 and snapshot["queued"] == 3
+
+
+def test_full_queue_is_shed_at_once():
+    async def run():
+        small = limiter(initial=1, max_limit=1, max_queue=1)
+        await small.acquire()
+        queued = asyncio.create_task(small.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(LLMOverloaded) as shed:
+            await small.acquire()
+        small.release(None)
+        await queued
+        return shed.value.reason, small.stats
+
+    reason, stats = asyncio.run(run())
+    assert reason == "queue_full" and stats["shed_queue_full"] == 1
+
+
+def test_deadline_passing_in_the_queue_sheds_and_passes_the_slot_on():
+    async def run():
+        one = limiter(initial=1, max_limit=1)
+        await one.acquire()
+        with pytest.raises(LLMOverloaded) as shed:
+            await one.acquire(deadline=time.monotonic() + 0.02)
+        one.release(None)
+        # The slot is free again for the next caller
+        await asyncio.wait_for(one.acquire(), timeout=1.0)
+        return shed.value.reason, one.snapshot()
+
+    reason, snapshot = asyncio.run(run())
+    assert reason == "deadline"
+    assert snapshot["in_flight"] == 1 and snapshot["waiting"] == 0
+
+
+def test_turn_deadline_is_scoped_to_the_block():
+    assert current_deadline() is None
+    with turn_deadline(5):
+        assert current_deadline() == pytest.approx(time.monotonic() + 5, abs=0.1)
+    assert current_deadline() is None
@@ -0,0 +1,54 @@
+# tests/test_conversation_engine.py
+import asyncio
+import threading
+
+from core.state_store import MemoryStateStore
+
+
+class RecordingStore(MemoryStateStore):
+    """Remembers which threads loaded and saved state."""
+
+    def __init__(self):
+        super().__init__(None)
+        self.threads = []
+
+    def load(self, user_id):
+        self.threads.append(("load", threading.current_thread()))
+        return super().load(user_id)
+
+    def save(self, user_id, data):
+        self.threads.append(("save", threading.current_thread()))
+        super().save(user_id, data)
+
+
+def test_turn_state_io_runs_off_the_event_loop(engine, monkeypatch):
+    store = RecordingStore()
+    monkeypatch.setattr("core.conversation_state.get_state_store", lambda: store)
+
+    async def run():
+        loop_thread = threading.current_thread()
+        reply = await engine.handle_message("u1", "I want to book an appointment")
+        return loop_thread, reply
+
+    loop_thread, reply = asyncio.run(run())
+    assert "name" in reply.lower()
+    assert [kind for kind, _ in store.threads] == ["load", "save"]
+    assert all(thread is not loop_thread for _, thread in store.threads)
+    assert store.load("u1")["state"] == "AWAITING_NAME"
+
+
+def test_state_reads_wait_for_a_running_turn(engine):
+    async def run():
+        await engine.handle_message("u1", "I want to book an appointment")
+        key = engine._state_key("u1", "default")
+        async with engine._user_lock(key):
+            # A turn of u1 is "running": the reads must not see its state half-way
+            language = asyncio.ensure_future(engine.get_language("u1"))
+            reply = asyncio.ensure_future(engine.template_reply("u1", "RETRY_TIME"))
+            await asyncio.sleep(0.05)
+            assert not language.done() and not reply.done()
+        return await language, await reply
+
+    language, reply = asyncio.run(run())
+    assert language == "English"
+    assert reply
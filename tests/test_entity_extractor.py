@@ -0,0 +1,117 @@
+# tests/test_entity_extractor.py
+from datetime import date
+
+import pytest
+
+from core.entity_extractor import extract_date, extract_time, match_service, pre_extract
+
+# A Monday
+TODAY = date(2030, 1, 7)
+
+SERVICES = ["General Consultation", "Pediatric Checkup", "Vaccination"]
+
+
+# --- Dates ---
+
+@pytest.mark.parametrize("text, expected", [
+    ("2030-02-14 at 10", date(2030, 2, 14)),
+    ("today 6 pm", date(2030, 1, 7)),
+    ("tomorrow at 11 am", date(2030, 1, 8)),
+    ("day after tomorrow", date(2030, 1, 9)),
+    ("kal shaam", date(2030, 1, 8)),
+    ("parso subah 10 baje", date(2030, 1, 9)),
+    ("कल 5 बजे", date(2030, 1, 8)),
+    ("friday 4pm", date(2030, 1, 11)),
+    ("monday", date(2030, 1, 14)),          # today is Monday: the next one
+    ("somvar ko", date(2030, 1, 14)),
+    ("15/1 at 11:30", date(2030, 1, 15)),
+    ("5/1", date(2031, 1, 5)),              # already past this year
+    ("12-03-2030 4pm", date(2030, 3, 12)),
+    ("5 may at 10am", date(2030, 5, 5)),
+    ("May 5th, 10:30 am", date(2030, 5, 5)),
+    ("3rd of March", date(2030, 3, 3)),
+    ("sept 9 at 9 am", date(2030, 9, 9)),
+    ("december 24", date(2030, 12, 24)),
+])
+def test_extract_date(text, expected):
+    assert extract_date(text, TODAY)[0] == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Relative days come before bare numbers, which are the time here
+    ("tomorrow 5-6 pm", date(2030, 1, 8)),
+    ("kal 5-6 baje", date(2030, 1, 8)),
+    ("friday 10:30-11:30 am", date(2030, 1, 11)),
+    # Words that only start like a month are not dates
+    ("maybe tomorrow at 5 pm", date(2030, 1, 8)),
+    ("I will decide, wednesday 11 am", date(2030, 1, 9)),
+    ("maybe 5 pm", None),
+    ("marketing call at 4", None),
+    # A month followed by an hour is a time, and so is a bare range
+    ("may 5 pm", None),
+    ("5-6 pm", None),
+    ("10:30-11:30 am", None),
+])
+def test_extract_date_ambiguous_inputs(text, expected):
+    assert extract_date(text, TODAY)[0] == expected
+
+
+def test_extract_date_confidence_and_remainder():
+    # 3/4 could be read either way round
+    assert extract_date("3/4", TODAY)[1] == 0.7
+    assert extract_date("13/4", TODAY)[1] == 1.0
+    _, _, remainder = extract_date("tomorrow 5-6 pm", TODAY)
+    assert "tomorrow" not in remainder and "5-6 pm" in remainder
+
+
+# --- Times ---
+
+@pytest.mark.parametrize("text, expected", [
+    ("5 pm", ("17:00", 1.0)),
+    ("10:30 am", ("10:30", 1.0)),
+    ("12 am", ("00:00", 1.0)),
+    ("noon", ("12:00", 1.0)),
+    ("17:45", ("17:45", 1.0)),
+    ("09:30", ("09:30", 1.0)),
+    ("5:30", ("05:30", 0.6)),
+    ("shaam 5 baje", ("17:00", 1.0)),
+    ("subah saadhe 9 baje", ("09:30", 1.0)),
+    ("sawa 5 shaam", ("17:15", 1.0)),
+    ("paune 6 baje evening", ("17:45", 1.0)),
+    # Ranges yield their start, with the end's AM/PM
+    ("5-6 pm", ("17:00", 1.0)),
+    ("5 to 6 pm", ("17:00", 1.0)),
+    ("11-1 pm", ("11:00", 1.0)),
+    ("12-2 pm", ("12:00", 1.0)),
+    ("10:30-11:30 am", ("10:30", 1.0)),
+    ("shaam 5-6 baje", ("17:00", 1.0)),
+    ("whenever", (None, 0.0)),
+])
+def test_extract_time(text, expected):
+    assert extract_time(text, context=text) == expected
+
+
+# --- Services and the Fast Path ---
+
+@pytest.mark.parametrize("text, expected", [
+    ("general consultation please", ("General Consultation", 1.0)),
+    ("bacche ka vaccine", ("Vaccination", 1.0)),
+    ("checkup", ("Pediatric Checkup", 0.85)),
+    ("something else", (None, 0.0)),
+])
+def test_match_service(text, expected):
+    assert match_service(text, SERVICES) == expected
+
+
+@pytest.mark.parametrize("text, state, expected", [
+    ("tomorrow 5-6 pm", "AWAITING_TIME", {"date": "2030-01-08", "time": "17:00"}),
+    ("kal shaam 5 baje", "AWAITING_TIME", {"date": "2030-01-08", "time": "17:00"}),
+    ("maybe tomorrow 11 am", "AWAITING_TIME", {"date": "2030-01-08", "time": "11:00"}),
+    # Not confident enough: left to the LLM
+    ("tomorrow 5:30", "AWAITING_TIME", None),
+    ("sometime next week", "AWAITING_TIME", None),
+    ("vaccination", "AWAITING_SERVICE", {"service_request": "Vaccination"}),
+    ("tomorrow 5 pm", "AWAITING_NAME", None),
+])
+def test_pre_extract(text, state, expected):
+    assert pre_extract(text, state, SERVICES, today=TODAY) == expected
@@ -0,0 +1,21 @@
+# tests/test_intent_detector.py
+import copy
+
+from core.intent_detector import _get_faq_prompt
+from core.profile_registry import CompiledProfile
+
+
+# --- FAQ Prompt ---
+
+def test_faq_prompt_names_the_tenant_clinic(business_data):
+    other = copy.deepcopy(business_data)
+    other["clinic_info"].update(name="Smile Dental Care", contact="+91-1111111111")
+    prompt = _get_faq_prompt(CompiledProfile("smile", other))
+    assert "front desk assistant of Smile Dental Care" in prompt
+    assert "+91-1111111111" in prompt
+    assert "Sharma" not in prompt
+
+
+def test_faq_prompt_falls_back_to_the_tenant_id():
+    prompt = _get_faq_prompt(CompiledProfile("city-clinic", {"clinic_info": {"contact": "123"}}))
+    assert "front desk assistant of city-clinic" in prompt
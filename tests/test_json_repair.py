@@ -0,0 +1,80 @@
+# tests/test_json_repair.py
+import pytest
+
+from core.json_repair import repair_json, validate_fields
+
+
+# --- repair_json ---
+
+@pytest.mark.parametrize("text, expected, repairs", [
+    ('{"intent": "BOOKING", "name": null}', {"intent": "BOOKING", "name": None}, []),
+    # Markdown fences, closed or cut off
+    ('```json\n{"intent": "FAQ"}\n```', {"intent": "FAQ"}, ["fence"]),
+    ('```\n{"intent": "FAQ"}', {"intent": "FAQ"}, ["fence"]),
+    # Prose around the object
+    ('Sure! Here is the JSON: {"intent": "FAQ"}', {"intent": "FAQ"}, ["leading_text"]),
+    ('{"intent": "FAQ"} Let me know if you need anything else.', {"intent": "FAQ"}, ["trailing_text"]),
+    ('{"note": "a } inside a string"} done', {"note": "a } inside a string"}, ["trailing_text"]),
+    # Single quotes
+    ("{'intent': 'BOOKING', 'name': 'Ravi'}", {"intent": "BOOKING", "name": "Ravi"}, ["single_quotes"]),
+    ("{'name': 'Ravi \"RK\" Kumar'}", {"name": 'Ravi "RK" Kumar'}, ["single_quotes"]),
+    ('{"name": "D\'Souza"}', {"name": "D'Souza"}, []),
+    # Python literals
+    ("{'name': None, 'urgent': True, 'repeat': False}", {"name": None, "urgent": True, "repeat": False}, ["single_quotes"]),
+    ("{'note': 'None of the above'}", {"note": "None of the above"}, ["single_quotes"]),
+    # Truncation at max_tokens
+    ('{"intent": "BOOKING", "date": "2025-01-0', {"intent": "BOOKING"}, ["truncated"]),
+    ('{"intent": "BOOKING", "slots": ["10:00", "11:00"', {"intent": "BOOKING", "slots": ["10:00", "11:00"]}, ["truncated"]),
+    ('{"intent": "BOOKING",', {"intent": "BOOKING"}, ["truncated"]),
+    # Trailing commas
+    ('{"a": 1,}', {"a": 1}, ["trailing_commas"]),
+    ('{"a": [1, 2, ], "b": {"c": 3,},\n}', {"a": [1, 2], "b": {"c": 3}}, ["trailing_commas"]),
+    ('{"a": "x,}",}', {"a": "x,}"}, ["trailing_commas"]),
+    ("{'a': 1,}", {"a": 1}, ["single_quotes", "trailing_commas"]),
+    # Several defects at once
+    ("```json\n{'intent': 'FAQ', 'name': None,}\n```", {"intent": "FAQ", "name": None},
+     ["fence", "single_quotes", "trailing_commas"]),
+])
+def test_repair_json_repairs(text, expected, repairs):
+    assert repair_json(text) == (expected, repairs)
+
+
+@pytest.mark.parametrize("text", [
+    None,
+    "",
+    "I could not understand the request.",
+    '["not", "an", "object"]',
+    '{"a": 1 "b": 2}',
+    '{"name": "cut off mid-str',
+])
+def test_repair_json_gives_up(text):
+    data, _ = repair_json(text)
+    assert data is None
+
+
+# --- validate_fields ---
+
+def _date(value):
+    if value is None:
+        return None
+    if not isinstance(value, str) or len(value.split("-")) != 3:
+        raise ValueError(value)
+    return value
+
+
+VALIDATORS = {"intent": str.upper, "date": _date}
+
+
+@pytest.mark.parametrize("data, valid, missing", [
+    ({"intent": "booking", "date": "2025-01-05"}, {"intent": "BOOKING", "date": "2025-01-05"}, []),
+    # None is a valid "not mentioned"
+    ({"intent": "faq", "date": None}, {"intent": "FAQ", "date": None}, []),
+    # Absent fields are reported, extra ones ignored
+    ({"intent": "faq", "extra": 1}, {"intent": "FAQ"}, ["date"]),
+    ({}, {}, ["intent", "date"]),
+    # Validators raising ValueError or TypeError mark the field invalid
+    ({"intent": "faq", "date": "tomorrow"}, {"intent": "FAQ"}, ["date"]),
+    ({"intent": 7, "date": "2025-01-05"}, {"date": "2025-01-05"}, ["intent"]),
+])
+def test_validate_fields(data, valid, missing):
+    assert validate_fields(data, VALIDATORS) == (valid, missing)
@@ -0,0 +1,77 @@
+# tests/test_language_id.py
+import pytest
+
+from config.settings import LANGUAGE_ID_MIN_CONFIDENCE
+from core.language_id import detect_language, identify_language
+from core.llm_client import is_source_language
+
+
+# --- Hinglish Booking Phrases ---
+
+@pytest.mark.parametrize("text", [
+    "kal appointment book karna hai",
+    "mujhe checkup karwana hai",
+    "appointment lena hai",
+    "kal shaam 5 baje slot milega?",
+    "appointment chahiye dental cleaning ke liye",
+    "teeth cleaning ka price kitna hai",
+    "doctor kab available hain",
+    "mera naam Ravi hai",
+    "kal 5 baje appointment book kar do",
+    "Tomorrow morning ka time milega kya",
+    "mujhe कल appointment चाहिए",
+])
+def test_hinglish_booking_phrases(text):
+    assert detect_language(text, LANGUAGE_ID_MIN_CONFIDENCE) == "Hinglish"
+
+
+@pytest.mark.parametrize("text", [
+    "I want to book an appointment for tomorrow",
+    "What is the price of a cleaning?",
+    "Can I come at 5 pm?",
+    "Booking for my son please",
+])
+def test_english_booking_phrases(text):
+    assert detect_language(text, LANGUAGE_ID_MIN_CONFIDENCE) == "English"
+
+
+def test_devanagari_is_hindi():
+    assert detect_language("मुझे कल अपॉइंटमेंट चाहिए", LANGUAGE_ID_MIN_CONFIDENCE) == "Hindi"
+
+
+@pytest.mark.parametrize("text", [
+    # Borrowed booking vocabulary alone is no evidence of English
+    "dental checkup appointment",
+    "dental checkup appointment tomorrow",
+    # Too short to switch a conversation's language
+    "ok",
+    "hi",
+    "5 pm",
+    "Ravi Kumar",
+    "",
+])
+def test_unsure_messages_are_left_to_the_context(text):
+    assert detect_language(text, LANGUAGE_ID_MIN_CONFIDENCE) is None
+
+
+def test_identify_language_confidence():
+    assert identify_language("12345") == (None, 0.0)
+    language, confidence = identify_language("appointment lena hai")
+    assert language == "Hinglish" and confidence == 1.0
+    language, confidence = identify_language("please")
+    assert language == "English" and confidence < LANGUAGE_ID_MIN_CONFIDENCE
+
+
+# --- Source Language ---
+
+@pytest.mark.parametrize("language, expected", [
+    ("English", True),
+    ("english", True),
+    (" ENGLISH\n", True),
+    ("Hinglish", False),
+    ("Hindi", False),
+    ("", False),
+    (None, False),
+])
+def test_is_source_language(language, expected):
+    assert is_source_language(language) is expected
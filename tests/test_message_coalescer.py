@@ -0,0 +1,169 @@
+# tests/test_message_coalescer.py
+import asyncio
+
+import pytest
+
+from core.message_coalescer import MessageCoalescer
+
+WINDOW = 0.05
+
+
+class RecordingEngine:
+    """Records each turn; a turn blocks while `hold` is set, and raises `error` if given."""
+
+    def __init__(self):
+        self.turns = []
+        self.hold = False
+        self.release = asyncio.Event()
+        self.started = asyncio.Event()
+        self.error = None
+
+    async def handle_message(self, user_id, user_msg, tenant_id):
+        self.turns.append((tenant_id, user_id, user_msg))
+        self.started.set()
+        if self.hold:
+            await self.release.wait()
+        if self.error:
+            raise self.error
+        return f"reply to {user_msg!r}"
+
+
+async def burst(coalescer, user_id, messages, gap: float = 0.0, tenant_id: str = "clinic"):
+    tasks = []
+    for message in messages:
+        tasks.append(asyncio.create_task(coalescer.submit(user_id, message, tenant_id)))
+        await asyncio.sleep(gap)
+    return tasks
+
+
+# --- Burst Merging ---
+
+def test_burst_runs_as_one_turn_answered_on_the_last_message():
+    async def run():
+        engine = RecordingEngine()
+        coalescer = MessageCoalescer(engine, window=WINDOW, max_wait=1.0)
+        tasks = await burst(coalescer, "u1", ["hi", "I want to book", "for my son"], gap=0.01)
+        return engine.turns, await asyncio.gather(*tasks)
+
+    turns, replies = asyncio.run(run())
+    assert turns == [("clinic", "u1", "hi\nI want to book\nfor my son")]
+    assert replies == [None, None, "reply to 'hi\\nI want to book\\nfor my son'"]
+
+
+def test_users_and_tenants_are_coalesced_separately():
+    async def run():
+        engine = RecordingEngine()
+        coalescer = MessageCoalescer(engine, window=WINDOW, max_wait=1.0)
+        tasks = await burst(coalescer, "u1", ["a", "b"])
+        tasks += await burst(coalescer, "u2", ["c"])
+        tasks += await burst(coalescer, "u1", ["d"], tenant_id="other")
+        await asyncio.gather(*tasks)
+        return sorted(engine.turns)
+
+    assert asyncio.run(run()) == [("clinic", "u1", "a\nb"), ("clinic", "u2", "c"), ("other", "u1", "d")]
+
+
+def test_max_wait_caps_a_burst_that_never_goes_quiet():
+    async def run():
+        engine = RecordingEngine()
+        coalescer = MessageCoalescer(engine, window=WINDOW, max_wait=0.1)
+        # A message every 30 ms never leaves a 50 ms quiet window
+        tasks = await burst(coalescer, "u1", [str(i) for i in range(8)], gap=0.03)
+        await asyncio.gather(*tasks)
+        return engine.turns
+
+    turns = asyncio.run(run())
+    assert len(turns) >= 2
+    assert "\n".join(turn[2] for turn in turns) == "\n".join(str(i) for i in range(8))
+
+
+def test_zero_window_passes_messages_straight_through():
+    async def run():
+        engine = RecordingEngine()
+        coalescer = MessageCoalescer(engine, window=0)
+        return await coalescer.submit("u1", "hi", "clinic"), engine.turns
+
+    assert asyncio.run(run()) == ("reply to 'hi'", [("clinic", "u1", "hi")])
+
+
+def test_flush_all_runs_pending_bursts_now():
+    async def run():
+        engine = RecordingEngine()
+        coalescer = MessageCoalescer(engine, window=60.0, max_wait=60.0)
+        tasks = await burst(coalescer, "u1", ["hi", "book"])
+        await coalescer.flush_all()
+        return engine.turns, await asyncio.wait_for(asyncio.gather(*tasks), timeout=1.0)
+
+    turns, replies = asyncio.run(run())
+    assert turns == [("clinic", "u1", "hi\nbook")]
+    assert replies == [None, "reply to 'hi\\nbook'"]
+
+
+# --- Failures & Cancellation ---
+
+def test_failed_turn_fails_every_waiter():
+    async def run():
+        engine = RecordingEngine()
+        engine.error = ValueError("boom")
+        coalescer = MessageCoalescer(engine, window=WINDOW)
+        tasks = await burst(coalescer, "u1", ["hi", "book"])
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_turn_releases_its_waiters():
+    async def run():
+        engine = RecordingEngine()
+        engine.hold = True
+        coalescer = MessageCoalescer(engine, window=WINDOW)
+        tasks = await burst(coalescer, "u1", ["hi", "book"])
+        flush_task = coalescer._pending[("clinic", "u1")].flush_task
+        await asyncio.wait_for(engine.started.wait(), timeout=1.0)
+        flush_task.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=1.0)
+        await asyncio.gather(flush_task, return_exceptions=True)
+        return results, flush_task.cancelled(), coalescer._pending
+
+    results, flush_cancelled, pending = asyncio.run(run())
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    # The cancellation itself is not swallowed
+    assert flush_cancelled
+    assert pending == {}
+
+
+def test_burst_cancelled_while_waiting_releases_its_waiters():
+    async def run():
+        engine = RecordingEngine()
+        coalescer = MessageCoalescer(engine, window=60.0, max_wait=60.0)
+        tasks = await burst(coalescer, "u1", ["hi", "book"])
+        coalescer._pending[("clinic", "u1")].flush_task.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), timeout=1.0)
+        return results, engine.turns, coalescer._pending
+
+    results, turns, pending = asyncio.run(run())
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert turns == []
+    assert pending == {}
+
+
+def test_messages_during_a_running_turn_start_the_next_burst():
+    async def run():
+        engine = RecordingEngine()
+        engine.hold = True
+        coalescer = MessageCoalescer(engine, window=WINDOW)
+        first = await burst(coalescer, "u1", ["hi"])
+        await asyncio.wait_for(engine.started.wait(), timeout=1.0)
+        second = await burst(coalescer, "u1", ["book", "tomorrow"])
+        engine.release.set()
+        return await asyncio.gather(*first, *second), engine.turns
+
+    replies, turns = asyncio.run(run())
+    assert [turn[2] for turn in turns] == ["hi", "book\ntomorrow"]
+    assert replies == ["reply to 'hi'", None, "reply to 'book\\ntomorrow'"]
+
+
+@pytest.mark.parametrize("window, max_wait, expected", [(1.5, 4.0, 4.0), (2.0, 1.0, 2.0)])
+def test_max_wait_is_never_shorter_than_the_window(window, max_wait, expected):
+    assert MessageCoalescer(RecordingEngine(), window, max_wait).max_wait == expected
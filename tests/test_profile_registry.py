@@ -0,0 +1,62 @@
+# tests/test_profile_registry.py
+import os
+
+import yaml
+
+from core import profile_registry
+from core.profile_registry import CompiledProfile, ProfileRegistry, as_compiled_profile
+
+
+def profile_data(name: str) -> dict:
+    return {"clinic_info": {"name": name}, "services": [{"name": "General Consultation"}]}
+
+
+# --- Bare business_data Dicts ---
+
+def test_same_dict_is_compiled_once():
+    data = profile_data("A")
+    first = as_compiled_profile(data)
+    assert as_compiled_profile(data) is first
+    assert as_compiled_profile(first) is first
+
+
+def test_compiled_cache_is_bounded():
+    dicts = [profile_data(str(i)) for i in range(3 * profile_registry._COMPILED_MAX_ENTRIES)]
+    for data in dicts:
+        as_compiled_profile(data)
+    assert len(profile_registry._COMPILED) == profile_registry._COMPILED_MAX_ENTRIES
+    # The most recent dicts stay cached
+    assert as_compiled_profile(dicts[-1]) is as_compiled_profile(dicts[-1])
+
+
+def test_a_new_dict_never_gets_another_dicts_profile():
+    for i in range(50):
+        # Short-lived dicts often reuse the id() of the previous one
+        assert as_compiled_profile(profile_data(f"clinic {i}")).name == f"clinic {i}"
+
+
+# --- Registry ---
+
+def test_registry_hot_reloads_a_changed_file(tmp_path):
+    path = tmp_path / "smile.yaml"
+    path.write_text(yaml.safe_dump(profile_data("Smile")), encoding="utf-8")
+    registry = ProfileRegistry(profiles={}, profile_dir=str(tmp_path), check_interval=0)
+    first = registry.get("smile")
+    assert isinstance(first, CompiledProfile) and first.name == "Smile"
+    assert registry.get("smile") is first
+
+    path.write_text(yaml.safe_dump(profile_data("Smile Dental")), encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert registry.get("smile").name == "Smile Dental"
+
+
+def test_registry_keeps_the_last_good_version(tmp_path):
+    path = tmp_path / "smile.yaml"
+    path.write_text(yaml.safe_dump(profile_data("Smile")), encoding="utf-8")
+    registry = ProfileRegistry(profiles={}, profile_dir=str(tmp_path), check_interval=0)
+    first = registry.get("smile")
+    path.write_text("clinic_info: [unclosed", encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    assert registry.get("smile") is first
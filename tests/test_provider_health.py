@@ -0,0 +1,103 @@
+# tests/test_provider_health.py
+from types import SimpleNamespace
+
+import pytest
+
+import core.provider_health as provider_health_module
+from core.provider_health import CircuitBreaker, ProviderHealth
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A manual monotonic clock for the breaker's cooldown."""
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(provider_health_module, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+
+# --- Circuit Breaker ---
+
+def test_breaker_cycles_closed_open_half_open_closed(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown_seconds=30)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    open_breaker(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.value += 29
+    assert not breaker.allow_request()
+
+    clock.value += 1
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 0
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_failed_probe_reopens_for_a_full_cooldown(clock):
+    breaker = CircuitBreaker(failure_threshold=3, cooldown_seconds=30)
+    open_breaker(breaker)
+    clock.value += 30
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.value += 29
+    assert not breaker.allow_request()
+    clock.value += 1
+    assert breaker.allow_request() and breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_released_probe_lets_the_next_one_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=10)
+    open_breaker(breaker)
+    clock.value += 10
+    assert breaker.allow_request()
+    # The probe was cancelled before it produced a verdict
+    breaker.release()
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_only_consecutive_failures_open_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=3)
+    for _ in range(5):
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+# --- Provider Health ---
+
+def test_provider_health_tracks_outcomes_and_latency(clock):
+    health = ProviderHealth("groq", failure_threshold=2, cooldown_seconds=5, window=100)
+    for ms in range(1, 101):
+        health.record_success(ms / 1000)
+    health.record_failure("timeout", timed_out=True)
+    health.record_failure("HTTP 500")
+
+    snapshot = health.snapshot()
+    assert snapshot["state"] == CircuitBreaker.OPEN
+    assert snapshot["successes"] == 100 and snapshot["failures"] == 2 and snapshot["timeouts"] == 1
+    assert snapshot["p50_ms"] == 50.0 and snapshot["p95_ms"] == 95.0
+    assert snapshot["last_error"] == "HTTP 500"
+
+
+def test_latency_window_keeps_only_recent_calls():
+    health = ProviderHealth("gemini", window=10)
+    assert health.latency_percentile(50) is None
+    for _ in range(20):
+        health.record_success(5.0)
+    for _ in range(10):
+        health.record_success(0.1)
+    assert health.latency_percentile(95) == 0.1
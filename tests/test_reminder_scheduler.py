@@ -0,0 +1,162 @@
+# tests/test_reminder_scheduler.py
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import core.reminder_scheduler as reminder_scheduler_module
+from core.profile_registry import ProfileRegistry
+from core.reminder_scheduler import ReminderScheduler
+from tests.conftest import FakeLLMClient
+
+HOUR = 60 * 60
+
+
+class FakeDispatcher:
+    """Records every send; the first `failures` sends to a number fail."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.sent = []
+        self.attempts = {}
+
+    def send_text(self, to: str, text: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.attempts[to] = self.attempts.get(to, 0) + 1
+        if self.attempts[to] <= self.failures:
+            future.set_exception(RuntimeError("HTTP 500"))
+        else:
+            self.sent.append((to, text))
+            future.set_result("wamid.1")
+        return future
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """The scheduler's wall clock; advance with clock.now += seconds."""
+    # A minute ahead, so confirmations recorded during the test are already due
+    now = SimpleNamespace(now=time.time() + 60)
+    monkeypatch.setattr(reminder_scheduler_module, "time", SimpleNamespace(time=lambda: now.now))
+    return now
+
+
+def scheduler(ledger, business_data, dispatcher, **kwargs) -> ReminderScheduler:
+    return ReminderScheduler(dispatcher, ledger=ledger, registry=ProfileRegistry.from_business_data(business_data),
+                             llm_client=FakeLLMClient(), **kwargs)
+
+
+def book(ledger, user_id: str, starts_in: float) -> int:
+    starts_at = (datetime.now() + timedelta(seconds=starts_in)).replace(second=0, microsecond=0)
+    return ledger.record_booking("default", user_id, "Ravi", "General Consultation", starts_at, 15, "English")
+
+
+async def run_due(reminders: ReminderScheduler, now: float):
+    await reminders._poll()
+    while True:
+        batch = reminders._pop_due(now)
+        if not batch:
+            return
+        await reminders._send_batch(batch)
+
+
+def statuses(ledger) -> dict:
+    with ledger._lock:
+        return dict(ledger._conn.execute("SELECT kind, status FROM reminders").fetchall())
+
+
+# --- Horizon ---
+
+def test_only_messages_within_the_horizon_are_held_in_memory(ledger, business_data, clock):
+    book(ledger, "911", starts_in=3 * 24 * HOUR)  # reminder due in about two days
+    reminders = scheduler(ledger, business_data, FakeDispatcher(), horizon=HOUR)
+
+    asyncio.run(reminders._poll())
+    assert len(reminders._heap) == 1  # the confirmation
+
+    asyncio.run(run_due(reminders, clock.now))
+    assert statuses(ledger) == {"confirmation": "sent", "reminder": "pending"}
+    assert reminders._heap == []
+
+    # Once the window reaches the reminder, a poll loads and sends it
+    clock.now += 2 * 24 * HOUR
+    asyncio.run(run_due(reminders, clock.now))
+    assert statuses(ledger) == {"confirmation": "sent", "reminder": "sent"}
+
+
+def test_bookings_recorded_after_a_poll_are_picked_up(ledger, business_data, clock):
+    dispatcher = FakeDispatcher()
+    reminders = scheduler(ledger, business_data, dispatcher, horizon=HOUR)
+    asyncio.run(reminders._poll())
+    assert reminders._heap == []
+
+    # Recorded by another engine process, due before the window's end
+    book(ledger, "911", starts_in=2 * HOUR)
+    clock.now += reminders.poll_interval
+    asyncio.run(run_due(reminders, clock.now))
+    assert [to for to, _ in dispatcher.sent] == ["911"]
+
+
+def test_cancelled_appointment_messages_are_not_sent(ledger, business_data, clock):
+    ledger.cancel(book(ledger, "911", starts_in=3 * 24 * HOUR))
+    dispatcher = FakeDispatcher()
+    asyncio.run(run_due(scheduler(ledger, business_data, dispatcher), clock.now))
+    assert dispatcher.sent == []
+
+
+# --- Retries ---
+
+def test_failed_send_is_retried_after_the_delay(ledger, business_data, clock, caplog):
+    appointment_id = book(ledger, "911", starts_in=2 * HOUR)
+    dispatcher = FakeDispatcher(failures=1)
+    reminders = scheduler(ledger, business_data, dispatcher, retry_delay=300, max_attempts=3)
+
+    with caplog.at_level(logging.WARNING, logger="core.reminder_scheduler"):
+        asyncio.run(run_due(reminders, clock.now))
+    assert dispatcher.sent == [] and reminders.stats["retried"] == 1
+    assert f"appointment {appointment_id}" in caplog.text
+    assert reminders._heap[0][0] == pytest.approx(clock.now + 300)
+
+    # Not before the delay
+    clock.now += 299
+    asyncio.run(run_due(reminders, clock.now))
+    assert dispatcher.sent == []
+
+    clock.now += 1
+    asyncio.run(run_due(reminders, clock.now))
+    assert [to for to, _ in dispatcher.sent] == ["911"]
+    assert statuses(ledger)["confirmation"] == "sent"
+
+
+def test_gives_up_after_max_attempts(ledger, business_data, clock):
+    book(ledger, "911", starts_in=2 * HOUR)
+    reminders = scheduler(ledger, business_data, FakeDispatcher(failures=10), retry_delay=60, max_attempts=3)
+    for _ in range(3):
+        asyncio.run(run_due(reminders, clock.now))
+        clock.now += 60
+    assert statuses(ledger)["confirmation"] == "failed"
+    assert reminders.stats["retried"] == 2 and reminders.stats["failed"] == 1
+    assert reminders._heap == []
+
+
+def test_failed_batch_is_logged_and_requeued(ledger, business_data, clock, monkeypatch, caplog):
+    book(ledger, "911", starts_in=2 * HOUR)
+    dispatcher = FakeDispatcher()
+    reminders = scheduler(ledger, business_data, dispatcher, retry_delay=120)
+
+    def broken(reminder_ids):
+        raise RuntimeError("database is locked")
+
+    working = ledger.reminder_details
+    monkeypatch.setattr(ledger, "reminder_details", broken)
+    with caplog.at_level(logging.ERROR, logger="core.reminder_scheduler"):
+        asyncio.run(run_due(reminders, clock.now))
+    assert "database is locked" in caplog.text and "reminder ids [1]" in caplog.text
+    assert reminders._heap == [(pytest.approx(clock.now + 120), 1)]
+
+    monkeypatch.setattr(ledger, "reminder_details", working)
+    clock.now += 120
+    asyncio.run(run_due(reminders, clock.now))
+    assert [to for to, _ in dispatcher.sent] == ["911"]
@@ -0,0 +1,160 @@
+# tests/test_response_cache.py
+import asyncio
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import core.response_cache as response_cache_module
+from core.response_cache import ResponseCache
+
+
+def messages(text: str) -> list:
+    return [{"role": "system", "content": "You extract entities."}, {"role": "user", "content": text}]
+
+
+class CountingProvider:
+    """An LLM call that takes `delay` seconds and counts how often it really ran."""
+
+    def __init__(self, result: dict = None, delay: float = 0.01):
+        self.result = result or {"provider": "fake", "content": json.dumps({"intent": "BOOKING"})}
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return dict(self.result)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Freezes the cache's clock at 23:59:00 on 2030-01-07; advance with clock.advance(seconds)."""
+
+    class Clock:
+        now = datetime(2030, 1, 7, 23, 59).timestamp()
+
+        def advance(self, seconds: float):
+            self.now += seconds
+
+    frozen = Clock()
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromtimestamp(frozen.now, tz)
+
+    monkeypatch.setattr(response_cache_module, "time", SimpleNamespace(time=lambda: frozen.now))
+    monkeypatch.setattr(response_cache_module, "datetime", FrozenDatetime)
+    return frozen
+
+
+# --- Single-flight ---
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    async def run():
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        provider = CountingProvider()
+        results = await asyncio.gather(*(cache.get_or_call(messages("kal appointment"), True, provider)
+                                         for _ in range(10)))
+        return cache, provider, results
+
+    cache, provider, results = asyncio.run(run())
+    assert provider.calls == 1
+    assert all(result == provider.result for result in results)
+    # Every caller gets its own copy
+    assert len({id(result) for result in results}) == 10
+    assert cache.stats["misses"] == 1 and cache.stats["coalesced"] == 9
+
+
+def test_whitespace_variants_share_an_entry():
+    async def run():
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        provider = CountingProvider()
+        await cache.get_or_call(messages("kal  appointment\n"), False, provider)
+        await cache.get_or_call(messages(" kal appointment"), False, provider)
+        return cache, provider
+
+    cache, provider = asyncio.run(run())
+    assert provider.calls == 1 and cache.stats["hits"] == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def run():
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        provider = CountingProvider(delay=0.05)
+        first = asyncio.create_task(cache.get_or_call(messages("hi"), False, provider))
+        second = asyncio.create_task(cache.get_or_call(messages("hi"), False, provider))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, provider.calls
+
+    result, calls = asyncio.run(run())
+    assert result["provider"] == "fake" and calls == 1
+
+
+# --- What Is Stored ---
+
+@pytest.mark.parametrize("result, structured", [
+    ({"provider": "NONE", "content": "all providers failed"}, False),
+    ({"provider": "fake", "content": "not json {"}, True),
+])
+def test_failures_and_invalid_json_are_not_cached(result, structured):
+    async def run():
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        provider = CountingProvider(result)
+        await cache.get_or_call(messages("hi"), structured, provider)
+        await cache.get_or_call(messages("hi"), structured, provider)
+        return cache, provider
+
+    cache, provider = asyncio.run(run())
+    assert provider.calls == 2 and cache.stats["not_cached"] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", {"content": "A"})
+    cache.put("b", {"content": "B"})
+    assert cache.get("a") is not None
+    cache.put("c", {"content": "C"})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats["evictions"] == 1
+
+
+# --- Expiry ---
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(max_entries=10, ttl_seconds=30)
+    cache.put("key", {"content": "x"})
+    clock.advance(29)
+    assert cache.get("key") is not None
+    clock.advance(2)
+    assert cache.get("key") is None
+    assert cache.stats["expired"] == 1
+
+
+def test_dated_entry_expires_at_midnight(clock):
+    async def run():
+        cache = ResponseCache(max_entries=10, ttl_seconds=3600)
+        provider = CountingProvider()
+        dated = [{"role": "system", "content": "Today is 2030-01-07."}, {"role": "user", "content": "kal"}]
+        undated = messages("kal")
+        for prompt in (dated, undated):
+            await cache.get_or_call(prompt, True, provider)
+        # 23:59:59 - both still cached
+        clock.advance(59)
+        for prompt in (dated, undated):
+            await cache.get_or_call(prompt, True, provider)
+        calls_before_midnight = provider.calls
+        # 00:00:01 - only the entry that mentions today's date is gone
+        clock.advance(2)
+        for prompt in (dated, undated):
+            await cache.get_or_call(prompt, True, provider)
+        return calls_before_midnight, provider.calls, cache.stats
+
+    calls_before_midnight, calls, stats = asyncio.run(run())
+    assert calls_before_midnight == 2
+    assert calls == 3
+    assert stats["expired"] == 1
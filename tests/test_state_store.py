@@ -0,0 +1,106 @@
+# tests/test_state_store.py
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from core.state_store import JsonFileStateStore, MemoryStateStore, SQLiteStateStore
+
+TTL = 60.0
+
+
+def record(age_seconds: float, state: str = "AWAITING_NAME") -> dict:
+    updated = datetime.now() - timedelta(seconds=age_seconds)
+    return {"state": state, "last_updated": updated.isoformat(), "context": {"language": "Hinglish"}}
+
+
+def sqlite_rows(store: SQLiteStateStore) -> set:
+    with store._lock:
+        return {row[0] for row in store._conn.execute("SELECT user_id FROM conversations")}
+
+
+def wait_for(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / "conversations.db"), ttl_seconds=TTL, purge_interval=0.05)
+    yield store
+    store.close()
+
+
+# --- Expiry ---
+
+def test_expired_records_are_not_returned_and_evicted_on_load(sqlite_store):
+    sqlite_store.save("old", record(2 * TTL))
+    sqlite_store.save("new", record(1))
+    assert sqlite_store.load("old") is None
+    assert sqlite_store.load("new")["state"] == "AWAITING_NAME"
+    assert sqlite_rows(sqlite_store) == {"new"}
+
+
+def test_sqlite_purge_cycle_deletes_expired_records(sqlite_store):
+    sqlite_store.save_many({"old-1": record(2 * TTL), "old-2": record(TTL + 5), "new": record(1)})
+    # Not due yet right after start-up
+    assert sqlite_store.purge_if_due() == 0
+    time.sleep(0.06)
+    assert sqlite_store.purge_if_due() == 2
+    assert sqlite_rows(sqlite_store) == {"new"}
+    # At most once per interval
+    sqlite_store.save("old-3", record(2 * TTL))
+    assert sqlite_store.purge_if_due() == 0
+
+
+def test_json_purge_cycle_deletes_expired_files(tmp_path):
+    store = JsonFileStateStore(str(tmp_path), ttl_seconds=TTL, purge_interval=0.05)
+    store.save("old", record(2 * TTL))
+    store.save("new", record(1))
+    stale = time.time() - 2 * TTL
+    os.utime(tmp_path / "old.json", (stale, stale))
+    time.sleep(0.06)
+    assert store.purge_if_due() == 1
+    assert sorted(os.listdir(tmp_path)) == ["new.json"]
+
+
+def test_write_behind_flusher_purges_memory_and_backing(tmp_path):
+    backing = SQLiteStateStore(str(tmp_path / "conversations.db"), ttl_seconds=TTL, purge_interval=None)
+    store = MemoryStateStore(backing, ttl_seconds=TTL, flush_interval=0.02, purge_interval=0.05)
+    try:
+        store.save("old", record(2 * TTL))
+        store.save("new", record(1))
+        # No read of "old" ever happens: the flusher's purge cycle alone removes it everywhere
+        assert wait_for(lambda: "old" not in store._records and sqlite_rows(backing) == {"new"})
+        assert store.load("new")["state"] == "AWAITING_NAME"
+    finally:
+        store.close()
+
+
+def test_memory_store_without_backing_evicts_on_load_and_purge():
+    store = MemoryStateStore(None, ttl_seconds=TTL, purge_interval=0.05)
+    store.save("old-1", record(2 * TTL))
+    store.save("old-2", record(2 * TTL))
+    store.save("new", record(1))
+    assert store.load("old-1") is None
+    assert "old-1" not in store._records
+    time.sleep(0.06)
+    assert store.purge_if_due() == 1
+    assert set(store._records) == {"new"}
+
+
+def test_purging_is_off_without_a_ttl(tmp_path):
+    store = SQLiteStateStore(str(tmp_path / "conversations.db"), ttl_seconds=None, purge_interval=0.01)
+    try:
+        store.save("old", record(10 * TTL))
+        time.sleep(0.02)
+        assert not store.purge_due()
+        assert store.purge_if_due() == 0
+        assert store.load("old") is not None
+    finally:
+        store.close()
@@ -0,0 +1,124 @@
+# tests/test_translation_cache.py
+import asyncio
+import json
+import multiprocessing
+
+import pytest
+
+from core.translation_cache import TranslationCache, extract_placeholders
+
+ENGLISH = "Thank you {name}! Your {service} is booked for {time}."
+HINGLISH = "Dhanyavaad {name}! Aapka {service} {time} ke liye book ho gaya hai."
+
+
+# --- Placeholder Validation ---
+
+def test_translation_keeping_every_placeholder_is_stored_and_rendered():
+    cache = TranslationCache(None)
+    # Placeholders may move around
+    assert cache.set_template("BOOKED", "Hinglish", ENGLISH, HINGLISH)
+    assert cache.render("BOOKED", "hinglish", {"name": "Ravi", "service": "checkup", "time": "5 PM"}) == \
+        "Dhanyavaad Ravi! Aapka checkup 5 PM ke liye book ho gaya hai."
+
+
+@pytest.mark.parametrize("translated", [
+    # A placeholder went missing
+    "Dhanyavaad! Aapka {service} {time} ke liye book ho gaya hai.",
+    # A placeholder was translated
+    "Dhanyavaad {naam}! Aapka {service} {time} ke liye book ho gaya hai.",
+    # An invented one
+    "Dhanyavaad {name}! Aapka {service} {time} ke liye {clinic} mein book ho gaya hai.",
+])
+def test_translation_with_different_placeholders_is_rejected(translated):
+    cache = TranslationCache(None)
+    assert not cache.set_template("BOOKED", "Hinglish", ENGLISH, translated)
+    assert cache.get_template("BOOKED", "Hinglish") is None
+    assert cache.render("BOOKED", "Hinglish", {"name": "Ravi", "service": "checkup", "time": "5 PM"}) is None
+
+
+@pytest.mark.parametrize("translated", [
+    # Escaped: would render '{name}' literally
+    "Dhanyavaad {{name}}! Aapka {service} {time} ke liye book ho gaya hai.",
+    # Stray braces that break str.format
+    "Dhanyavaad {name}! Aapka {service} {time} ke liye book ho gaya hai. }",
+    "Dhanyavaad {name}! Aapka {service} {time} ke liye {book ho gaya hai.",
+    "Dhanyavaad {name}! {0} Aapka {service} {time} ke liye book ho gaya hai.",
+])
+def test_translation_with_extra_braces_is_rejected(translated):
+    assert not TranslationCache(None).set_template("BOOKED", "Hinglish", ENGLISH, translated)
+
+
+def test_extract_placeholders():
+    assert extract_placeholders(ENGLISH) == {"name", "service", "time"}
+    assert extract_placeholders("{services_list} {0} { spaced }") == {"services_list"}
+
+
+# --- Rendered Level ---
+
+def test_rendered_entries_are_bounded():
+    cache = TranslationCache(None, max_entries=2)
+    for n in range(3):
+        cache.set_rendered("BOOKED", "Hindi", {"n": n}, f"text {n}")
+    assert cache.get_rendered("BOOKED", "Hindi", {"n": 0}) is None
+    assert cache.get_rendered("BOOKED", "hindi", {"n": 2}) == "text 2"
+
+
+# --- Shared File ---
+
+def write_templates(path: str, writer: int, count: int):
+    cache = TranslationCache(path)
+    for n in range(count):
+        cache.set_template(f"T{writer}_{n}", "Hindi", "Hi {name}", f"Namaste {{name}} ({writer}/{n})")
+
+
+def test_two_writers_merge_instead_of_overwriting(tmp_path):
+    path = str(tmp_path / "translations.json")
+    first, second = TranslationCache(path), TranslationCache(path)
+    first.set_template("GREETING", "Hindi", "Hi {name}", "Namaste {name}")
+    # `second` loaded the file before that save, and must not drop it with its own
+    second.set_template("GREETING", "Hinglish", "Hi {name}", "Hello ji {name}")
+
+    reloaded = TranslationCache(path)
+    assert reloaded.get_template("GREETING", "Hindi") == "Namaste {name}"
+    assert reloaded.get_template("GREETING", "Hinglish") == "Hello ji {name}"
+
+
+def test_concurrent_processes_keep_every_translation(tmp_path):
+    path = str(tmp_path / "translations.json")
+    context = multiprocessing.get_context("fork")
+    writers = [context.Process(target=write_templates, args=(path, writer, 25)) for writer in range(3)]
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join(timeout=30)
+        assert process.exitcode == 0
+
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert len(saved) == 75
+    # No temp files are left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["translations.json", "translations.json.lock"]
+
+
+def test_saves_on_an_event_loop_run_in_the_background(tmp_path):
+    path = str(tmp_path / "translations.json")
+
+    async def run():
+        cache = TranslationCache(path)
+        for n in range(20):
+            cache.set_template(f"T{n}", "Hindi", "Hi {name}", "Namaste {name}")
+        written_inline = (tmp_path / "translations.json").exists()
+        await cache._save_task
+        return written_inline
+
+    assert not asyncio.run(run())
+    assert len(TranslationCache(path)._templates) == 20
+
+
+def test_unreadable_file_starts_empty(tmp_path):
+    path = tmp_path / "translations.json"
+    path.write_text("{not json", encoding="utf-8")
+    cache = TranslationCache(str(path))
+    assert cache.get_template("GREETING", "Hindi") is None
+    assert cache.set_template("GREETING", "Hindi", "Hi {name}", "Namaste {name}")
+    assert json.loads(path.read_text(encoding="utf-8")) == {"GREETING::hindi": "Namaste {name}"}
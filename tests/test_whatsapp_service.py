@@ -0,0 +1,131 @@
+# tests/test_whatsapp_service.py
+import asyncio
+import random
+import time
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from core.metrics import METRICS
+from services import whatsapp_service
+from services.whatsapp_service import OutboundDispatcher, SendFailed, TokenBucket
+from tools.fake_cloud_api import FakeCloudAPI
+
+
+async def run_against_fake(fake: FakeCloudAPI, scenario, **dispatcher_args):
+    """Runs `scenario(dispatcher)` against a local fake Cloud API; returns its result."""
+    server = TestServer(fake.app())
+    await server.start_server()
+    dispatcher = OutboundDispatcher(base_url=str(server.make_url("/v20.0")), phone_number_id="123",
+                                    access_token="test-token", **dispatcher_args)
+    try:
+        return await scenario(dispatcher)
+    finally:
+        await dispatcher.aclose()
+        await server.close()
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(whatsapp_service, "WHATSAPP_RETRY_BASE_DELAY_SECONDS", 0.001)
+    monkeypatch.setattr(whatsapp_service, "WHATSAPP_RETRY_MAX_DELAY_SECONDS", 0.01)
+
+
+# --- Pacing ---
+
+def test_token_bucket_paces_after_the_burst():
+    async def run():
+        bucket = TokenBucket(rate=50, capacity=3)
+        started = time.monotonic()
+        for _ in range(8):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # 3 tokens up front, the other 5 at 50/s
+    assert 0.09 <= asyncio.run(run()) < 0.5
+
+
+def test_account_rate_paces_sends_across_recipients():
+    async def scenario(dispatcher):
+        started = time.monotonic()
+        message_ids = await asyncio.gather(*(dispatcher.send_text(f"91{i}", "hi") for i in range(8)))
+        return time.monotonic() - started, message_ids
+
+    fake = FakeCloudAPI(rate=1000)
+    elapsed, message_ids = asyncio.run(run_against_fake(fake, scenario, rate_per_second=20, burst=2))
+    # 2 sends in the burst, the other 6 at 20/s
+    assert elapsed >= 0.25
+    assert all(message_id.startswith("wamid.") for message_id in message_ids)
+    assert fake.stats["throttled"] == 0 and fake.stats["accepted"] == 8
+
+
+# --- Ordering ---
+
+def test_per_recipient_order_survives_retries(fast_retries):
+    async def scenario(dispatcher):
+        futures = [dispatcher.send_text(to, f"{to}-{n}") for n in range(10) for to in ("911", "912", "913")]
+        await asyncio.gather(*futures)
+        return dispatcher.metrics()
+
+    random.seed(7)
+    fake = FakeCloudAPI(rate=1000, error_rate=0.3)
+    metrics = asyncio.run(run_against_fake(fake, scenario, max_retries=20))
+    assert fake.stats["errors"] > 0
+    for to in ("911", "912", "913"):
+        assert fake.delivered[to] == [f"{to}-{n}" for n in range(10)]
+    assert metrics["sent"] == 30 and metrics["retried"] == fake.stats["errors"]
+    assert metrics["queue_depth"] == 0 and metrics["active_recipients"] == 0
+
+
+# --- Throttling & Retries ---
+
+def test_429_is_retried_no_sooner_than_retry_after():
+    async def scenario(dispatcher):
+        started = time.monotonic()
+        await asyncio.gather(*(dispatcher.send_text(f"91{i}", "hi") for i in range(4)))
+        return time.monotonic() - started, dispatcher.metrics()
+
+    # The fake accepts 2 per second and answers the rest 429 with Retry-After: 1
+    fake = FakeCloudAPI(rate=2)
+    elapsed, metrics = asyncio.run(run_against_fake(fake, scenario))
+    assert fake.stats["throttled"] == 2 and fake.stats["accepted"] == 4
+    assert elapsed >= 1.0
+    assert metrics["throttled"] == 2 and metrics["retried"] == 2 and metrics["sent"] == 4
+
+
+def test_gives_up_after_max_retries(fast_retries):
+    async def scenario(dispatcher):
+        with pytest.raises(SendFailed, match="after 3 attempts"):
+            await dispatcher.send_text("911", "hi")
+        return dispatcher.metrics()
+
+    metrics = asyncio.run(run_against_fake(FakeCloudAPI(error_rate=1.0), scenario, max_retries=2))
+    assert metrics["failed"] == 1 and metrics["retried"] == 2 and metrics["sent"] == 0
+
+
+def test_backoff_is_jittered_with_retry_after_as_floor():
+    base, cap = whatsapp_service.WHATSAPP_RETRY_BASE_DELAY_SECONDS, whatsapp_service.WHATSAPP_RETRY_MAX_DELAY_SECONDS
+    for attempt in range(6):
+        delays = [OutboundDispatcher._backoff(attempt, None) for _ in range(200)]
+        assert all(0 <= delay <= min(cap, base * 2 ** attempt) for delay in delays)
+        assert len(set(delays)) > 1
+    assert all(OutboundDispatcher._backoff(0, "2") >= 2.0 for _ in range(50))
+    assert OutboundDispatcher._backoff(0, "soon") <= base
+
+
+# --- Metrics ---
+
+def test_counters_are_exported_to_the_metrics_registry():
+    async def scenario(dispatcher):
+        queued = [dispatcher.send_text("911", str(n)) for n in range(3)]
+        # The queue holds 3 messages, so a 4th is refused straight away
+        rejected = dispatcher.send_text("912", "over the limit")
+        await asyncio.gather(*queued)
+        return rejected
+
+    sent_before = METRICS.counter("whatsapp_messages_total", result="sent")
+    rejected_before = METRICS.counter("whatsapp_messages_total", result="rejected_full")
+    rejected = asyncio.run(run_against_fake(FakeCloudAPI(rate=1000), scenario, max_queue=3))
+    assert isinstance(rejected.exception(), SendFailed)
+    assert METRICS.counter("whatsapp_messages_total", result="sent") == sent_before + 3
+    assert METRICS.counter("whatsapp_messages_total", result="rejected_full") == rejected_before + 1
@@ -0,0 +1,85 @@
+# tools/fake_cloud_api.py
+"""
+Local stand-in for the WhatsApp Cloud API messages endpoint, for load-testing the outbound
+dispatcher without real numbers:
+
+    python -m tools.fake_cloud_api --port 8090 --rate 20 --error-rate 0.05 --latency 0.05
+    WHATSAPP_API_BASE_URL=http://127.0.0.1:8090/v20.0 python main.py
+
+POST /{version}/{phone_number_id}/messages answers like the real API. Requests beyond
+--rate per second get 429 (error code 130429), a random --error-rate share gets 500.
+GET /stats returns counters and the per-recipient delivery order.
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from aiohttp import web
+
+
+class FakeCloudAPI:
+    def __init__(self, rate: float = 80.0, error_rate: float = 0.0, latency: float = 0.0):
+        self.rate = rate
+        self.error_rate = error_rate
+        self.latency = latency
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.stats = {"received": 0, "accepted": 0, "throttled": 0, "errors": 0}
+        self.delivered = {}  # recipient -> bodies in arrival order
+
+    def _over_rate(self) -> bool:
+        now = time.monotonic()
+        if now - self.window_start >= 1.0:
+            self.window_start, self.window_count = now, 0
+        self.window_count += 1
+        return self.window_count > self.rate
+
+    async def messages(self, request: web.Request) -> web.Response:
+        self.stats["received"] += 1
+        payload = await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._over_rate():
+            self.stats["throttled"] += 1
+            return web.json_response(
+                {"error": {"message": "(#130429) Rate limit hit", "code": 130429}},
+                status=429, headers={"Retry-After": "1"},
+            )
+        if random.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response({"error": {"message": "Internal error", "code": 1}}, status=500)
+
+        self.stats["accepted"] += 1
+        to = payload.get("to")
+        self.delivered.setdefault(to, []).append((payload.get("text") or {}).get("body"))
+        return web.json_response({
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": to, "wa_id": to}],
+            "messages": [{"id": f"wamid.{uuid.uuid4().hex}"}],
+        })
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({**self.stats, "delivered": self.delivered})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/{version}/{phone_number_id}/messages", self.messages)
+        app.router.add_get("/stats", self.get_stats)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake WhatsApp Cloud API for local load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--rate", type=float, default=80.0, help="Accepted messages per second before 429s")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    args = parser.parse_args()
+    web.run_app(FakeCloudAPI(args.rate, args.error_rate, args.latency).app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# tools/mock_llm_server.py
+"""
+Local mock of the Chutes / OpenRouter chat/completions endpoints, for benchmarks and load tests:
+
+    python -m tools.mock_llm_server --port 8765 --latency 0.4 --failure-rate 0.02 --malformed-rate 0.01
+
+Both providers are served from one process:
+    CHUTES_BASE_URL=http://127.0.0.1:8765/chutes/v1/chat/completions
+    OPENROUTER_BASE_URL=http://127.0.0.1:8765/openrouter/v1
+
+Answers are produced by cheap heuristics over the prompts core/intent_detector.py and
+core/llm_client.py send (extraction, single-call turns, FAQ, translation), so scripted
+conversations progress like they would against a real model. Latency is log-normal around
+--latency; --failure-rate answers with 500/429; --malformed-rate returns JSON wrapped in
+markdown fences, followed by prose, with single quotes or cut short. GET /stats returns counters.
+"""
+import argparse
+import asyncio
+import ast
+import json
+import random
+import re
+from datetime import date, timedelta
+from typing import Tuple
+
+from aiohttp import web
+
+HINGLISH_WORDS = {"hai", "hain", "mujhe", "karna", "kal", "chahiye", "baje", "kya", "aap", "naam", "mera"}
+USER_INPUT = re.compile(r"User Input: '(.*)'\. REQUIRED JSON SCHEMA", re.S)
+SERVICES = re.compile(r"CLINIC SERVICES: (\[.*?\])")
+NAME = re.compile(r"(?:name is|naam|i am|i'm|this is)\s+([A-Za-z][A-Za-z .]*[A-Za-z])", re.I)
+ISO_DATE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+CLOCK = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+
+
+class MockLLMServer:
+    def __init__(self, latency: float = 0.3, jitter: float = 0.4, failure_rate: float = 0.0,
+                 malformed_rate: float = 0.0, seed: int = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "failed": 0, "malformed": 0, "by_kind": {}, "by_provider": {}}
+
+    # --- Fake model ---
+
+    def _entities(self, user_input: str, schema_text: str, system_prompt: str) -> dict:
+        lowered = user_input.lower()
+        entities = {}
+        if "'intent'" in schema_text:
+            if any(word in lowered for word in ("book", "appointment", "booking")):
+                entities["intent"] = "BOOKING"
+            elif re.match(r"\s*(hi|hello|namaste)\b", lowered):
+                entities["intent"] = "GREETING"
+            else:
+                entities["intent"] = "FAQ"
+            words = set(re.findall(r"[a-z]+", lowered))
+            entities["detected_language"] = "Hinglish" if words & HINGLISH_WORDS else "English"
+        if "'name'" in schema_text:
+            match = NAME.search(user_input)
+            entities["name"] = match.group(1).strip() if match else None
+        if "'service_request'" in schema_text:
+            entities["service_request"] = None
+            services_match = SERVICES.search(system_prompt)
+            for service in (ast.literal_eval(services_match.group(1)) if services_match else []):
+                if any(word.lower()[:5] in lowered for word in service.split()):
+                    entities["service_request"] = service
+                    break
+        if "'date'" in schema_text:
+            date_match, clock_match = ISO_DATE.search(user_input), CLOCK.search(user_input)
+            if date_match:
+                entities["date"] = date_match.group(1)
+            else:
+                # "whenever the doctor is free": pick a weekday within the next week
+                day = date.today() + timedelta(days=self.random.randint(1, 7))
+                while day.weekday() >= 5:
+                    day += timedelta(days=1)
+                entities["date"] = day.isoformat()
+            if clock_match:
+                entities["time"] = f"{int(clock_match.group(1)):02d}:{clock_match.group(2)}"
+            else:
+                hour = self.random.choice([10, 11, 12, 13, 17, 18, 19])
+                entities["time"] = f"{hour:02d}:{self.random.choice(['00', '15', '30', '45'])}"
+        return entities
+
+    def _answer(self, body: dict) -> Tuple[str, str]:
+        messages = body.get("messages", [])
+        system_prompt = messages[0]["content"] if messages else ""
+        user_content = messages[-1]["content"] if messages else ""
+
+        if body.get("response_format"):
+            input_match = USER_INPUT.search(user_content)
+            user_input = input_match.group(1) if input_match else user_content
+            schema_text = user_content[input_match.end():] if input_match else user_content
+            if "REPLY TEMPLATES:" in user_content:
+                schema_text, templates = schema_text.split("REPLY TEMPLATES:", 1)
+                replies = json.loads(templates.strip())
+                entities = self._entities(user_input, schema_text, system_prompt)
+                return "single_call", json.dumps({"entities": entities, "replies": replies}, ensure_ascii=False)
+            return "extraction", json.dumps(self._entities(user_input, schema_text, system_prompt))
+
+        if system_prompt.lstrip().startswith("You are a professional translator"):
+            # Echo the template: placeholders survive, like a well-behaved translation
+            return "translation", user_content
+        return "faq", "Thank you for your question. Please contact the clinic for more details."
+
+    def _malform(self, content: str) -> str:
+        mode = self.random.choice(["fence", "trailing", "single_quotes", "truncated"])
+        if mode == "fence":
+            return f"```json\n{content}\n```"
+        if mode == "trailing":
+            return f"{content}\nLet me know if you need anything else!"
+        if mode == "single_quotes":
+            return content.replace('"', "'")
+        return content[: max(1, int(len(content) * 0.7))]
+
+    # --- HTTP ---
+
+    async def chat_completions(self, request: web.Request) -> web.Response:
+        provider = request.match_info.get("provider", "default")
+        self.stats["requests"] += 1
+        self.stats["by_provider"][provider] = self.stats["by_provider"].get(provider, 0) + 1
+        body = await request.json()
+
+        if self.latency:
+            await asyncio.sleep(self.latency * self.random.lognormvariate(0, self.jitter))
+        if self.random.random() < self.failure_rate:
+            self.stats["failed"] += 1
+            status = self.random.choice([500, 502, 429])
+            return web.json_response({"error": {"message": f"Injected failure ({status})"}}, status=status)
+
+        kind, content = self._answer(body)
+        self.stats["by_kind"][kind] = self.stats["by_kind"].get(kind, 0) + 1
+        if body.get("response_format") and self.random.random() < self.malformed_rate:
+            self.stats["malformed"] += 1
+            content = self._malform(content)
+        return web.json_response({
+            "id": "mock",
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        })
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=4 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/{provider}/v1/chat/completions", self.chat_completions)
+        app.router.add_get("/stats", self.get_stats)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible LLM endpoint for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="Median response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.4, help="Sigma of the log-normal latency spread")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests answered with 500/502/429")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Share of JSON answers returned malformed")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    server = MockLLMServer(args.latency, args.jitter, args.failure_rate, args.malformed_rate, args.seed)
+    web.run_app(server.app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()